@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, Mapping, Optional, Tuple
+
+from app.domain.enums import ArtifactType
+from app.domain.models import ArtifactPayload
+from app.models import AnalyzeRequest
+from app.pipelines.scam_text import URL_RE
+
+COST_CLASSES = ("text", "link", "image", "document")
+# "class=concurrency:queue" pairs; classes left out keep their defaults.
+DEFAULT_LIMITS = {"text": (256, 2048), "link": (128, 512), "image": (16, 64), "document": (8, 32)}
+ADMISSION_LIMITS = os.environ.get("TRUSTBOT_ADMISSION_LIMITS", "")
+ADMISSION_QUEUE_TIMEOUT = float(os.environ.get("TRUSTBOT_ADMISSION_QUEUE_TIMEOUT", "10"))
+# Fraction of the link queue in use at which new link requests skip fetching (0 never degrades).
+ADMISSION_DEGRADE_AT = float(os.environ.get("TRUSTBOT_ADMISSION_DEGRADE_AT", "0.5"))
+MAX_RETRY_AFTER = 60
+_EWMA_ALPHA = 0.2
+
+
+class Overloaded(Exception):
+    def __init__(self, cost_class: str, retry_after: int) -> None:
+        super().__init__(f"Too many {cost_class} requests in progress; retry in {retry_after}s.")
+        self.cost_class = cost_class
+        self.retry_after = retry_after
+
+
+def parse_limits(spec: str) -> Dict[str, Tuple[int, int]]:
+    limits = dict(DEFAULT_LIMITS)
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, _, value = part.partition("=")
+        concurrency, _, queue = value.partition(":")
+        if name.strip() not in limits:
+            raise ValueError(f"Unknown cost class {name.strip()!r} in TRUSTBOT_ADMISSION_LIMITS")
+        limits[name.strip()] = (int(concurrency), int(queue or limits[name.strip()][1]))
+    return limits
+
+
+def _grant(waiter: "asyncio.Future[None]") -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class CostClass:
+    """Concurrency limit plus a bounded FIFO queue for one cost class.
+
+    Waiters may sit on different event loops (or none at all, in tests), so the state is guarded
+    by a thread lock and a freed slot is handed straight to the oldest waiter through its loop.
+    """
+
+    def __init__(self, name: str, concurrency: int, max_queue: int, queue_timeout: float = ADMISSION_QUEUE_TIMEOUT) -> None:
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self._lock = threading.Lock()
+        self._waiters: Deque[Tuple[asyncio.AbstractEventLoop, "asyncio.Future[None]"]] = deque()
+        self.running = 0
+        self.admitted = 0
+        self.shed = 0
+        self.timeouts = 0
+        self.degraded = 0
+        self._service_seconds = 0.0
+
+    def pressure(self) -> float:
+        with self._lock:
+            return len(self._waiters) / self.max_queue if self.max_queue else float(self.running >= self.concurrency)
+
+    def retry_after(self) -> int:
+        # Roughly how long the current queue takes to drain at the observed service time.
+        with self._lock:
+            backlog = len(self._waiters) / self.concurrency + 1
+            return min(MAX_RETRY_AFTER, max(1, math.ceil(self._service_seconds * backlog)))
+
+    def _shed(self) -> Overloaded:
+        return Overloaded(self.name, self.retry_after())
+
+    async def acquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.running < self.concurrency and not self._waiters:
+                self.running += 1
+                self.admitted += 1
+                return
+            if len(self._waiters) >= self.max_queue:
+                self.shed += 1
+                full = True
+            else:
+                full = False
+                entry = (loop, loop.create_future())
+                self._waiters.append(entry)
+        if full:
+            raise self._shed()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(entry[1]), self.queue_timeout)
+        except BaseException as exc:
+            with self._lock:
+                queued = entry in self._waiters
+                if queued:
+                    self._waiters.remove(entry)
+                    if isinstance(exc, asyncio.TimeoutError):
+                        self.timeouts += 1
+                        self.shed += 1
+            if queued:
+                if isinstance(exc, asyncio.TimeoutError):
+                    raise self._shed() from None
+                raise
+            # A slot was handed over just as the wait ended: it is ours, so keep it or give it back.
+            if not isinstance(exc, asyncio.TimeoutError):
+                self.release()
+                raise
+        with self._lock:
+            self.admitted += 1
+
+    def release(self, elapsed: Optional[float] = None) -> None:
+        with self._lock:
+            if elapsed is not None:
+                self._service_seconds += _EWMA_ALPHA * (elapsed - self._service_seconds)
+            while self._waiters:
+                loop, waiter = self._waiters.popleft()
+                # The slot passes to the waiter; `running` stays the same.
+                try:
+                    loop.call_soon_threadsafe(_grant, waiter)
+                    return
+                except RuntimeError:
+                    continue  # its loop has closed
+            self.running -= 1
+
+    def mark_degraded(self) -> None:
+        with self._lock:
+            self.degraded += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "concurrency": self.concurrency,
+                "max_queue": self.max_queue,
+                "running": self.running,
+                "queued": len(self._waiters),
+                "admitted": self.admitted,
+                "shed": self.shed,
+                "timeouts": self.timeouts,
+                "degraded": self.degraded,
+                "service_ms": round(self._service_seconds * 1000.0, 1),
+            }
+
+
+class AdmissionController:
+    """Per-cost-class admission in front of the v1 pipelines and the v2 service.
+
+    A full queue answers 429 with a Retry-After estimate. Link requests are the exception while
+    the link queue is under pressure: they run degraded instead, without fetching the
+    destination, and are admitted as text since that is what they then cost.
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Mapping[str, Tuple[int, int]]] = None,
+        queue_timeout: float = ADMISSION_QUEUE_TIMEOUT,
+        degrade_at: float = ADMISSION_DEGRADE_AT,
+    ) -> None:
+        limits = limits if limits is not None else parse_limits(ADMISSION_LIMITS)
+        self.classes = {name: CostClass(name, *limits[name], queue_timeout=queue_timeout) for name in COST_CLASSES}
+        self.degrade_at = degrade_at
+
+    def _select(self, cost: str) -> Tuple[CostClass, bool]:
+        degraded = cost == "link" and self.degrade_at > 0 and self.classes["link"].pressure() >= self.degrade_at
+        if degraded:
+            self.classes["link"].mark_degraded()
+        return self.classes["text" if degraded else cost], degraded
+
+    @asynccontextmanager
+    async def admit(self, cost: str) -> AsyncIterator[bool]:
+        """Hold a slot of ``cost`` for the block; yields True when the request must run degraded."""
+        cls, degraded = self._select(cost)
+        await cls.acquire()
+        started = time.monotonic()
+        try:
+            yield degraded
+        finally:
+            cls.release(time.monotonic() - started)
+
+    @contextmanager
+    def admit_blocking(self, cost: str) -> Iterator[bool]:
+        """``admit`` for worker threads with no event loop, such as batch items on the batch pool."""
+        cls, degraded = self._select(cost)
+        asyncio.run(cls.acquire())
+        started = time.monotonic()
+        try:
+            yield degraded
+        finally:
+            cls.release(time.monotonic() - started)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: cls.stats() for name, cls in self.classes.items()}
+
+
+def request_cost(req: AnalyzeRequest) -> str:
+    ct = req.content_type.value
+    if ct == "text":
+        return "link" if URL_RE.search(req.text or "") else "text"
+    return ct if ct in COST_CLASSES else "text"
+
+
+def artifact_cost(artifact: ArtifactPayload) -> str:
+    if artifact.type in (ArtifactType.TEXT, ArtifactType.CONTEXT):
+        # Links in forwarded text become link artifacts of their own, with a fetch.
+        return "link" if URL_RE.search(artifact.text or "") else "text"
+    return artifact.type.value
+
+
+_ADMISSION: Optional[AdmissionController] = None
+_ADMISSION_LOCK = threading.Lock()
+
+
+def get_admission() -> AdmissionController:
+    global _ADMISSION
+    with _ADMISSION_LOCK:
+        if _ADMISSION is None:
+            _ADMISSION = AdmissionController()
+        return _ADMISSION
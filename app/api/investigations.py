@@ -1,34 +1,106 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, HTTPException
+from typing import FrozenSet
 
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+
+from app.admission import artifact_cost, get_admission
+from app.batch import read_batch, stream_results
+from app.domain.enums import ArtifactType
+from app.executors import run_blocking
+from app.domain.models import ArtifactPayload
 from app.schemas.api_requests import V2AnalyzeRequest, V2ArtifactRequest
 from app.schemas.api_responses import InvestigationDetailResponse, V2AnalyzeResponse
 from app.services.investigation_service import InvestigationService
+from app.uploads import receive_upload
 
 router = APIRouter(prefix="/v2/investigations", tags=["investigations"])
 service = InvestigationService()
 
+UPLOAD_HEADERS = {
+    "type": "X-Artifact-Type",
+    "file_name": "X-File-Name",
+    "file_mime": "X-File-Mime",
+    "source_label": "X-Source-Label",
+}
 
-@router.post("/analyze", response_model=V2AnalyzeResponse)
-def analyze_investigation(req: V2AnalyzeRequest) -> V2AnalyzeResponse:
+
+# Service calls block on SQLite and on provider futures, so handlers run them on the blocking executor.
+# Degraded link artifacts (see app.admission) get the static checks only.
+DEGRADED_SKIP = frozenset({"url_fetch"})
+
+
+def _analyze(req: V2AnalyzeRequest, skip: FrozenSet[str] = frozenset()) -> V2AnalyzeResponse:
     try:
-        return service.analyze(req)
+        return service.analyze(req, skip)
     except ValueError as exc:
         raise HTTPException(status_code=404, detail=str(exc)) from exc
 
 
+def _analyze_admitted(req: V2AnalyzeRequest) -> V2AnalyzeResponse:
+    with get_admission().admit_blocking(artifact_cost(req.artifact)) as degraded:
+        return _analyze(req, DEGRADED_SKIP if degraded else frozenset())
+
+
+@router.post("/analyze", response_model=V2AnalyzeResponse)
+async def analyze_investigation(req: V2AnalyzeRequest) -> V2AnalyzeResponse:
+    async with get_admission().admit(artifact_cost(req.artifact)) as degraded:
+        return await run_blocking(_analyze, req, DEGRADED_SKIP if degraded else frozenset())
+
+
+@router.post("/analyze:batch")
+async def analyze_investigation_batch(request: Request) -> StreamingResponse:
+    """Each item is analyzed and admitted as its own request; a shed item answers 429 on its line.
+    Repeats of an artifact run after the first, so their links come from the fetch cache."""
+    items = await read_batch(request, V2AnalyzeRequest)
+    results = stream_results(items, lambda req: req.artifact.model_dump_json(), _analyze_admitted, share=False)
+    return StreamingResponse(results, media_type="application/x-ndjson")
+
+
 @router.get("/{investigation_id}", response_model=InvestigationDetailResponse)
-def get_investigation(investigation_id: str) -> InvestigationDetailResponse:
-    result = service.get_investigation(investigation_id)
+async def get_investigation(
+    investigation_id: str,
+    wait: float = Query(0.0, ge=0.0, le=30.0, description="Long-poll up to this many seconds while status is ANALYZING"),
+) -> InvestigationDetailResponse:
+    if wait > 0:
+        # Long-polls wait on the event loop, not on an executor thread.
+        await service.wait_settled(investigation_id, wait)
+    result = await run_blocking(service.get_investigation, investigation_id)
     if result is None:
         raise HTTPException(status_code=404, detail="Investigation not found.")
     return result
 
 
 @router.post("/{investigation_id}/artifacts", response_model=V2AnalyzeResponse)
-def add_artifact(investigation_id: str, req: V2ArtifactRequest) -> V2AnalyzeResponse:
+async def add_artifact(investigation_id: str, req: V2ArtifactRequest) -> V2AnalyzeResponse:
+    try:
+        async with get_admission().admit(artifact_cost(req.artifact)) as degraded:
+            return await run_blocking(service.add_artifact, investigation_id, req, None, DEGRADED_SKIP if degraded else frozenset())
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+
+
+@router.post("/{investigation_id}/artifacts/upload", response_model=V2AnalyzeResponse)
+async def upload_artifact(investigation_id: str, request: Request) -> V2AnalyzeResponse:
+    upload = await receive_upload(request, UPLOAD_HEADERS)
     try:
-        return service.add_artifact(investigation_id, req)
+        try:
+            payload = ArtifactPayload(
+                type=upload.fields.get("type") or ArtifactType.DOCUMENT,
+                file_name=upload.file_name,
+                file_mime=upload.file_mime,
+                source_label=upload.fields.get("source_label"),
+            )
+        except ValidationError as exc:
+            raise RequestValidationError(exc.errors()) from exc
+        if payload.type not in (ArtifactType.IMAGE, ArtifactType.DOCUMENT):
+            raise HTTPException(status_code=422, detail="Uploads must be artifact type image or document.")
+        async with get_admission().admit(artifact_cost(payload)):
+            return await run_blocking(service.add_artifact, investigation_id, V2ArtifactRequest(artifact=payload), upload.file)
     except ValueError as exc:
         raise HTTPException(status_code=404, detail=str(exc)) from exc
+    finally:
+        upload.file.close()
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Hashable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Type, TypeVar
+
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, ValidationError
+
+from app.admission import Overloaded, get_admission
+from app.models import AnalyzeRequest
+from app.pipelines.scam_text import analyze_text_scam
+from app.router import Prepared, check_url
+from app.uploads import _check_declared_length, _spool_body
+
+BATCH_MAX_ITEMS = int(os.environ.get("TRUSTBOT_BATCH_MAX_ITEMS", "10000"))
+BATCH_MAX_BYTES = int(os.environ.get("TRUSTBOT_BATCH_MAX_BYTES", str(32 * 1024 * 1024)))
+BATCH_CONCURRENCY = int(os.environ.get("TRUSTBOT_BATCH_CONCURRENCY", "16"))
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines")
+
+M = TypeVar("M", bound=BaseModel)
+
+
+class BatchItem(NamedTuple):
+    index: int
+    request: Optional[Any]
+    errors: Optional[List[Dict[str, Any]]] = None
+
+
+_POOL_LOCK = threading.Lock()
+_POOL: Optional[ThreadPoolExecutor] = None
+
+
+def _batch_pool() -> ThreadPoolExecutor:
+    # One pool for every batch in the process, so concurrent batches share the fetch budget.
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ThreadPoolExecutor(max_workers=max(1, BATCH_CONCURRENCY), thread_name_prefix="trustbot-batch")
+        return _POOL
+
+
+def _parse_item(index: int, raw: Any, model: Type[M]) -> BatchItem:
+    try:
+        return BatchItem(index, model.model_validate(raw))
+    except ValidationError as exc:
+        return BatchItem(index, None, json.loads(exc.json(include_url=False)))
+
+
+async def read_batch(request: Request, model: Type[M]) -> List[BatchItem]:
+    """Parse a JSON array or an NDJSON body into items; an invalid item fails alone, not the batch."""
+    _check_declared_length(request, BATCH_MAX_BYTES)
+    body, _ = await _spool_body(request, BATCH_MAX_BYTES)
+    with body:
+        data = body.read()
+    content_type = request.headers.get("content-type", "").lower()
+
+    if content_type.startswith(NDJSON_TYPES) or not data.lstrip().startswith(b"["):
+        raw_items: List[Any] = []
+        for line in data.splitlines():
+            if not line.strip():
+                continue
+            try:
+                raw_items.append(json.loads(line))
+            except ValueError:
+                raw_items.append(None)
+    else:
+        try:
+            raw_items = json.loads(data)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=f"Batch body is not valid JSON: {exc}") from exc
+
+    if len(raw_items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {BATCH_MAX_ITEMS} items.")
+    return [_parse_item(i, raw, model) for i, raw in enumerate(raw_items)]
+
+
+def _check_url_admitted(url: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    with get_admission().admit_blocking("link") as degraded:
+        return check_url(url, fetch=not degraded)
+
+
+def prepare_v1(requests: Sequence[AnalyzeRequest]) -> Prepared:
+    """Run the text pass over every unique text, then start one check per unique URL on the batch pool.
+
+    Each URL check holds a link admission slot; under link pressure it gets the static checks only.
+    """
+    texts: Dict[str, Dict[str, Any]] = {}
+    urls: Dict[str, "Future[Tuple[Dict[str, Any], Dict[str, Any]]]"] = {}
+    pool = _batch_pool()
+
+    def want(url: str) -> None:
+        if url not in urls:
+            urls[url] = pool.submit(_check_url_admitted, url)
+
+    for req in requests:
+        if req.content_type.value == "text":
+            text = req.text or ""
+            if text not in texts:
+                texts[text] = analyze_text_scam(text)
+                for url in texts[text].get("extracted_urls", []):
+                    want(url)
+        elif req.content_type.value == "link":
+            want(req.url or "")
+    return Prepared(texts, urls)
+
+
+def _after(previous: Optional[Future], compute: Callable[[Any], BaseModel], request: Any) -> BaseModel:
+    if previous is not None:
+        wait([previous])
+    return compute(request)
+
+
+def stream_results(
+    items: Sequence[BatchItem],
+    key: Callable[[Any], Hashable],
+    compute: Callable[[Any], BaseModel],
+    share: bool = True,
+) -> Iterator[bytes]:
+    """Yield one NDJSON line per item, in input order, while items run on the batch pool.
+
+    Items with equal keys share one result when ``share`` is set; otherwise each runs after the
+    previous one with its key has finished, so it can reuse whatever that one stored.
+    """
+    pool = _batch_pool()
+    last: Dict[Hashable, Future] = {}
+    futures: List[Optional[Future]] = []
+    for item in items:
+        if item.request is None:
+            futures.append(None)
+            continue
+        k = key(item.request)
+        previous = last.get(k)
+        if previous is None or not share:
+            # The pool is FIFO, so `previous` is always running or done before this one waits on it.
+            previous = last[k] = pool.submit(_after, previous, compute, item.request)
+        futures.append(previous)
+
+    for item, future in zip(items, futures):
+        if future is None:
+            line: Dict[str, Any] = {"index": item.index, "error": {"status": 422, "detail": item.errors}}
+        else:
+            try:
+                line = {"index": item.index, "result": future.result().model_dump(mode="json")}
+            except HTTPException as exc:
+                line = {"index": item.index, "error": {"status": exc.status_code, "detail": exc.detail}}
+            except Overloaded as exc:
+                line = {"index": item.index, "error": {"status": 429, "detail": str(exc), "retry_after": exc.retry_after}}
+            except Exception as exc:
+                line = {"index": item.index, "error": {"status": 500, "detail": str(exc)}}
+        yield json.dumps(line, ensure_ascii=False).encode("utf-8") + b"\n"
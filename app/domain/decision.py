@@ -1,26 +1,76 @@
 from __future__ import annotations
 
-from collections import Counter
 from typing import Iterable, List, Optional
 
 from app.domain.enums import ArtifactType, EvidenceDirection, InvestigationStatus, V2Verdict
-from app.domain.models import ArtifactRecord, DecisionResult, DecisionTrace, EvidenceItemRecord, NextBestArtifact
+from app.domain.models import (
+    ArtifactRecord,
+    DecisionAggregates,
+    DecisionResult,
+    DecisionTrace,
+    EvidenceItemRecord,
+    NextBestArtifact,
+    RankedReason,
+)
+from app.metrics import DECISION_SECONDS, timed
+
+TOP_REASONS = 4
+# Quality codes a provider reports when it produced no result; the provider does not count as coverage.
+PROVIDER_OUTCOME_CODES = {"timeout": "PROVIDER_TIMEOUT", "error": "PROVIDER_ERROR", "skipped": "PROVIDER_SKIPPED"}
+_NO_RESULT_CODES = frozenset(PROVIDER_OUTCOME_CODES.values())
 
 
 def clamp01(value: float) -> float:
     return max(0.0, min(1.0, value))
 
 
-def _weighted_bucket(items: Iterable[EvidenceItemRecord], direction: EvidenceDirection) -> float:
-    weights = [item.weight for item in items if item.direction == direction]
-    if not weights:
+def accumulate(
+    aggregates: DecisionAggregates,
+    artifacts: Iterable[ArtifactRecord],
+    evidence_items: Iterable[EvidenceItemRecord],
+) -> DecisionAggregates:
+    """Fold a new batch into the running aggregates in O(batch); items must arrive in storage order."""
+    for artifact in artifacts:
+        aggregates.artifact_types.add(artifact.type)
+        aggregates.artifacts_seen += 1
+
+    for item in evidence_items:
+        aggregates.weight_sums[item.direction] += item.weight
+        aggregates.weight_counts[item.direction] += 1
+        if item.code not in _NO_RESULT_CODES:
+            aggregates.providers.add(item.provider)
+        aggregates.codes.add(item.code)
+        if item.direction == EvidenceDirection.RISK:
+            aggregates.risk_codes.add(item.code)
+            aggregates.max_risk_weight = max(aggregates.max_risk_weight, item.weight)
+        _rank_reason(aggregates.top_reasons, RankedReason(summary=item.summary, weight=item.weight, seq=aggregates.evidence_seen))
+        aggregates.evidence_seen += 1
+    return aggregates
+
+
+def _rank_reason(top: List[RankedReason], candidate: RankedReason) -> None:
+    # Keeps the TOP_REASONS distinct summaries ordered by (weight desc, first seen). Weights are
+    # never retracted, so a summary that falls out of the list can only return with a better rank.
+    for i, current in enumerate(top):
+        if current.summary == candidate.summary:
+            if candidate.weight <= current.weight:
+                return
+            del top[i]
+            break
+    top.append(candidate)
+    top.sort(key=lambda reason: (-reason.weight, reason.seq))
+    del top[TOP_REASONS:]
+
+
+def _weighted_bucket(aggregates: DecisionAggregates, direction: EvidenceDirection) -> float:
+    count = aggregates.weight_counts[direction]
+    if not count:
         return 0.0
-    return clamp01(sum(weights) / max(1.5, len(weights)))
+    return clamp01(aggregates.weight_sums[direction] / max(1.5, count))
 
 
-def _coverage_score(evidence_items: List[EvidenceItemRecord]) -> float:
-    providers = {item.provider for item in evidence_items}
-    return clamp01(len(providers) / 4.0)
+def _coverage_score(aggregates: DecisionAggregates) -> float:
+    return clamp01(len(aggregates.providers) / 4.0)
 
 
 def _contradiction_score(risk_score: float, trust_score: float) -> float:
@@ -29,11 +79,8 @@ def _contradiction_score(risk_score: float, trust_score: float) -> float:
     return clamp01(min(risk_score, trust_score))
 
 
-def _headline_for(verdict: V2Verdict, evidence_items: List[EvidenceItemRecord]) -> str:
-    risk_codes = [item.code for item in evidence_items if item.direction == EvidenceDirection.RISK]
-    codes = Counter(risk_codes)
-    top_code = codes.most_common(1)[0][0] if codes else None
-
+def _headline_for(verdict: V2Verdict, aggregates: DecisionAggregates) -> str:
+    risk_codes = aggregates.risk_codes
     if verdict == V2Verdict.RISKY and "SCAM_OTP_REQUEST" in risk_codes:
         return "This looks like a likely OTP scam."
     if verdict == V2Verdict.RISKY and "IMPERSONATION_BRAND_DOMAIN_MISMATCH" in risk_codes:
@@ -51,16 +98,12 @@ def _recommended_action(verdict: V2Verdict) -> str:
     return "Please send the one follow-up artifact below so I can verify this more confidently."
 
 
-def _next_best_artifact(
-    verdict: V2Verdict,
-    artifacts: List[ArtifactRecord],
-    evidence_items: List[EvidenceItemRecord],
-) -> Optional[NextBestArtifact]:
+def _next_best_artifact(verdict: V2Verdict, aggregates: DecisionAggregates) -> Optional[NextBestArtifact]:
     if verdict != V2Verdict.NEED_MORE:
         return None
 
-    artifact_types = {artifact.type for artifact in artifacts}
-    evidence_codes = {item.code for item in evidence_items}
+    artifact_types = aggregates.artifact_types
+    evidence_codes = aggregates.codes
 
     if ArtifactType.IMAGE in artifact_types and "IMG_HEAVY_COMPRESSION" in evidence_codes:
         return NextBestArtifact(
@@ -83,16 +126,19 @@ def _next_best_artifact(
     )
 
 
+@timed(DECISION_SECONDS.labels("decide_investigation"))
 def decide_investigation(artifacts: List[ArtifactRecord], evidence_items: List[EvidenceItemRecord]) -> DecisionResult:
-    risk_score = _weighted_bucket(evidence_items, EvidenceDirection.RISK)
-    trust_score = _weighted_bucket(evidence_items, EvidenceDirection.TRUST)
-    quality_penalty = _weighted_bucket(evidence_items, EvidenceDirection.QUALITY)
-    coverage_score = _coverage_score(evidence_items)
+    return decide_from_aggregates(accumulate(DecisionAggregates(), artifacts, evidence_items))
+
+
+@timed(DECISION_SECONDS.labels("decide_from_aggregates"))
+def decide_from_aggregates(aggregates: DecisionAggregates) -> DecisionResult:
+    risk_score = _weighted_bucket(aggregates, EvidenceDirection.RISK)
+    trust_score = _weighted_bucket(aggregates, EvidenceDirection.TRUST)
+    quality_penalty = _weighted_bucket(aggregates, EvidenceDirection.QUALITY)
+    coverage_score = _coverage_score(aggregates)
     contradiction_score = _contradiction_score(risk_score, trust_score)
-    max_risk_weight = max(
-        (item.weight for item in evidence_items if item.direction == EvidenceDirection.RISK),
-        default=0.0,
-    )
+    max_risk_weight = aggregates.max_risk_weight
 
     confidence = clamp01(max(risk_score, trust_score) * 0.75 + coverage_score * 0.2 - quality_penalty * 0.3)
 
@@ -110,24 +156,18 @@ def decide_investigation(artifacts: List[ArtifactRecord], evidence_items: List[E
         verdict = V2Verdict.NEED_MORE
         status = InvestigationStatus.WAITING_FOR_USER
 
-    unique_reasons: List[str] = []
-    for item in sorted(evidence_items, key=lambda current: current.weight, reverse=True):
-        if item.summary not in unique_reasons:
-            unique_reasons.append(item.summary)
-        if len(unique_reasons) == 4:
-            break
-
+    unique_reasons = [reason.summary for reason in aggregates.top_reasons]
     if not unique_reasons:
         unique_reasons = ["I do not yet have enough high-quality evidence to verify this confidently."]
 
     return DecisionResult(
         verdict=verdict,
         confidence=confidence,
-        headline=_headline_for(verdict, evidence_items),
+        headline=_headline_for(verdict, aggregates),
         reasons=unique_reasons,
         recommended_action=_recommended_action(verdict),
         status=status,
-        next_best_artifact=_next_best_artifact(verdict, artifacts, evidence_items),
+        next_best_artifact=_next_best_artifact(verdict, aggregates),
         trace=DecisionTrace(
             risk_score=risk_score,
             trust_score=trust_score,
@@ -1,9 +1,9 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, ContextManager, Dict, List, Optional, Set
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 from app.domain.enums import ArtifactType, EvidenceDirection, InvestigationStatus, V2Verdict
 
@@ -41,8 +41,21 @@ class ArtifactRecord(BaseModel):
     source_channel: str = "api"
     text_content: Optional[str] = None
     payload: Dict[str, Any] = Field(default_factory=dict)
+    blob_sha256: Optional[str] = None
+    blob_size: Optional[int] = None
     created_at: datetime
 
+    _blob_opener: Optional[Callable[[str], ContextManager[Any]]] = PrivateAttr(default=None)
+
+    def bind_blob_opener(self, opener: Callable[[str], ContextManager[Any]]) -> "ArtifactRecord":
+        self._blob_opener = opener
+        return self
+
+    def open_blob(self) -> Optional[ContextManager[Any]]:
+        if self.blob_sha256 is None or self._blob_opener is None:
+            return None
+        return self._blob_opener(self.blob_sha256)
+
 
 class EvidenceItemRecord(BaseModel):
     evidence_id: str
@@ -79,3 +92,27 @@ class DecisionResult(BaseModel):
     status: InvestigationStatus
     next_best_artifact: Optional[NextBestArtifact] = None
     trace: DecisionTrace
+
+
+class RankedReason(BaseModel):
+    summary: str
+    weight: float
+    seq: int
+
+
+class DecisionAggregates(BaseModel):
+    weight_sums: Dict[EvidenceDirection, float] = Field(default_factory=lambda: {d: 0.0 for d in EvidenceDirection})
+    weight_counts: Dict[EvidenceDirection, int] = Field(default_factory=lambda: {d: 0 for d in EvidenceDirection})
+    max_risk_weight: float = 0.0
+    providers: Set[str] = Field(default_factory=set)
+    codes: Set[str] = Field(default_factory=set)
+    risk_codes: Set[str] = Field(default_factory=set)
+    top_reasons: List[RankedReason] = Field(default_factory=list)
+    artifact_types: Set[ArtifactType] = Field(default_factory=set)
+    artifacts_seen: int = 0
+    evidence_seen: int = 0
+
+
+class DecisionSnapshot(BaseModel):
+    aggregates: DecisionAggregates
+    decision: DecisionResult
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+# Threads for CPU-bound pipeline work called from async handlers (text pass, batch preparation).
+CPU_CONCURRENCY = int(os.environ.get("TRUSTBOT_CPU_CONCURRENCY", str(os.cpu_count() or 4)))
+# Threads for blocking calls made from async handlers: v2 service/store calls and media engine waits.
+BLOCKING_CONCURRENCY = int(os.environ.get("TRUSTBOT_BLOCKING_CONCURRENCY", "64"))
+
+T = TypeVar("T")
+
+_POOLS: Dict[str, ThreadPoolExecutor] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def _pool(name: str, workers: int) -> ThreadPoolExecutor:
+    with _POOLS_LOCK:
+        pool = _POOLS.get(name)
+        if pool is None:
+            pool = _POOLS[name] = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix=f"trustbot-{name}")
+        return pool
+
+
+async def run_cpu(fn: Callable[..., T], *args: Any) -> T:
+    """Run CPU-bound ``fn`` off the event loop, on threads sized by ``TRUSTBOT_CPU_CONCURRENCY``."""
+    return await asyncio.get_running_loop().run_in_executor(_pool("cpu", CPU_CONCURRENCY), partial(fn, *args))
+
+
+async def run_blocking(fn: Callable[..., T], *args: Any) -> T:
+    """Run a blocking call off the event loop, on threads sized by ``TRUSTBOT_BLOCKING_CONCURRENCY``.
+
+    Kept apart from the CPU threads so a burst of slow v2 or media calls cannot queue text checks.
+    """
+    return await asyncio.get_running_loop().run_in_executor(_pool("blocking", BLOCKING_CONCURRENCY), partial(fn, *args))
+
+
+def executor_stats() -> Dict[str, Dict[str, Optional[int]]]:
+    with _POOLS_LOCK:
+        pools = dict(_POOLS)
+    # ThreadPoolExecutor keeps its backlog in a SimpleQueue; qsize() is approximate but cheap.
+    return {name: {"threads": len(pool._threads), "max_threads": pool._max_workers, "queued": pool._work_queue.qsize()} for name, pool in pools.items()}
@@ -1,18 +1,99 @@
 from __future__ import annotations
 
-from fastapi import FastAPI
+from typing import Any, BinaryIO, Dict, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import ValidationError
+from app.admission import Overloaded, get_admission, request_cost
 from app.api.investigations import router as investigations_router
+from app.batch import prepare_v1, read_batch, stream_results
+from app.executors import executor_stats, run_blocking, run_cpu
+from app.metrics import REASON_CODES, VERDICTS, render_metrics
 from app.models import AnalyzeRequest, AnalyzeResponse
-from app.router import route_and_analyze
+from app.router import Prepared, coalesced_route_and_analyze_async, request_receipt, route_and_analyze
 from app.fusion import fuse
 from app.evidence import maybe_request_evidence
+from app.pipelines.extraction_cache import get_extraction_cache
+from app.pipelines.fetcher import get_fetcher
+from app.pipelines.image_hash import get_known_image_index
+from app.pipelines.media_engine import MediaEngineBusy, get_media_engine
+from app.pipelines.provenance_cache import get_provenance_cache
+from app.singleflight import SingleFlightTimeout, singleflight_stats
+from app.storage import get_ephemeral_store
+from app.uploads import receive_upload
 
 app = FastAPI(title="WhatsApp Trust Bot", version="0.3.0")
 app.include_router(investigations_router)
 
+UPLOAD_HEADERS = {
+    "content_type": "X-Content-Type",
+    "file_name": "X-File-Name",
+    "file_mime": "X-File-Mime",
+    "locale": "X-Locale",
+    "user_id": "X-User-Id",
+}
+
+@app.exception_handler(MediaEngineBusy)
+def media_engine_busy(request: Request, exc: MediaEngineBusy) -> JSONResponse:
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+@app.exception_handler(SingleFlightTimeout)
+def singleflight_timeout(request: Request, exc: SingleFlightTimeout) -> JSONResponse:
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+@app.exception_handler(Overloaded)
+def overloaded(request: Request, exc: Overloaded) -> JSONResponse:
+    return JSONResponse(status_code=429, content={"detail": str(exc)}, headers={"Retry-After": str(exc.retry_after)})
+
 @app.post("/v1/analyze", response_model=AnalyzeResponse)
-def analyze(req: AnalyzeRequest) -> AnalyzeResponse:
-    routed = route_and_analyze(req)
+async def analyze(req: AnalyzeRequest) -> AnalyzeResponse:
+    # Identical concurrent requests share one analysis. Batch items are deduped by the batch itself,
+    # and an upload's stream is not hashed before routing, so neither goes through the single-flight.
+    async with get_admission().admit(request_cost(req)) as degraded:
+        routed, shared = await coalesced_route_and_analyze_async(req, fetch=not degraded)
+    return _respond(req, routed, shared)
+
+@app.post("/v1/analyze/upload", response_model=AnalyzeResponse)
+async def analyze_upload(request: Request) -> AnalyzeResponse:
+    upload = await receive_upload(request, UPLOAD_HEADERS)
+    try:
+        try:
+            req = AnalyzeRequest(
+                content_type=upload.fields.get("content_type") or "document",
+                file_name=upload.file_name,
+                file_mime=upload.file_mime,
+                locale=upload.fields.get("locale") or "en_IN",
+                user_id=upload.fields.get("user_id"),
+            )
+        except ValidationError as exc:
+            raise RequestValidationError(exc.errors()) from exc
+        if req.content_type.value not in ("image", "document"):
+            raise HTTPException(status_code=422, detail="Uploads must be content_type image or document.")
+        async with get_admission().admit(request_cost(req)):
+            return await run_blocking(_analyze, req, upload.file)
+    finally:
+        upload.file.close()
+
+@app.post("/v1/analyze:batch")
+async def analyze_batch(request: Request) -> StreamingResponse:
+    """JSON array or NDJSON of AnalyzeRequest in, one NDJSON line per item out, in input order."""
+    items = await read_batch(request, AnalyzeRequest)
+    prepared = await run_cpu(prepare_v1, [item.request for item in items if item.request is not None])
+    results = stream_results(items, request_receipt, lambda req: _analyze_batch_item(req, prepared))
+    return StreamingResponse(results, media_type="application/x-ndjson")
+
+def _analyze_batch_item(req: AnalyzeRequest, prepared: Prepared) -> AnalyzeResponse:
+    # Link fetches were admitted once per URL by prepare_v1, so a link item only pays for its text pass.
+    cost = request_cost(req)
+    with get_admission().admit_blocking("text" if cost == "link" else cost):
+        return _analyze(req, prepared=prepared)
+
+def _analyze(req: AnalyzeRequest, media: Optional[BinaryIO] = None, prepared: Optional[Prepared] = None) -> AnalyzeResponse:
+    return _respond(req, route_and_analyze(req, media, prepared))
+
+def _respond(req: AnalyzeRequest, routed: Dict[str, Any], shared: bool = False) -> AnalyzeResponse:
     fused = fuse(routed["signals"], quality_penalty=routed.get("quality_penalty", 0.0))
     evidence = maybe_request_evidence(fused["verdict"], fused["confidence"], req.content_type.value, routed["reason_codes"])
 
@@ -26,16 +107,38 @@ def analyze(req: AnalyzeRequest) -> AnalyzeResponse:
         else:
             next_step = "Uncertain. Verify source and ask for the original file/link."
 
-    return AnalyzeResponse(
+    response = AnalyzeResponse(
         verdict=fused["verdict"],
         confidence=float(fused["confidence"]),
         reasons=routed["reasons"][:8],
         reason_codes=list(dict.fromkeys(routed["reason_codes"]))[:12],
         next_step=next_step,
         evidence_request=evidence,
-        debug={"risk": fused["risk"], **routed["debug"]},
+        debug={"risk": fused["risk"], **routed["debug"], **({"coalesced": True} if shared else {})},
     )
+    VERDICTS.labels("v1", response.verdict.value).inc()
+    for code in response.reason_codes:
+        REASON_CODES.labels("v1", code.value).inc()
+    return response
 
 @app.get("/healthz")
 def healthz():
     return {"ok": True}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/stats")
+def stats():
+    return {
+        "media_engine": get_media_engine().stats(),
+        "extraction_cache": get_extraction_cache().stats(),
+        "provenance_cache": get_provenance_cache().stats(),
+        "fetcher": get_fetcher().stats(),
+        "known_images": get_known_image_index().stats(),
+        "ephemeral_store": get_ephemeral_store().stats(),
+        "singleflight": singleflight_stats(),
+        "executors": executor_stats(),
+        "admission": get_admission().stats(),
+    }
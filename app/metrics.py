@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import functools
+import inspect
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Sequence, Tuple, TypeVar
+
+# Upper bounds in seconds, shared by every latency histogram: sub-millisecond text checks up to slow OCR.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class HistogramSeries:
+    """One labelled series; bucket counts are allocated once, so ``observe`` only bisects and adds."""
+
+    __slots__ = ("_bounds", "_counts", "_sum", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]) -> None:
+        self._bounds = bounds
+        self._counts = [0] * (len(bounds) + 1)  # the last slot is +Inf
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        i = bisect_left(self._bounds, seconds)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += seconds
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        with self._lock:
+            return list(self._counts), self._sum
+
+
+class CounterSeries:
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self) -> None:
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), register: bool = True) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+        if register:
+            with _REGISTRY_LOCK:
+                _REGISTRY.append(self)
+
+    @abstractmethod
+    def _new(self) -> Any: ...
+
+    def labels(self, *values: str) -> Any:
+        """The series for ``values``. Hot paths bind this once and keep it, rather than look it up per call."""
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {values}")
+        series = self._series.get(values)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(values, self._new())
+        return series
+
+    def _items(self) -> List[Tuple[Tuple[str, ...], Any]]:
+        with self._lock:
+            return sorted(self._series.items())
+
+    @abstractmethod
+    def _render(self, out: List[str]) -> None: ...
+
+    def render(self, out: List[str]) -> None:
+        out.append(f"# HELP {self.name} {self.help}")
+        out.append(f"# TYPE {self.name} {self.kind}")
+        self._render(out)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+        register: bool = True,
+    ) -> None:
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames, register)
+
+    def _new(self) -> HistogramSeries:
+        return HistogramSeries(self.buckets)
+
+    def _render(self, out: List[str]) -> None:
+        for values, series in self._items():
+            counts, total = series.snapshot()
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                out.append(f"{self.name}_bucket{_labels(self.labelnames, values, le)} {cumulative}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, values)} {total!r}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, values)} {cumulative}")
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new(self) -> CounterSeries:
+        return CounterSeries()
+
+    def _render(self, out: List[str]) -> None:
+        for values, series in self._items():
+            out.append(f"{self.name}{_labels(self.labelnames, values)} {series.value}")
+
+
+def timed(series: HistogramSeries) -> Callable[[F], F]:
+    """Record each call's wall time (monotonic ``perf_counter``) in ``series``, errors included."""
+
+    def wrap(fn: F) -> F:
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def timed_async(*args: Any, **kwargs: Any) -> Any:
+                started = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    series.observe(time.perf_counter() - started)
+
+            return timed_async  # type: ignore[return-value]
+
+        @functools.wraps(fn)
+        def timed_call(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                series.observe(time.perf_counter() - started)
+
+        return timed_call  # type: ignore[return-value]
+
+    return wrap
+
+
+_REGISTRY: List[_Metric] = []
+_REGISTRY_LOCK = threading.Lock()
+
+
+def render_metrics() -> str:
+    """Every registered metric in the Prometheus text exposition format (version 0.0.4)."""
+    with _REGISTRY_LOCK:
+        metrics = list(_REGISTRY)
+    out: List[str] = []
+    for metric in metrics:
+        metric.render(out)
+    return "\n".join(out) + "\n"
+
+
+# Metrics are per process: with several uvicorn workers, scrape each one (or sum them) upstream.
+PIPELINE_SECONDS = Histogram("trustbot_pipeline_seconds", "Time spent in each v1 analysis pipeline.", ("pipeline",))
+PROVIDER_SECONDS = Histogram("trustbot_provider_seconds", "Time from submitting a v2 evidence provider to its result.", ("provider",))
+PROVIDER_OUTCOMES = Counter("trustbot_provider_outcomes_total", "v2 evidence provider runs by outcome.", ("provider", "outcome"))
+STORE_SECONDS = Histogram("trustbot_store_seconds", "Time spent in each V2Store query.", ("query",))
+DEFERRED_FAILURES = Counter("trustbot_deferred_failures_total", "v2 deferred provider runs whose evidence was lost to an error.")
+DECISION_SECONDS = Histogram("trustbot_decision_seconds", "Time spent deciding a v2 investigation.", ("function",))
+VERDICTS = Counter("trustbot_verdicts_total", "Verdicts returned, by API version.", ("api", "verdict"))
+REASON_CODES = Counter("trustbot_reason_codes_total", "Reason codes returned (v1) or evidence codes recorded (v2).", ("api", "code"))
@@ -3,21 +3,34 @@ from __future__ import annotations
 import base64
 import io
 import os
-from typing import Dict, Any, List, Tuple, Optional
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Dict, Any, List, Tuple, Optional, Union, BinaryIO
+
+from PIL import Image
 
 from app.models import ReasonCode
+from app.pipelines.extraction_cache import content_digest, get_extraction_cache
+from app.pipelines.ocr_engine import OCR_THREADS, OcrUnavailable, get_ocr_engine
 from app.pipelines.scam_text import analyze_text_scam
 
-def _tesseract_cmd() -> Optional[str]:
-    return os.environ.get("TESSERACT_CMD")
+# Raw bytes or any seekable binary file object (e.g. an mmap'd blob).
+DocumentSource = Union[bytes, bytearray, BinaryIO]
 
-def _try_import_ocr():
-    try:
-        import pytesseract  # type: ignore
-        from PIL import Image  # type: ignore
-        return pytesseract, Image, None
-    except Exception as e:
-        return None, None, str(e)
+# Pages are read until analyze_text_scam has TEXT_SCAN_CHARS to look at, up to PDF_MAX_PAGES.
+PDF_MAX_PAGES = int(os.environ.get("TRUSTBOT_PDF_MAX_PAGES", "20"))
+TEXT_SCAN_CHARS = 4000
+OCR_DPI = 200
+# Scanned pages rasterized and waiting for (or in) OCR at once; a 200 dpi page is ~11 MB of RGB.
+OCR_MAX_PENDING = max(1, OCR_THREADS)
+
+_OCR_POOL: Optional[ThreadPoolExecutor] = None
+_OCR_POOL_LOCK = threading.Lock()
+
+def _as_stream(data: DocumentSource) -> BinaryIO:
+    return io.BytesIO(data) if isinstance(data, (bytes, bytearray)) else data
 
 def _try_import_pdf():
     try:
@@ -26,51 +39,163 @@ def _try_import_pdf():
     except Exception as e:
         return None, str(e)
 
-def _ocr_image_bytes(img_bytes: bytes) -> str:
-    pytesseract, Image, err = _try_import_ocr()
-    if pytesseract is None:
-        raise RuntimeError(f"OCR deps missing: {err}")
-
-    cmd = _tesseract_cmd()
-    if cmd:
-        pytesseract.pytesseract.tesseract_cmd = cmd
-
-    img = Image.open(io.BytesIO(img_bytes))
-    return pytesseract.image_to_string(img)
-
-def _extract_pdf_text(pdf_bytes: bytes, max_pages: int = 3) -> str:
+def _ocr_image(img: Any) -> str:
+    return get_ocr_engine().image_to_string(img)
+
+def _ocr_image_bytes(img_bytes: DocumentSource) -> str:
+    return _ocr_image(Image.open(_as_stream(img_bytes)))
+
+def _ocr_pool() -> ThreadPoolExecutor:
+    global _OCR_POOL
+    with _OCR_POOL_LOCK:
+        if _OCR_POOL is None:
+            _OCR_POOL = ThreadPoolExecutor(max_workers=max(1, OCR_THREADS), thread_name_prefix="trustbot-ocr")
+        return _OCR_POOL
+
+def _ocr_page(image: Any) -> Tuple[str, float]:
+    started = time.monotonic()
+    text = _ocr_image(image)
+    return text, round((time.monotonic() - started) * 1000.0, 2)
+
+def _extract_pdf_text(
+    pdf_bytes: DocumentSource,
+    max_pages: int = PDF_MAX_PAGES,
+    max_chars: int = TEXT_SCAN_CHARS,
+    page_log: Optional[List[Dict[str, Any]]] = None,
+) -> str:
+    """Text of the first pages, in order, stopping once ``max_chars`` have been collected.
+
+    Pages without a text layer are rasterized and OCRed on a thread pool while later pages are
+    parsed, with at most ``OCR_MAX_PENDING`` of them in flight. pdfminer holds the GIL, so
+    text-layer pages are parsed in order on this thread; the early stop is what bounds their
+    cost. ``page_log`` receives per-page source, size and timing.
+    """
     pdfplumber, err = _try_import_pdf()
     if pdfplumber is None:
         raise RuntimeError(f"PDF deps missing: {err}")
 
-    text_parts = []
-    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+    ocr_available = _ocr_version_or_none() is not None
+    texts: List[str] = []
+    log: List[Dict[str, Any]] = []
+    pending: Dict[int, Future] = {}
+
+    def settle(index: int) -> int:
+        entry = log[index]
+        try:
+            text, ms = pending.pop(index).result()
+        except Exception as exc:
+            entry.update(source="ocr_failed", error=str(exc))
+            return 0
+        texts[index] = (text or "").strip()
+        entry.update(chars=len(texts[index]), ms=ms)
+        return len(texts[index])
+
+    collected = 0
+    with pdfplumber.open(_as_stream(pdf_bytes)) as pdf:
         for i, page in enumerate(pdf.pages[:max_pages]):
-            text_parts.append(page.extract_text() or "")
-    return "\n".join(text_parts).strip()
+            collected += sum(settle(j) for j in [j for j, f in pending.items() if f.done()])
+            if collected >= max_chars:
+                break
+            started = time.monotonic()
+            text = (page.extract_text() or "").strip()
+            entry: Dict[str, Any] = {"page": i + 1, "source": "text" if text else "none", "chars": len(text)}
+            if not text and ocr_available:
+                # At most one raster per OCR thread is held: wait for the oldest page, and stop if
+                # it brought in enough text instead of rasterizing another.
+                while len(pending) >= OCR_MAX_PENDING:
+                    collected += settle(min(pending))
+                if collected >= max_chars:
+                    break
+                image = page.to_image(resolution=OCR_DPI).original
+                entry.update(source="ocr", raster_ms=round((time.monotonic() - started) * 1000.0, 2))
+                pending[i] = _ocr_pool().submit(_ocr_page, image)
+            else:
+                entry["ms"] = round((time.monotonic() - started) * 1000.0, 2)
+                collected += len(text)
+            texts.append(text)
+            log.append(entry)
+        # Anything still pending comes from earlier pages, so it is part of the ordered text.
+        for j in list(pending):
+            settle(j)
+
+    if page_log is not None:
+        page_log.extend(log)
+    return "\n".join(t for t in texts if t).strip()
+
+def _ocr_engine_version() -> str:
+    engine = get_ocr_engine()
+    return f"{engine.name}-{engine.version}"
+
+def _ocr_version_or_none() -> Optional[str]:
+    # Scanned PDF pages fall back to OCR only when it is installed; the PDF path works without it.
+    try:
+        return _ocr_engine_version()
+    except OcrUnavailable:
+        return None
+
+def _pdf_engine_version() -> str:
+    pdfplumber, err = _try_import_pdf()
+    if pdfplumber is None:
+        raise RuntimeError(f"PDF deps missing: {err}")
+    ocr = _ocr_version_or_none() or "no-ocr"
+    return f"pdfplumber-{getattr(pdfplumber, '__version__', 'unknown')}-p{PDF_MAX_PAGES}-{ocr}"
+
+def _cached_extract(raw: DocumentSource, digest: Optional[str], method: str, engine: str, extract: Callable[[DocumentSource], str]) -> Tuple[str, str]:
+    cache = get_extraction_cache()
+    if not cache.enabled:
+        return extract(raw), "off"
+    if digest is None:
+        digest, size = content_digest(raw)
+    elif hasattr(raw, "__len__"):
+        size = len(raw)
+    else:
+        size = raw.seek(0, io.SEEK_END)
+        raw.seek(0)
+    cached = cache.get(digest, method, engine)
+    if cached is not None:
+        return cached, "hit"
+    text = extract(raw)
+    cache.put(digest, method, engine, text, source_bytes=size)
+    return text, "miss"
+
+def _missing_document() -> Dict[str, Any]:
+    return {"signals": [("missing_document", 0.5)], "reasons": ["No file provided."], "reason_codes": [ReasonCode.DOC_OCR_UNAVAILABLE], "quality_penalty": 1.0, "debug": {"name": "document_ocr", "error": "missing"}}
 
 def analyze_document(file_b64: str, mime: Optional[str], name: Optional[str]) -> Dict[str, Any]:
+    if not file_b64:
+        return _missing_document()
+    return analyze_document_data(base64.b64decode(file_b64), mime=mime, name=name)
+
+def analyze_document_data(
+    raw: Optional[DocumentSource],
+    mime: Optional[str],
+    name: Optional[str],
+    digest: Optional[str] = None,
+) -> Dict[str, Any]:
+    # `digest` is the sha256 of the raw bytes when the caller already knows it (v2 blobs).
     signals: List[Tuple[str, float]] = []
     reasons: List[str] = []
     reason_codes: List[ReasonCode] = []
     quality_penalty = 0.0
 
-    if not file_b64:
-        return {"signals": [("missing_document", 0.5)], "reasons": ["No file provided."], "reason_codes": [ReasonCode.DOC_OCR_UNAVAILABLE], "quality_penalty": 1.0, "debug": {"name": "document_ocr", "error": "missing"}}
+    if raw is None or (isinstance(raw, (bytes, bytearray)) and not raw):
+        return _missing_document()
 
-    raw = base64.b64decode(file_b64)
     mt = (mime or "").lower()
     nm = (name or "").lower()
 
     extracted = ""
     method = None
+    cache_state = "off"
+    pages: List[Dict[str, Any]] = []
     try:
         if "pdf" in mt or nm.endswith(".pdf"):
-            extracted = _extract_pdf_text(raw)
             method = "pdf_text"
+            extract = partial(_extract_pdf_text, page_log=pages)
+            extracted, cache_state = _cached_extract(raw, digest, method, _pdf_engine_version(), extract)
         else:
-            extracted = _ocr_image_bytes(raw)
             method = "ocr_image"
+            extracted, cache_state = _cached_extract(raw, digest, method, _ocr_engine_version(), _ocr_image_bytes)
     except Exception as e:
         reasons.append("Document OCR/text extraction is not available in this environment.")
         reasons.append("Install optional OCR deps (requirements-ocr.txt) and Tesseract, or send the content as text.")
@@ -83,7 +208,7 @@ def analyze_document(file_b64: str, mime: Optional[str], name: Optional[str]) ->
     if extracted:
         reason_codes.append(ReasonCode.DOC_TEXT_EXTRACTED)
         # run scam heuristics on extracted text
-        out = analyze_text_scam(extracted[:4000])
+        out = analyze_text_scam(extracted[:TEXT_SCAN_CHARS])
         signals += out["signals"]
         reasons += ["Extracted text analyzed:"] + out["reasons"]
         reason_codes += out["reason_codes"]
@@ -93,4 +218,7 @@ def analyze_document(file_b64: str, mime: Optional[str], name: Optional[str]) ->
         reason_codes.append(ReasonCode.DOC_OCR_UNAVAILABLE)
         quality_penalty = 0.6
 
-    return {"signals": signals, "reasons": reasons, "reason_codes": reason_codes, "quality_penalty": quality_penalty, "debug": {"name": "document_ocr", "method": method, "mime": mt, "name": nm, "extracted_chars": len(extracted)}}
+    debug = {"name": "document_ocr", "method": method, "cache": cache_state, "mime": mt, "name": nm, "extracted_chars": len(extracted)}
+    if pages:
+        debug["pages"] = pages
+    return {"signals": signals, "reasons": reasons, "reason_codes": reason_codes, "quality_penalty": quality_penalty, "debug": debug}
@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, Optional, Tuple, Union
+
+EXTRACTION_CACHE_PATH = os.environ.get("TRUSTBOT_EXTRACTION_CACHE_PATH", os.path.join("data", "trustbot_extraction_cache.db"))
+EXTRACTION_CACHE_MAX_BYTES = int(os.environ.get("TRUSTBOT_EXTRACTION_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+HASH_CHUNK = 1024 * 1024
+_ENTRY_OVERHEAD = 128
+# Rows removed per eviction round; keeps a burst of inserts from evicting one row at a time.
+EVICT_BATCH = 64
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS extractions (
+        key TEXT PRIMARY KEY,
+        method TEXT NOT NULL,
+        text TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        source_bytes INTEGER NOT NULL,
+        last_used REAL NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_extractions_last_used ON extractions (last_used)",
+    "CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+)
+COUNTERS = ("hits", "misses", "evictions", "bytes_saved", "bytes")
+
+
+def content_digest(data: Union[bytes, bytearray, BinaryIO]) -> Tuple[str, int]:
+    """sha256 and size of raw bytes or a seekable file object (rewound afterwards)."""
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(data).hexdigest(), len(data)
+    hasher = hashlib.sha256()
+    size = 0
+    data.seek(0)
+    while chunk := data.read(HASH_CHUNK):
+        hasher.update(chunk)
+        size += len(chunk)
+    data.seek(0)
+    return hasher.hexdigest(), size
+
+
+class ExtractionCache:
+    """On-disk cache of extracted document text, shared by the API and media worker processes.
+
+    Keys combine the sha256 of the raw bytes, the extraction method and the engine version,
+    so upgrading pdfplumber or Tesseract naturally misses. Entries are evicted least recently
+    used first once their total size passes ``max_bytes``. Counters live in the same SQLite
+    file, so ``stats()`` covers hits served by every worker.
+    """
+
+    def __init__(self, path: Union[str, Path] = EXTRACTION_CACHE_PATH, max_bytes: int = EXTRACTION_CACHE_MAX_BYTES) -> None:
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        # Lookups read outside any write transaction; their counter deltas wait here for the next write.
+        self._pending: Dict[str, int] = {}
+        self._pending_lock = threading.Lock()
+        if self.enabled:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self._write() as conn:
+                for statement in SCHEMA:
+                    conn.execute(statement)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        # Take the write lock up front: several worker processes share the file, and a deferred
+        # transaction that reads first can fail to upgrade instead of waiting.
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @staticmethod
+    def _key(digest: str, method: str, engine: str) -> str:
+        return f"{digest}:{method}:{engine}"
+
+    @staticmethod
+    def _bump(conn: sqlite3.Connection, **deltas: int) -> None:
+        conn.executemany(
+            "INSERT INTO counters (name, value) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            [(name, delta) for name, delta in deltas.items() if delta],
+        )
+
+    def _count(self, **deltas: int) -> None:
+        with self._pending_lock:
+            for name, delta in deltas.items():
+                self._pending[name] = self._pending.get(name, 0) + delta
+
+    def _flush(self, conn: sqlite3.Connection) -> None:
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        self._bump(conn, **pending)
+
+    def get(self, digest: str, method: str, engine: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        key = self._key(digest, method, engine)
+        try:
+            # A plain autocommit read: lookups from every worker run in parallel under WAL.
+            row = self._connect().execute("SELECT text, source_bytes FROM extractions WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error:
+            # A busy or broken cache file must never fail the extraction itself.
+            return None
+        if row is None:
+            self._count(misses=1)
+            return None
+        try:
+            # The only write on a hit is the recency update (plus any counters waiting to be flushed).
+            with self._write() as conn:
+                conn.execute("UPDATE extractions SET last_used = ? WHERE key = ?", (time.time(), key))
+                self._bump(conn, hits=1, bytes_saved=row[1])
+                self._flush(conn)
+        except sqlite3.Error:
+            self._count(hits=1, bytes_saved=row[1])
+        return row[0]
+
+    def put(self, digest: str, method: str, engine: str, text: str, source_bytes: int) -> None:
+        if not self.enabled:
+            return
+        key = self._key(digest, method, engine)
+        size = _ENTRY_OVERHEAD + len(key) + len(text.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        try:
+            self._put(key, method, text, size, source_bytes)
+        except sqlite3.Error:
+            pass
+
+    def _put(self, key: str, method: str, text: str, size: int, source_bytes: int) -> None:
+        with self._write() as conn:
+            old = conn.execute("SELECT size FROM extractions WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO extractions (key, method, text, size, source_bytes, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, method, text, size, source_bytes, time.time()),
+            )
+            self._bump(conn, bytes=size - (old[0] if old else 0))
+            self._flush(conn)
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        total = self._counter(conn, "bytes")
+        while total > self.max_bytes:
+            rows = conn.execute("SELECT key, size FROM extractions ORDER BY last_used LIMIT ?", (EVICT_BATCH,)).fetchall()
+            if not rows:
+                break
+            freed = evicted = 0
+            for key, size in rows:
+                if total - freed <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM extractions WHERE key = ?", (key,))
+                freed += size
+                evicted += 1
+            self._bump(conn, bytes=-freed, evictions=evicted)
+            total -= freed
+
+    @staticmethod
+    def _counter(conn: sqlite3.Connection, name: str) -> int:
+        row = conn.execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()
+        return int(row[0]) if row else 0
+
+    def stats(self) -> Dict[str, Any]:
+        if not self.enabled:
+            return {"enabled": False}
+        if self._pending:
+            try:
+                with self._write() as conn:
+                    self._flush(conn)
+            except sqlite3.Error:
+                pass
+        conn = self._connect()
+        counters = {name: self._counter(conn, name) for name in COUNTERS}
+        entries = conn.execute("SELECT COUNT(*) FROM extractions").fetchone()[0]
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            "enabled": True,
+            **counters,
+            "entries": entries,
+            "max_bytes": self.max_bytes,
+            "hit_rate": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+        }
+
+
+_CACHE: Optional[ExtractionCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_extraction_cache() -> ExtractionCache:
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = ExtractionCache()
+        return _CACHE
@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urljoin
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+USER_AGENT = "TrustBotMVP/0.2"
+DEFAULT_POOL_SIZE = int(os.environ.get("TRUSTBOT_FETCH_POOL_SIZE", "32"))
+# Outbound fetches in flight at once on the async path; further fetches wait for a connection.
+ASYNC_FETCH_CONCURRENCY = int(os.environ.get("TRUSTBOT_ASYNC_FETCH_CONCURRENCY", "256"))
+MAX_REDIRECTS = 10
+CHUNK_SIZE = 16_384
+
+
+class PooledFetcher:
+    """Shared keep-alive fetcher that streams bodies under a byte cap and a total deadline.
+
+    A fetch holds one of ``pool_size`` slots for its whole run, so no host pool ever runs out of
+    connections; waiting for a slot counts against the fetch's deadline. (urllib3's own blocking
+    pool would wait for a connection with no timeout at all.)
+    """
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE, max_redirects: int = MAX_REDIRECTS) -> None:
+        self.max_redirects = max_redirects
+        self.pool_size = max(1, pool_size)
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, pool_block=False, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._slots = threading.BoundedSemaphore(self.pool_size)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.pool_timeouts = 0
+
+    def fetch(
+        self,
+        url: str,
+        timeout: float = 6.0,
+        max_bytes: int = 200_000,
+        stop_when: Optional[Callable[[bytes], bool]] = None,
+        stop_overlap: int = 64,
+    ) -> Dict[str, Any]:
+        deadline = time.monotonic() + timeout
+        if not self._slots.acquire(timeout=max(0.0, timeout)):
+            with self._lock:
+                self.pool_timeouts += 1
+            return {"ok": False, "error": "deadline exceeded waiting for a connection", "chain": [url]}
+        with self._lock:
+            self.in_flight += 1
+        try:
+            return self._fetch(url, deadline, max_bytes, stop_when, stop_overlap)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+
+    def _fetch(
+        self,
+        url: str,
+        deadline: float,
+        max_bytes: int,
+        stop_when: Optional[Callable[[bytes], bool]],
+        stop_overlap: int,
+    ) -> Dict[str, Any]:
+        chain = [url]
+        current = url
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return {"ok": False, "error": "deadline exceeded", "chain": chain}
+                r = self.session.get(current, allow_redirects=False, stream=True, timeout=remaining)
+                if not r.is_redirect:
+                    break
+                r.close()
+                if len(chain) > self.max_redirects:
+                    return {"ok": False, "error": f"exceeded {self.max_redirects} redirects", "chain": chain}
+                current = urljoin(current, r.headers["location"])
+                chain.append(current)
+
+            with r:
+                content, stopped = self._read_capped(r, deadline, max_bytes, stop_when, stop_overlap)
+            ct = (r.headers.get("Content-Type") or "").lower()
+            return {
+                "ok": True,
+                "final_url": current,
+                "status": r.status_code,
+                "chain": chain,
+                "content_type": ct,
+                "content": content,
+                "bytes_read": len(content),
+                "stopped": stopped,
+                "matched": stopped == "matched",
+            }
+        except Exception as e:
+            return {"ok": False, "error": str(e)}
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"pool_size": self.pool_size, "in_flight": self.in_flight, "pool_timeouts": self.pool_timeouts}
+
+    def _read_capped(
+        self,
+        r: requests.Response,
+        deadline: float,
+        max_bytes: int,
+        stop_when: Optional[Callable[[bytes], bool]],
+        stop_overlap: int,
+    ) -> tuple[bytes, str]:
+        buf = bytearray()
+        for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+            if not chunk:
+                continue
+            start = len(buf)
+            buf += chunk[: max_bytes - start]
+            # Re-scan a small overlap so markers split across chunk boundaries are still seen.
+            if stop_when is not None and stop_when(bytes(buf[max(0, start - stop_overlap):])):
+                return bytes(buf), "matched"
+            if len(buf) >= max_bytes:
+                return bytes(buf), "max_bytes"
+            if time.monotonic() >= deadline:
+                return bytes(buf), "deadline"
+        return bytes(buf), "eof"
+
+
+class AsyncFetcher:
+    """PooledFetcher for the event loop: the same redirect, byte-cap, stop and deadline rules on httpx.
+
+    ``pool_size`` caps connections, and so concurrent fetches; a fetch waits for a free connection
+    within its own deadline rather than holding a thread.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = ASYNC_FETCH_CONCURRENCY,
+        max_redirects: int = MAX_REDIRECTS,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        self.max_redirects = max_redirects
+        self.client = httpx.AsyncClient(
+            headers={"User-Agent": USER_AGENT},
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            follow_redirects=False,
+            transport=transport,
+        )
+
+    async def fetch(
+        self,
+        url: str,
+        timeout: float = 6.0,
+        max_bytes: int = 200_000,
+        stop_when: Optional[Callable[[bytes], bool]] = None,
+        stop_overlap: int = 64,
+    ) -> Dict[str, Any]:
+        deadline = time.monotonic() + timeout
+        chain = [url]
+        current = url
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return {"ok": False, "error": "deadline exceeded", "chain": chain}
+                r = await self.client.send(self.client.build_request("GET", current, timeout=remaining), stream=True)
+                if not r.has_redirect_location:
+                    break
+                await r.aclose()
+                if len(chain) > self.max_redirects:
+                    return {"ok": False, "error": f"exceeded {self.max_redirects} redirects", "chain": chain}
+                current = urljoin(current, r.headers["location"])
+                chain.append(current)
+
+            try:
+                content, stopped = await self._read_capped(r, deadline, max_bytes, stop_when, stop_overlap)
+            finally:
+                await r.aclose()
+            ct = (r.headers.get("Content-Type") or "").lower()
+            return {
+                "ok": True,
+                "final_url": current,
+                "status": r.status_code,
+                "chain": chain,
+                "content_type": ct,
+                "content": content,
+                "bytes_read": len(content),
+                "stopped": stopped,
+                "matched": stopped == "matched",
+            }
+        except Exception as e:
+            return {"ok": False, "error": str(e) or type(e).__name__}
+
+    async def _read_capped(
+        self,
+        r: httpx.Response,
+        deadline: float,
+        max_bytes: int,
+        stop_when: Optional[Callable[[bytes], bool]],
+        stop_overlap: int,
+    ) -> tuple[bytes, str]:
+        buf = bytearray()
+        async for chunk in r.aiter_bytes(CHUNK_SIZE):
+            if not chunk:
+                continue
+            start = len(buf)
+            buf += chunk[: max_bytes - start]
+            if stop_when is not None and stop_when(bytes(buf[max(0, start - stop_overlap):])):
+                return bytes(buf), "matched"
+            if len(buf) >= max_bytes:
+                return bytes(buf), "max_bytes"
+            if time.monotonic() >= deadline:
+                return bytes(buf), "deadline"
+        return bytes(buf), "eof"
+
+
+_FETCHER: Optional[PooledFetcher] = None
+_FETCHER_LOCK = threading.Lock()
+
+
+def get_fetcher() -> PooledFetcher:
+    global _FETCHER
+    if _FETCHER is None:
+        with _FETCHER_LOCK:
+            if _FETCHER is None:
+                _FETCHER = PooledFetcher()
+    return _FETCHER
+
+
+# httpx connection pools belong to the event loop that opened them: one fetcher per loop.
+_ASYNC_FETCHERS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncFetcher]" = weakref.WeakKeyDictionary()
+
+
+def get_async_fetcher() -> AsyncFetcher:
+    loop = asyncio.get_running_loop()
+    with _FETCHER_LOCK:
+        fetcher = _ASYNC_FETCHERS.get(loop)
+        if fetcher is None:
+            fetcher = _ASYNC_FETCHERS[loop] = AsyncFetcher()
+        return fetcher
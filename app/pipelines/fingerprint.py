@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import threading
+from array import array
+from itertools import combinations
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_CAPACITY = int(os.environ.get("TRUSTBOT_FINGERPRINT_CAPACITY", "100000"))
+DEFAULT_MAX_DISTANCE = int(os.environ.get("TRUSTBOT_FINGERPRINT_MAX_DISTANCE", "7"))
+MIN_NEAR_TOKENS = 8
+BLOCKS = 4
+BLOCK_BITS = 16
+BLOCK_MASK = (1 << BLOCK_BITS) - 1
+
+_DIGIT_RE = re.compile(r"\d")
+_TOKEN_RE = re.compile(r"[^\W_]+|\S", re.UNICODE)
+
+
+class FingerprintKey(NamedTuple):
+    digest: int
+    simhash: int
+    tokens: int
+
+
+class FingerprintMatch(NamedTuple):
+    payload: Any
+    kind: str
+    distance: int
+
+
+def normalize_text(text: str) -> str:
+    # Digits are masked but kept in place so phone/amount patterns survive normalization.
+    return " ".join(_DIGIT_RE.sub("0", (text or "").lower()).split())
+
+
+def _hash64(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+def simhash64(tokens: List[str]) -> int:
+    if not tokens:
+        return 0
+    shingles = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    hashes = np.fromiter((_hash64(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    votes = bits.sum(axis=0, dtype=np.int32) * 2 > len(shingles)
+    return int.from_bytes(np.packbits(votes, bitorder="little").tobytes(), "little")
+
+
+def _popcount(values: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    return np.unpackbits(values.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+def fingerprint_key(text: str, near: bool = True) -> FingerprintKey:
+    """``near=False`` skips the SimHash (most of the cost); such keys only match exact duplicates."""
+    normalized = normalize_text(text)
+    digest = _hash64(normalized.encode("utf-8"))
+    if not near:
+        return FingerprintKey(digest, 0, 0)
+    tokens = _TOKEN_RE.findall(normalized)
+    return FingerprintKey(digest, simhash64(tokens), len(tokens))
+
+
+class FingerprintIndex:
+    """Bounded near-duplicate index over message fingerprints.
+
+    Each entry keeps a 64-bit SimHash, an exact digest of the normalized text
+    and an opaque payload. Near lookups use multi-index hashing: the SimHash is
+    split into four 16-bit blocks, and any fingerprint within ``max_distance``
+    bits has at least one block within ``max_distance // 4`` bits, so only those
+    bucket neighbourhoods are probed. Exact duplicates are found by digest
+    without probing, and keys too short for near matching are only kept by
+    digest. Storage is a ring buffer, so the oldest entries are overwritten once
+    ``capacity`` is reached; each bucket lists its slots oldest first, so the
+    overwritten slot is always at a bucket's head.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, max_distance: int = DEFAULT_MAX_DISTANCE) -> None:
+        self.capacity = max(0, capacity)
+        self.max_distance = max(0, min(max_distance, 11))
+        radius = self.max_distance // BLOCKS
+        self._probes = [0] + [
+            sum(1 << bit for bit in bits)
+            for r in range(1, radius + 1)
+            for bits in combinations(range(BLOCK_BITS), r)
+        ]
+        # Bucket value -> [slots, head]; slots before ``head`` have been overwritten.
+        self._tables: List[Dict[int, List[Any]]] = [{} for _ in range(BLOCKS)]
+        self._by_digest: Dict[int, int] = {}
+        self._simhashes = np.zeros(self.capacity, dtype=np.uint64)
+        self._digests = np.zeros(self.capacity, dtype=np.uint64)
+        self._near = np.zeros(self.capacity, dtype=bool)
+        self._payloads: List[Any] = [None] * self.capacity
+        self._size = 0
+        self._next = 0
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _block_values(simhash: int) -> List[int]:
+        return [(simhash >> (i * BLOCK_BITS)) & BLOCK_MASK for i in range(BLOCKS)]
+
+    def _nearest(self, simhash: int) -> Tuple[int, int]:
+        # Buckets are scanned one at a time; a slot seen in several of them only costs a repeat
+        # popcount, which is cheaper than concatenating and de-duplicating every bucket.
+        target = np.uint64(simhash)
+        best_slot, best_distance = -1, self.max_distance + 1
+        for table, value in zip(self._tables, self._block_values(simhash)):
+            for probe in self._probes:
+                entry = table.get(value ^ probe)
+                if entry is None:
+                    continue
+                bucket, head = entry
+                slots = np.frombuffer(bucket, dtype=np.uint32)[head:]
+                distances = _popcount(self._simhashes[slots] ^ target)
+                i = int(np.argmin(distances))
+                if distances[i] < best_distance:
+                    best_slot, best_distance = int(slots[i]), int(distances[i])
+        return best_slot, best_distance
+
+    def lookup(self, key: FingerprintKey) -> Optional[FingerprintMatch]:
+        if not self.capacity:
+            return None
+        with self._lock:
+            slot = self._by_digest.get(key.digest)
+            if slot is not None:
+                self.exact_hits += 1
+                return FingerprintMatch(self._payloads[slot], "exact", 0)
+            if key.tokens >= MIN_NEAR_TOKENS:
+                slot, distance = self._nearest(key.simhash)
+                if slot >= 0:
+                    self.near_hits += 1
+                    return FingerprintMatch(self._payloads[slot], "near", distance)
+            self.misses += 1
+            return None
+
+    def add(self, key: FingerprintKey, payload: Any) -> None:
+        if not self.capacity:
+            return
+        with self._lock:
+            slot = self._next
+            if self._size == self.capacity:
+                self._unlink(slot)
+            else:
+                self._size += 1
+            self._simhashes[slot] = key.simhash
+            self._digests[slot] = key.digest
+            self._near[slot] = key.tokens >= MIN_NEAR_TOKENS
+            self._payloads[slot] = payload
+            self._by_digest[key.digest] = slot
+            if self._near[slot]:
+                for table, value in zip(self._tables, self._block_values(key.simhash)):
+                    table.setdefault(value, [array("I"), 0])[0].append(slot)
+            self._next = (slot + 1) % self.capacity
+
+    def _unlink(self, slot: int) -> None:
+        digest = int(self._digests[slot])
+        if self._by_digest.get(digest) == slot:
+            del self._by_digest[digest]
+        if self._near[slot]:
+            for table, value in zip(self._tables, self._block_values(int(self._simhashes[slot]))):
+                entry = table[value]
+                bucket, head = entry
+                head += 1  # the oldest slot in the index is the oldest in each of its buckets
+                if head == len(bucket):
+                    del table[value]
+                elif head * 2 >= len(bucket):
+                    entry[0], entry[1] = bucket[head:], 0
+                else:
+                    entry[1] = head
+        self._payloads[slot] = None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "exact_hits": self.exact_hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "entries": self._size,
+                "capacity": self.capacity,
+            }
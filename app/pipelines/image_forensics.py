@@ -2,69 +2,205 @@ from __future__ import annotations
 
 import base64
 import io
+import os
 import numpy as np
 from PIL import Image
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, NamedTuple, Tuple, Optional, Union, BinaryIO
 from app.models import ReasonCode
 
-def _to_gray_np(img: Image.Image) -> np.ndarray:
-    return np.asarray(img.convert("L"), dtype=np.float32)
+# Raw bytes or any seekable binary file object (e.g. an mmap'd blob).
+ImageSource = Union[bytes, bytearray, BinaryIO]
 
-def _blockiness(gray: np.ndarray, block: int = 8) -> float:
-    h, w = gray.shape
+BLOCK = 8
+STRIPE_ROWS = 512
+SAMPLE_BAND_ROWS = 64
+# Above this many pixels, gradients come from evenly spaced native-scale row bands (0 disables).
+FAST_DECODE_PIXELS = int(os.environ.get("TRUSTBOT_IMAGE_FAST_DECODE_PIXELS", str(4_000_000)))
+
+HEAVY_COMPRESSION_BLOCKINESS = 1.35
+TEXTLIKE_EDGE_DENSITY = 0.08
+LOW_EDGE_DENSITY = 0.02
+# Sampled estimates this many standard errors from a threshold are recomputed over the full frame.
+SAMPLE_CONFIDENCE_Z = 3.0
+
+class GradientStats(NamedTuple):
+    blockiness: float
+    edge_density: float
+
+def _decode_luma(fp: BinaryIO) -> Image.Image:
+    img = Image.open(fp)
+    if img.format == "JPEG":
+        # libjpeg hands back the Y channel directly instead of upsampling chroma and converting RGB.
+        img.draft("L", img.size)
+    return img if img.mode == "L" else img.convert("L")
+
+def _sample_every(size: Tuple[int, int], max_pixels: int) -> int:
+    w, h = size
+    if not max_pixels or w * h <= max_pixels:
+        return 1
+    return -(-w * h // max_pixels)
+
+def _band_starts(h: int, stripe_rows: int, sample_every: int) -> List[int]:
+    starts = list(range(0, h, stripe_rows))
+    if sample_every <= 1:
+        return starts
+    # One band per group of `sample_every`, at a scrambled offset within the group: a fixed
+    # stride would alias with periodic content such as lines of text.
+    picked = []
+    for group, first in enumerate(range(0, len(starts), sample_every)):
+        index = first + ((group * 2654435761) >> 7) % sample_every
+        if index < len(starts):
+            picked.append(starts[index])
+    return picked
+
+def _standard_error(values: List[float], population: int) -> float:
+    n = len(values)
+    if n < 2:
+        return float("inf")
+    # Finite-population correction: sampling every band leaves no error.
+    return float(np.std(values, ddof=1)) / n ** 0.5 * max(0.0, 1.0 - n / population) ** 0.5
+
+def _gradient_stats(
+    img: Image.Image,
+    block: int = BLOCK,
+    stripe_rows: int = STRIPE_ROWS,
+    sample_every: int = 1,
+    bands: Optional[List[GradientStats]] = None,
+) -> GradientStats:
+    """Blockiness and edge density from one pass of |dx|/|dy| over an 8-bit luma image.
+
+    Rows are processed in stripes (overlapping by one row for dy), so peak working memory is
+    about ``stripe_rows * width * 4`` bytes regardless of image height. Block-boundary and
+    global means come from the same gradient buffers.
+
+    With ``sample_every`` > 1 only one band of ``SAMPLE_BAND_ROWS`` rows in every ``sample_every``
+    is read. Bands start on block boundaries and stay at native scale, so both statistics are
+    unbiased estimates of the full-frame values. If ``bands`` is given, per-band statistics are
+    appended to it so callers can judge how far to trust the estimate.
+    """
+    w, h = img.size
+    if sample_every > 1:
+        stripe_rows = SAMPLE_BAND_ROWS
+    stripe_rows = max(2, stripe_rows)
+    dx_buf = np.empty((stripe_rows, max(0, w - 1)), dtype=np.int16)
+    dy_buf = np.empty((stripe_rows, w), dtype=np.int16)
+    dx_sum = dx_blk = dy_sum = dy_blk = 0
+    dx_rows = dy_rows = dy_blk_rows = 0
+    v_cols = len(range(block - 1, w - 1, block))
+
+    for y0 in _band_starts(h, stripe_rows, sample_every):
+        y1 = min(h, y0 + stripe_rows)
+        top = y0 - 1 if y0 and sample_every == 1 else y0
+        rows = np.asarray(img.crop((0, top, w, y1)))
+        own = rows[y0 - top:]
+
+        dx = dx_buf[: own.shape[0]]
+        np.subtract(own[:, 1:], own[:, :-1], out=dx, dtype=np.int16)
+        np.abs(dx, out=dx)
+        band_dx = int(dx.sum(dtype=np.int64))
+        band_dx_blk = int(dx[:, block - 1::block].sum(dtype=np.int64))
+        dx_sum += band_dx
+        dx_blk += band_dx_blk
+        dx_rows += own.shape[0]
+
+        if rows.shape[0] > 1:
+            dy = dy_buf[: rows.shape[0] - 1]
+            np.subtract(rows[1:], rows[:-1], out=dy, dtype=np.int16)
+            np.abs(dy, out=dy)
+            dy_sum += int(dy.sum(dtype=np.int64))
+            # dy[i] pairs rows top+i and top+i+1; block boundaries are where the lower row is a multiple of `block`.
+            boundary = dy[(-top - 1) % block::block]
+            dy_blk += int(boundary.sum(dtype=np.int64))
+            dy_rows += dy.shape[0]
+            dy_blk_rows += boundary.shape[0]
+
+            if bands is not None and boundary.shape[0]:
+                band_v = band_dx / max(1, own.shape[0] * (w - 1))
+                band_h = int(dy.sum(dtype=np.int64)) / (dy.shape[0] * w)
+                band_v_edges = band_dx_blk / max(1, own.shape[0] * v_cols)
+                band_h_edges = int(boundary.sum(dtype=np.int64)) / (boundary.shape[0] * w)
+                bands.append(GradientStats(
+                    ((band_v_edges + band_h_edges) / 2.0) / (band_v + band_h + 1e-6),
+                    0.5 * (band_v + band_h) / 255.0,
+                ))
+
+    v_non = dx_sum / max(1, dx_rows * (w - 1))
+    h_non = dy_sum / max(1, dy_rows * w)
+    edge_density = 0.5 * (v_non + h_non) / 255.0
     if h < block * 2 or w < block * 2:
-        return 0.0
-    v_edges = np.abs(gray[:, block::block] - gray[:, block-1::block]).mean()
-    v_non = np.abs(gray[:, 1:] - gray[:, :-1]).mean()
-    h_edges = np.abs(gray[block::block, :] - gray[block-1::block, :]).mean()
-    h_non = np.abs(gray[1:, :] - gray[:-1, :]).mean()
-    return float(((v_edges + h_edges) / 2.0) / (v_non + h_non + 1e-6))
-
-def _edge_density(gray: np.ndarray) -> float:
-    gx = np.abs(gray[:, 1:] - gray[:, :-1])
-    gy = np.abs(gray[1:, :] - gray[:-1, :])
-    g = 0.5 * (gx.mean() + gy.mean())
-    return float(g / 255.0)
+        return GradientStats(0.0, float(edge_density))
+    v_edges = dx_blk / max(1, dx_rows * v_cols)
+    h_edges = dy_blk / max(1, dy_blk_rows * w)
+    blockiness = ((v_edges + h_edges) / 2.0) / (v_non + h_non + 1e-6)
+    return GradientStats(float(blockiness), float(edge_density))
+
+def _near_threshold(stats: GradientStats, bands: List[GradientStats], population: int) -> bool:
+    margin_blk = SAMPLE_CONFIDENCE_Z * _standard_error([b.blockiness for b in bands], population)
+    margin_ed = SAMPLE_CONFIDENCE_Z * _standard_error([b.edge_density for b in bands], population)
+    return (
+        abs(stats.blockiness - HEAVY_COMPRESSION_BLOCKINESS) <= margin_blk
+        or abs(stats.edge_density - TEXTLIKE_EDGE_DENSITY) <= margin_ed
+        or abs(stats.edge_density - LOW_EDGE_DENSITY) <= margin_ed
+    )
+
+def _missing_image() -> Dict[str, Any]:
+    return {"signals": [("missing_image", 0.5)], "reasons": ["No image provided."], "reason_codes": [], "quality_penalty": 1.0, "debug": {"name": "image_forensics", "error": "missing"}}
+
+def _decode_error(e: Exception) -> Dict[str, Any]:
+    return {"signals": [("decode_error", 0.5)], "reasons": ["Could not decode the image."], "reason_codes": [], "quality_penalty": 1.0, "debug": {"name": "image_forensics", "error": str(e)}}
 
 def analyze_image(image_b64: str) -> Dict[str, Any]:
+    if not image_b64:
+        return _missing_image()
+    try:
+        raw = base64.b64decode(image_b64)
+    except Exception as e:
+        return _decode_error(e)
+    return analyze_image_data(raw)
+
+def analyze_image_data(data: Optional[ImageSource], fast_decode_pixels: Optional[int] = None) -> Dict[str, Any]:
     signals: List[Tuple[str, float]] = []
     reasons: List[str] = []
     reason_codes: List[ReasonCode] = []
     quality_penalty = 0.0
 
-    if not image_b64:
-        reasons.append("No image provided.")
-        return {"signals": [("missing_image", 0.5)], "reasons": reasons, "reason_codes": reason_codes, "quality_penalty": 1.0, "debug": {"name": "image_forensics", "error": "missing"}}
+    if data is None or (isinstance(data, (bytes, bytearray)) and not data):
+        return _missing_image()
 
     try:
-        raw = base64.b64decode(image_b64)
-        img = Image.open(io.BytesIO(raw)).convert("RGB")
+        fp = io.BytesIO(data) if isinstance(data, (bytes, bytearray)) else data
+        img = _decode_luma(fp)
     except Exception as e:
-        reasons.append("Could not decode the image.")
-        return {"signals": [("decode_error", 0.5)], "reasons": reasons, "reason_codes": reason_codes, "quality_penalty": 1.0, "debug": {"name": "image_forensics", "error": str(e)}}
+        return _decode_error(e)
 
-    gray = _to_gray_np(img)
-    blk = _blockiness(gray)
-    ed = _edge_density(gray)
+    max_pixels = FAST_DECODE_PIXELS if fast_decode_pixels is None else fast_decode_pixels
+    sample_every = _sample_every(img.size, max_pixels)
+    bands: List[GradientStats] = []
+    stats = _gradient_stats(img, sample_every=sample_every, bands=bands if sample_every > 1 else None)
+    if sample_every > 1 and _near_threshold(stats, bands, -(-img.size[1] // SAMPLE_BAND_ROWS)):
+        # Too close to call from the sample; the frame is already decoded, so read every row.
+        sample_every = 1
+        stats = _gradient_stats(img)
+    blk, ed = stats.blockiness, stats.edge_density
 
-    if blk > 1.35:
+    if blk > HEAVY_COMPRESSION_BLOCKINESS:
         signals.append(("heavy_compression", 0.6))
         reasons.append("Image shows strong compression artifacts; authenticity signals may be degraded.")
         reason_codes.append(ReasonCode.IMG_HEAVY_COMPRESSION)
-        quality_penalty = max(quality_penalty, min(1.0, (blk - 1.35)))
+        quality_penalty = max(quality_penalty, min(1.0, (blk - HEAVY_COMPRESSION_BLOCKINESS)))
 
-    if ed > 0.08:
+    if ed > TEXTLIKE_EDGE_DENSITY:
         signals.append(("textlike_edges", 0.55))
         reasons.append("Image has dense edges consistent with text-heavy screenshots (common for scam forwards).")
         reason_codes.append(ReasonCode.IMG_TEXTLIKE_EDGES)
 
-    if ed < 0.02:
+    if ed < LOW_EDGE_DENSITY:
         signals.append(("low_signal", 0.5))
         reasons.append("Image has low detail; analysis may be uncertain.")
         reason_codes.append(ReasonCode.IMG_LOW_SIGNAL)
         quality_penalty = max(quality_penalty, 0.4)
 
-    debug = {"name": "image_forensics", "blockiness": blk, "edge_density": ed, "size": img.size}
+    debug = {"name": "image_forensics", "blockiness": blk, "edge_density": ed, "size": img.size, "sample_every": sample_every}
     if not signals:
         signals.append(("no_strong_image_indicators", 0.45))
     return {"signals": signals, "reasons": reasons, "reason_codes": reason_codes, "quality_penalty": float(quality_penalty), "debug": debug}
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import io
+import os
+import threading
+from itertools import combinations
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from app.pipelines.fingerprint import _popcount
+
+KNOWN_IMAGES_PATH = os.environ.get("TRUSTBOT_KNOWN_IMAGES_PATH", "known_images.npz")
+KNOWN_IMAGES_MAX_DISTANCE = int(os.environ.get("TRUSTBOT_KNOWN_IMAGES_MAX_DISTANCE", "7"))
+HASH_SIZE = 8
+BLOCKS = 4
+BLOCK_BITS = 16
+BLOCK_MASK = (1 << BLOCK_BITS) - 1
+# Inserts land in an unindexed tail that is scanned directly; past this size the tables are rebuilt.
+TAIL_LIMIT = 4096
+
+ImageSource = Union[bytes, bytearray, BinaryIO]
+
+
+class KnownImageMatch(NamedTuple):
+    label: str
+    distance: int
+    dhash: int
+
+
+def image_dhash(data: ImageSource) -> int:
+    """64-bit difference hash: sign of horizontal luma steps on a 9x8 thumbnail."""
+    img = Image.open(io.BytesIO(data) if isinstance(data, (bytes, bytearray)) else data)
+    # The thumbnail only needs a few dozen pixels, so JPEGs decode at up to 1/8 scale.
+    img.draft("L", (HASH_SIZE * 8, HASH_SIZE * 8))
+    small = np.asarray(img.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.BOX), dtype=np.int16)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits, bitorder="little").tobytes(), "little")
+
+
+def _blocks(hashes: np.ndarray) -> List[np.ndarray]:
+    return [((hashes >> np.uint64(i * BLOCK_BITS)) & np.uint64(BLOCK_MASK)).astype(np.uint16) for i in range(BLOCKS)]
+
+
+class KnownImageIndex:
+    """Analyst-labelled perceptual hashes of known scam images.
+
+    Near lookups use the same multi-index hashing as ``FingerprintIndex``: any hash within
+    ``max_distance`` bits has one of its four 16-bit blocks within ``max_distance // 4`` bits.
+    Each block table is a sorted array, so probing is a ``searchsorted`` and a snapshot
+    (``save``/``load``) stores the tables as-is instead of rebuilding them at startup. New
+    hashes go to a small tail that lookups scan directly until the next rebuild.
+    """
+
+    def __init__(self, max_distance: int = KNOWN_IMAGES_MAX_DISTANCE) -> None:
+        self.max_distance = max(0, min(max_distance, 11))
+        radius = self.max_distance // BLOCKS
+        self._probes = np.array(
+            [0] + [sum(1 << bit for bit in bits) for r in range(1, radius + 1) for bits in combinations(range(BLOCK_BITS), r)],
+            dtype=np.uint16,
+        )
+        self._hashes = np.empty(0, dtype=np.uint64)
+        self._label_ids = np.empty(0, dtype=np.uint32)
+        self._sorted: List[np.ndarray] = [np.empty(0, dtype=np.uint16) for _ in range(BLOCKS)]
+        self._orders: List[np.ndarray] = [np.empty(0, dtype=np.uint32) for _ in range(BLOCKS)]
+        self._tail_hashes: List[int] = []
+        self._tail_labels: List[int] = []
+        self._labels: List[str] = []
+        self._label_index: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._hashes) + len(self._tail_hashes)
+
+    def _label_id(self, label: str) -> int:
+        label_id = self._label_index.get(label)
+        if label_id is None:
+            label_id = self._label_index[label] = len(self._labels)
+            self._labels.append(label)
+        return label_id
+
+    def add(self, dhash: int, label: str) -> None:
+        self.add_many([(dhash, label)])
+
+    def add_many(self, entries: Iterable[Tuple[int, str]]) -> int:
+        added = 0
+        with self._lock:
+            for dhash, label in entries:
+                self._tail_hashes.append(int(dhash))
+                self._tail_labels.append(self._label_id(label))
+                added += 1
+            if len(self._tail_hashes) > TAIL_LIMIT:
+                self._rebuild()
+        return added
+
+    def _rebuild(self) -> None:
+        self._hashes = np.concatenate([self._hashes, np.array(self._tail_hashes, dtype=np.uint64)])
+        self._label_ids = np.concatenate([self._label_ids, np.array(self._tail_labels, dtype=np.uint32)])
+        self._tail_hashes, self._tail_labels = [], []
+        self._orders = [np.argsort(values, kind="stable").astype(np.uint32) for values in _blocks(self._hashes)]
+        self._sorted = [values[order] for values, order in zip(_blocks(self._hashes), self._orders)]
+
+    def _candidates(self, dhash: int) -> np.ndarray:
+        found = []
+        for i, (sorted_values, order) in enumerate(zip(self._sorted, self._orders)):
+            keys = ((dhash >> (i * BLOCK_BITS)) & BLOCK_MASK) ^ self._probes
+            lo = np.searchsorted(sorted_values, keys, side="left")
+            lengths = np.searchsorted(sorted_values, keys, side="right") - lo
+            total = int(lengths.sum())
+            if total:
+                # Concatenate the matching runs of `order` without a Python loop over probes.
+                offsets = np.repeat(lo - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+                found.append(order[offsets])
+        # Slots found through several blocks repeat; that does not change the nearest distance.
+        return np.concatenate(found) if found else np.empty(0, dtype=np.uint32)
+
+    def lookup(self, dhash: int) -> Optional[KnownImageMatch]:
+        query = np.uint64(dhash)
+        best: Optional[Tuple[int, int]] = None
+        with self._lock:
+            slots = self._candidates(dhash)
+            if slots.size:
+                distances = _popcount(self._hashes[slots] ^ query)
+                i = int(np.argmin(distances))
+                best = (int(distances[i]), int(self._label_ids[slots[i]]))
+            if self._tail_hashes:
+                distances = _popcount(np.array(self._tail_hashes, dtype=np.uint64) ^ query)
+                i = int(np.argmin(distances))
+                if best is None or distances[i] < best[0]:
+                    best = (int(distances[i]), self._tail_labels[i])
+            if best is None or best[0] > self.max_distance:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return KnownImageMatch(self._labels[best[1]], best[0], int(dhash))
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Write an atomic snapshot; ``load`` maps it back without re-sorting."""
+        with self._lock:
+            if self._tail_hashes:
+                self._rebuild()
+            target = Path(path)
+            tmp = target.with_name(target.name + ".tmp")
+            with open(tmp, "wb") as fh:
+                np.savez(
+                    fh,
+                    hashes=self._hashes,
+                    label_ids=self._label_ids,
+                    labels=np.array(self._labels, dtype=np.str_),
+                    **{f"order{i}": order for i, order in enumerate(self._orders)},
+                )
+            os.replace(tmp, target)
+
+    @classmethod
+    def load(cls, path: Union[str, Path], max_distance: int = KNOWN_IMAGES_MAX_DISTANCE) -> "KnownImageIndex":
+        index = cls(max_distance=max_distance)
+        with np.load(path) as snapshot:
+            index._hashes = snapshot["hashes"].astype(np.uint64, copy=False)
+            index._label_ids = snapshot["label_ids"].astype(np.uint32, copy=False)
+            index._labels = [str(label) for label in snapshot["labels"]]
+            index._orders = [snapshot[f"order{i}"].astype(np.uint32, copy=False) for i in range(BLOCKS)]
+        index._label_index = {label: i for i, label in enumerate(index._labels)}
+        index._sorted = [values[order] for values, order in zip(_blocks(index._hashes), index._orders)]
+        return index
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._hashes) + len(self._tail_hashes),
+                "labels": len(self._labels),
+            }
+
+
+_INDEX: Optional[KnownImageIndex] = None
+_INDEX_LOCK = threading.Lock()
+
+
+def get_known_image_index() -> KnownImageIndex:
+    global _INDEX
+    with _INDEX_LOCK:
+        if _INDEX is None:
+            _INDEX = KnownImageIndex.load(KNOWN_IMAGES_PATH) if os.path.exists(KNOWN_IMAGES_PATH) else KnownImageIndex()
+        return _INDEX
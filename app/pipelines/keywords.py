@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Tuple
+
+URGENT_WORDS = ["urgent", "immediately", "act now", "last chance", "final warning", "blocked", "suspended", "freeze"]
+OTP_WORDS = ["otp", "one time password"]
+KYC_WORDS = ["kyc"]
+ACCOUNT_ACTION_WORDS = ["block", "suspend", "freeze"]
+UPI_WORDS = ["upi"]
+UPI_ACTION_WORDS = ["reversal", "chargeback", "refund", "collect"]
+LOGIN_HINTS = ["login", "signin", "sign-in", "verify", "password", "otp", "kyc", "bank", "wallet"]
+FORM_HINTS = ["<form", "type=\"password\"", "name=\"password\"", "enter otp", "submit"]
+HIGH_RISK_HINTS = ("verify", "secure", "wallet", "pay", "kyc", "support")
+
+BRANDS = {
+    "hdfc": "hdfcbank.com",
+    "sbi": "sbi.co.in",
+    "icici": "icicibank.com",
+    "amazon": "amazon.in",
+    "whatsapp": "whatsapp.com",
+    "irs": "irs.gov",
+    "fedex": "fedex.com",
+}
+
+KEYWORD_FAMILIES: Dict[str, Iterable[str]] = {
+    "urgent": URGENT_WORDS,
+    "otp": OTP_WORDS,
+    "kyc": KYC_WORDS,
+    "account_action": ACCOUNT_ACTION_WORDS,
+    "upi": UPI_WORDS,
+    "upi_action": UPI_ACTION_WORDS,
+    "login": LOGIN_HINTS,
+    "form": FORM_HINTS,
+    "domain_risk": HIGH_RISK_HINTS,
+    "brand": BRANDS,
+}
+
+KeywordHits = Dict[str, FrozenSet[str]]
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class KeywordAutomaton:
+    """Matches every keyword family in one pass over lowercased text.
+
+    The keywords are compiled into a trie-shaped regex, so each position is
+    resolved by walking shared prefixes inside the regex engine rather than
+    rescanning the text once per keyword. A lookahead reports the longest
+    keyword starting at every offset (overlaps included), and keywords nested
+    inside that match are added from a precomputed table.
+    """
+
+    def __init__(self, families: Mapping[str, Iterable[str]]) -> None:
+        owners: Dict[str, List[str]] = {}
+        for family, words in families.items():
+            for word in words:
+                owners.setdefault(word.lower(), []).append(family)
+
+        self._nested: Dict[str, Tuple[Tuple[str, str], ...]] = {}
+        for word in owners:
+            found = {
+                (family, word[i:j])
+                for i in range(len(word))
+                for j in range(i + 1, len(word) + 1)
+                if word[i:j] in owners
+                for family in owners[word[i:j]]
+            }
+            self._nested[word] = tuple(sorted(found))
+
+        self._pattern = re.compile("(?=(" + _trie_pattern(owners) + "))", re.DOTALL)
+
+    def scan(self, text: str) -> KeywordHits:
+        hits: Dict[str, set] = {}
+        for match in self._pattern.finditer(text.lower()):
+            for family, word in self._nested[match.group(1)]:
+                hits.setdefault(family, set()).add(word)
+        return {family: frozenset(words) for family, words in hits.items()}
+
+    def scan_bytes(self, content: bytes) -> KeywordHits:
+        return self.scan(content.decode("latin-1"))
+
+
+KEYWORDS = KeywordAutomaton(KEYWORD_FAMILIES)
+
+
+@lru_cache(maxsize=1024)
+def scan_keywords(text: str) -> KeywordHits:
+    """Cached so providers that look at the same artifact text share one pass. Treat the result as read-only."""
+    return KEYWORDS.scan(text)
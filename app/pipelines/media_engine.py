@@ -0,0 +1,301 @@
+from __future__ import annotations
+
+import io
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple, Union
+
+from app.pipelines.document_ocr import analyze_document_data
+from app.pipelines.image_forensics import analyze_image_data
+
+MEDIA_WORKERS = int(os.environ.get("TRUSTBOT_MEDIA_WORKERS", "2"))
+MEDIA_MAX_QUEUE = int(os.environ.get("TRUSTBOT_MEDIA_MAX_QUEUE", "32"))
+MEDIA_QUEUE_TIMEOUT = float(os.environ.get("TRUSTBOT_MEDIA_QUEUE_TIMEOUT", "5"))
+COPY_CHUNK = 1024 * 1024
+
+
+class MediaEngineBusy(RuntimeError):
+    pass
+
+
+class JobTiming(NamedTuple):
+    queue_wait_ms: float
+    run_ms: float
+
+
+class SharedBuffer(io.RawIOBase):
+    """Seekable, read-only file object over a memoryview, so decoders read shared memory in place."""
+
+    def __init__(self, view: memoryview) -> None:
+        self._view = view
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        n = min(len(buffer), len(self._view) - self._pos)
+        if n <= 0:
+            return 0
+        buffer[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._view)}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+
+def _warm_worker() -> None:
+    # Import the heavy decoders once per worker instead of once per job.
+    from PIL import Image
+
+    from app.pipelines.document_ocr import _try_import_pdf
+    from app.pipelines.ocr_engine import ocr_health
+
+    Image.init()
+    _try_import_pdf()
+    # Loads the OCR models once per worker (and runs them on a blank page) before the first job.
+    ocr_health()
+
+
+def _timed_call(fn: Callable[..., Any], args: Tuple[Any, ...]) -> Tuple[Any, float, float]:
+    started = time.monotonic()
+    result = fn(*args)
+    return result, started, time.monotonic()
+
+
+def _run_on_shared(fn: Callable[..., Any], name: str, size: int, *args: Any) -> Any:
+    shm = SharedMemory(name=name)
+    view = shm.buf[:size]
+    try:
+        with io.BufferedReader(SharedBuffer(view), buffer_size=COPY_CHUNK) as reader:
+            return fn(reader, *args)
+    finally:
+        try:
+            view.release()
+            shm.close()
+        except BufferError:
+            # A decoder still holds a slice; the mapping goes away with it. The parent unlinks the name.
+            pass
+
+
+def _share(data: Any) -> Tuple[SharedMemory, int]:
+    if isinstance(data, (bytes, bytearray, memoryview)) or not hasattr(data, "read"):
+        view = memoryview(data)
+        size = view.nbytes
+        shm = SharedMemory(create=True, size=max(1, size))
+        shm.buf[:size] = view.cast("B")
+        return shm, size
+
+    data.seek(0, io.SEEK_END)
+    size = data.tell()
+    data.seek(0)
+    shm = SharedMemory(create=True, size=max(1, size))
+    offset = 0
+    while offset < size:
+        chunk = data.read(min(COPY_CHUNK, size - offset))
+        if not chunk:
+            break
+        shm.buf[offset:offset + len(chunk)] = chunk
+        offset += len(chunk)
+    return shm, offset
+
+
+class MediaEngine:
+    """Dedicated process pool for CPU-bound image and document analysis.
+
+    Workers are spawned once and import PIL/NumPy/OCR up front. Media goes to them through a
+    shared-memory segment rather than being pickled. At most ``max_queue`` jobs are admitted at a
+    time; callers past that wait up to ``queue_timeout`` seconds and then get ``MediaEngineBusy``.
+    With ``workers <= 0`` jobs run in the calling thread.
+    """
+
+    def __init__(
+        self,
+        workers: int = MEDIA_WORKERS,
+        max_queue: int = MEDIA_MAX_QUEUE,
+        queue_timeout: float = MEDIA_QUEUE_TIMEOUT,
+    ) -> None:
+        self.workers = workers
+        self.max_queue = max(1, max_queue)
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(self.max_queue)
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.jobs = 0
+        self.failures = 0
+        self.rejected = 0
+        self.in_flight = 0
+        self._wait_total_ms = 0.0
+        self._wait_max_ms = 0.0
+        self._run_total_ms = 0.0
+        self._run_max_ms = 0.0
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn, not fork: the parent runs server and provider threads.
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_warm_worker,
+                )
+            return self._executor
+
+    def _discard(self, executor: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, fn: Callable[..., Any], *args: Any, cleanup: Optional[Callable[[], None]] = None) -> Future:
+        """Run ``fn(*args)`` on a worker. The returned future carries a ``timing`` attribute once done."""
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self.rejected += 1
+            if cleanup is not None:
+                cleanup()
+            raise MediaEngineBusy(f"Media engine queue is full ({self.max_queue} jobs).")
+        with self._lock:
+            self.in_flight += 1
+
+        outer: Future = Future()
+        submitted = time.monotonic()
+
+        def settle(result: Any, error: Optional[BaseException], started: float, finished: float) -> None:
+            self._slots.release()
+            if cleanup is not None:
+                cleanup()
+            timing = JobTiming(round((started - submitted) * 1000.0, 2), round((finished - started) * 1000.0, 2))
+            self._record(timing, failed=error is not None)
+            outer.timing = timing  # type: ignore[attr-defined]
+            if not outer.set_running_or_notify_cancel():
+                return
+            if error is not None:
+                outer.set_exception(error)
+            else:
+                outer.set_result(result)
+
+        if self.workers <= 0:
+            try:
+                result, started, finished = _timed_call(fn, args)
+                settle(result, None, started, finished)
+            except Exception as exc:
+                now = time.monotonic()
+                settle(None, exc, submitted, now)
+            return outer
+
+        executor = self._pool()
+
+        def done(inner: Future) -> None:
+            now = time.monotonic()
+            if inner.cancelled():
+                settle(None, RuntimeError("media job cancelled"), now, now)
+                return
+            error = inner.exception()
+            if error is None:
+                result, started, finished = inner.result()
+                settle(result, None, started, finished)
+                return
+            if isinstance(error, BrokenProcessPool):
+                self._discard(executor)
+            settle(None, error, now, now)
+
+        try:
+            inner = executor.submit(_timed_call, fn, args)
+        except BrokenProcessPool as exc:
+            self._discard(executor)
+            now = time.monotonic()
+            settle(None, exc, now, now)
+            return outer
+        # A caller that gives up (timeout) cancels the outer future; drop the job if it has not started.
+        outer.add_done_callback(lambda f: f.cancelled() and inner.cancel())
+        inner.add_done_callback(done)
+        return outer
+
+    def run_shared(self, fn: Callable[..., Any], data: Any, *args: Any) -> Tuple[Any, JobTiming]:
+        """Copy ``data`` (bytes, mmap or file object) into shared memory and run ``fn(file, *args)`` on a worker."""
+        if self.workers <= 0:
+            future = self.submit(fn, io.BytesIO(data) if isinstance(data, (bytes, bytearray)) else data, *args)
+            return future.result(), future.timing
+
+        shm, size = _share(data)
+
+        def release() -> None:
+            shm.close()
+            shm.unlink()
+
+        future = self.submit(_run_on_shared, fn, shm.name, size, *args, cleanup=release)
+        return future.result(), future.timing
+
+    def analyze_image(self, data: Any) -> Dict[str, Any]:
+        if data is None or (isinstance(data, (bytes, bytearray)) and not data):
+            return analyze_image_data(data)
+        out, timing = self.run_shared(analyze_image_data, data)
+        out["debug"]["engine"] = timing._asdict()
+        return out
+
+    def analyze_document(self, data: Any, mime: Optional[str], name: Optional[str]) -> Dict[str, Any]:
+        if data is None or (isinstance(data, (bytes, bytearray)) and not data):
+            return analyze_document_data(data, mime=mime, name=name)
+        out, timing = self.run_shared(analyze_document_data, data, mime, name)
+        out["debug"]["engine"] = timing._asdict()
+        return out
+
+    def _record(self, timing: JobTiming, failed: bool) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self.jobs += 1
+            if failed:
+                self.failures += 1
+            self._wait_total_ms += timing.queue_wait_ms
+            self._wait_max_ms = max(self._wait_max_ms, timing.queue_wait_ms)
+            self._run_total_ms += timing.run_ms
+            self._run_max_ms = max(self._run_max_ms, timing.run_ms)
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        with self._lock:
+            jobs = max(1, self.jobs)
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": self.in_flight,
+                "jobs": self.jobs,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "queue_wait_ms_mean": round(self._wait_total_ms / jobs, 2),
+                "queue_wait_ms_max": self._wait_max_ms,
+                "run_ms_mean": round(self._run_total_ms / jobs, 2),
+                "run_ms_max": self._run_max_ms,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+_ENGINE: Optional[MediaEngine] = None
+_ENGINE_LOCK = threading.Lock()
+
+
+def get_media_engine() -> MediaEngine:
+    global _ENGINE
+    with _ENGINE_LOCK:
+        if _ENGINE is None:
+            _ENGINE = MediaEngine()
+        return _ENGINE
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import os
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+from PIL import Image
+
+OCR_LANG = os.environ.get("TRUSTBOT_OCR_LANG", "eng")
+# "auto" prefers in-process libtesseract (tesserocr) and falls back to the tesseract CLI.
+OCR_ENGINE = os.environ.get("TRUSTBOT_OCR_ENGINE", "auto").lower()
+OCR_THREADS = int(os.environ.get("TRUSTBOT_OCR_THREADS", "2"))
+
+
+class OcrUnavailable(RuntimeError):
+    pass
+
+
+class OcrEngine(ABC):
+    name = "none"
+    version = ""
+
+    @abstractmethod
+    def image_to_string(self, image: Image.Image) -> str: ...
+
+    def close(self) -> None:
+        pass
+
+    def health(self) -> Dict[str, Any]:
+        """Recognize a blank image end to end; cheap enough to run at worker start-up."""
+        started = time.monotonic()
+        try:
+            self.image_to_string(Image.new("L", (64, 32), 255))
+        except Exception as exc:
+            return {"ok": False, "engine": self.name, "version": self.version, "error": str(exc)}
+        return {"ok": True, "engine": self.name, "version": self.version, "ms": round((time.monotonic() - started) * 1000.0, 2)}
+
+
+class TesserocrEngine(OcrEngine):
+    """Long-lived libtesseract handles. Each loads the language model once; images are passed in
+    memory, with no process or temp file per call. Calls beyond ``handles`` wait for a free one."""
+
+    name = "tesserocr"
+
+    def __init__(self, tesserocr: Any, lang: str = OCR_LANG, handles: int = OCR_THREADS) -> None:
+        # e.g. "tesseract 5.3.0\n leptonica-1.82.0 ..."
+        words = str(tesserocr.tesseract_version()).split()
+        self.version = words[1] if len(words) > 1 else "".join(words)
+        self._apis: "queue.LifoQueue[Any]" = queue.LifoQueue()
+        self._all: List[Any] = []
+        for _ in range(max(1, handles)):
+            api = tesserocr.PyTessBaseAPI(lang=lang)
+            self._all.append(api)
+            self._apis.put(api)
+
+    def image_to_string(self, image: Image.Image) -> str:
+        api = self._apis.get()
+        try:
+            api.SetImage(image)
+            return api.GetUTF8Text()
+        finally:
+            api.Clear()
+            self._apis.put(api)
+
+    def close(self) -> None:
+        for api in self._all:
+            api.End()
+
+
+class CliEngine(OcrEngine):
+    """pytesseract: one ``tesseract`` process per image. Honours ``TESSERACT_CMD``."""
+
+    name = "tesseract-cli"
+
+    def __init__(self, pytesseract: Any, lang: str = OCR_LANG, cmd: Optional[str] = None) -> None:
+        if cmd:
+            pytesseract.pytesseract.tesseract_cmd = cmd
+        self._pytesseract = pytesseract
+        self._lang = lang
+        self.version = str(pytesseract.get_tesseract_version())
+
+    def image_to_string(self, image: Image.Image) -> str:
+        return self._pytesseract.image_to_string(image, lang=self._lang)
+
+
+def _create_engine() -> OcrEngine:
+    errors = []
+    if OCR_ENGINE in ("auto", "tesserocr"):
+        try:
+            import tesserocr  # type: ignore
+
+            return TesserocrEngine(tesserocr)
+        except Exception as exc:
+            errors.append(f"tesserocr: {exc}")
+    if OCR_ENGINE in ("auto", "cli"):
+        try:
+            import pytesseract  # type: ignore
+
+            return CliEngine(pytesseract, cmd=os.environ.get("TESSERACT_CMD"))
+        except Exception as exc:
+            errors.append(f"tesseract cli: {exc}")
+    raise OcrUnavailable("OCR deps missing: " + ("; ".join(errors) or f"unknown engine {OCR_ENGINE!r}"))
+
+
+_ENGINE: Optional[OcrEngine] = None
+_ENGINE_ERROR: Optional[OcrUnavailable] = None
+_ENGINE_LOCK = threading.Lock()
+
+
+def get_ocr_engine() -> OcrEngine:
+    """The process-wide OCR engine, created on first use. A failed set-up is remembered, not retried per image."""
+    global _ENGINE, _ENGINE_ERROR
+    with _ENGINE_LOCK:
+        if _ENGINE is None and _ENGINE_ERROR is None:
+            try:
+                _ENGINE = _create_engine()
+            except OcrUnavailable as exc:
+                _ENGINE_ERROR = exc
+        if _ENGINE is None:
+            raise _ENGINE_ERROR  # type: ignore[misc]
+        return _ENGINE
+
+
+def ocr_health() -> Dict[str, Any]:
+    try:
+        engine = get_ocr_engine()
+    except OcrUnavailable as exc:
+        return {"ok": False, "engine": "none", "error": str(exc)}
+    return engine.health()
@@ -1,38 +1,116 @@
 from __future__ import annotations
 
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 from urllib.parse import urlparse
-import requests
 
+from app.metrics import PIPELINE_SECONDS, timed
 from app.models import ReasonCode
+from app.pipelines.fetcher import get_async_fetcher, get_fetcher
+from app.pipelines.keywords import FORM_HINTS, KEYWORDS, scan_keywords
+from app.pipelines.provenance_cache import canonicalize_url, get_provenance_cache
+from app.singleflight import SingleFlightTimeout, get_singleflight
+from app.storage import receipt_for_bytes
 
-LOGIN_HINTS = ["login", "signin", "sign-in", "verify", "password", "otp", "kyc", "bank", "wallet"]
-FORM_HINTS = ["<form", "type=\"password\"", "name=\"password\"", "enter otp", "submit"]
+# Waiters give up a little after the leader's own fetch deadline would have.
+FETCH_TIMEOUT = 6.0
+FLIGHT_TIMEOUT = FETCH_TIMEOUT + 2.0
 
-def _safe_get(url: str, timeout: float = 6.0, max_bytes: int = 200_000) -> Dict[str, Any]:
-    """Fetch with redirects; cap bytes; return minimal provenance."""
-    s = requests.Session()
+def _has_form_hint(content: bytes) -> bool:
+    return "form" in KEYWORDS.scan_bytes(content)
+
+def _with_form_lure(fetch: Dict[str, Any]) -> Dict[str, Any]:
+    if fetch["ok"]:
+        fetch["form_lure"] = fetch.pop("matched")
+    return fetch
+
+def _safe_get(url: str, timeout: float = FETCH_TIMEOUT, max_bytes: int = 200_000) -> Dict[str, Any]:
+    """Fetch with redirects via the shared pool; stream up to max_bytes or until a form hint shows up."""
+    return _with_form_lure(get_fetcher().fetch(
+        url,
+        timeout=timeout,
+        max_bytes=max_bytes,
+        stop_when=_has_form_hint,
+        stop_overlap=max(len(h) for h in FORM_HINTS),
+    ))
+
+async def _safe_get_async(url: str, timeout: float = FETCH_TIMEOUT, max_bytes: int = 200_000) -> Dict[str, Any]:
+    return _with_form_lure(await get_async_fetcher().fetch(
+        url,
+        timeout=timeout,
+        max_bytes=max_bytes,
+        stop_when=_has_form_hint,
+        stop_overlap=max(len(h) for h in FORM_HINTS),
+    ))
+
+def _cache_hit(url: str) -> Optional[Dict[str, Any]]:
+    fetch = get_provenance_cache().get(url)
+    if fetch is not None:
+        fetch["cache"] = "hit"
+    return fetch
+
+def _flight_key(url: str) -> str:
+    return receipt_for_bytes(canonicalize_url(url).encode("utf-8"))
+
+def _flight_result(fetch: Dict[str, Any], shared: bool) -> Dict[str, Any]:
+    # Every caller of one flight gets the same dict.
+    fetch = dict(fetch)
+    fetch["cache"] = "coalesced" if shared else "miss"
+    return fetch
+
+def _flight_timed_out(url: str, exc: SingleFlightTimeout) -> Dict[str, Any]:
+    return {"ok": False, "error": str(exc), "chain": [url], "cache": "coalesced"}
+
+def _cached_get(url: str) -> Dict[str, Any]:
+    fetch = _cache_hit(url)
+    if fetch is not None:
+        return fetch
     try:
-        r = s.get(url, allow_redirects=True, timeout=timeout, headers={"User-Agent": "TrustBotMVP/0.2"})
-        content = r.content[:max_bytes] if r.content else b""
-        chain = [h.url for h in r.history] + [r.url]
-        ct = (r.headers.get("Content-Type") or "").lower()
-        return {"ok": True, "final_url": r.url, "status": r.status_code, "chain": chain, "content_type": ct, "content": content}
-    except Exception as e:
-        return {"ok": False, "error": str(e)}
+        fetch, shared = get_singleflight("provenance").do(_flight_key(url), lambda: _fetch_and_cache(url), timeout=FLIGHT_TIMEOUT)
+    except SingleFlightTimeout as exc:
+        return _flight_timed_out(url, exc)
+    return _flight_result(fetch, shared)
 
+async def _cached_get_async(url: str) -> Dict[str, Any]:
+    fetch = _cache_hit(url)
+    if fetch is not None:
+        return fetch
+    try:
+        fetch, shared = await get_singleflight("provenance").do_async(_flight_key(url), lambda: _fetch_and_cache_async(url), timeout=FLIGHT_TIMEOUT)
+    except SingleFlightTimeout as exc:
+        return _flight_timed_out(url, exc)
+    return _flight_result(fetch, shared)
+
+def _fetch_and_cache(url: str) -> Dict[str, Any]:
+    fetch = _safe_get(url)
+    get_provenance_cache().put(url, fetch)
+    return fetch
+
+async def _fetch_and_cache_async(url: str) -> Dict[str, Any]:
+    fetch = await _safe_get_async(url)
+    get_provenance_cache().put(url, fetch)
+    return fetch
+
+def _missing_url() -> Dict[str, Any]:
+    return {"signals": [("missing_url", 0.5)], "reasons": ["No URL provided."], "reason_codes": [], "debug": {"name": "provenance", "fetch": None}}
+
+@timed(PIPELINE_SECONDS.labels("provenance"))
 def analyze_provenance(url: str) -> Dict[str, Any]:
     u = (url or "").strip()
+    return _provenance_signals(_cached_get(u)) if u else _missing_url()
+
+@timed(PIPELINE_SECONDS.labels("provenance"))
+async def analyze_provenance_async(url: str) -> Dict[str, Any]:
+    """analyze_provenance on the async fetcher; shares its cache and in-flight fetches."""
+    u = (url or "").strip()
+    return _provenance_signals(await _cached_get_async(u)) if u else _missing_url()
+
+def _provenance_signals(fetch: Dict[str, Any]) -> Dict[str, Any]:
     signals: List[Tuple[str, float]] = []
     reasons: List[str] = []
     reason_codes: List[ReasonCode] = []
     debug: Dict[str, Any] = {"name": "provenance", "fetch": None}
 
-    if not u:
-        return {"signals": [("missing_url", 0.5)], "reasons": ["No URL provided."], "reason_codes": [], "debug": debug}
-
-    fetch = _safe_get(u)
-    debug["fetch"] = {k: v for k, v in fetch.items() if k not in ("content",)}
+    debug["fetch"] = {k: v for k, v in fetch.items() if k not in ("content", "form_lure")}
     if not fetch["ok"]:
         # can't fetch; stay neutral but slightly risky if URL is non-empty
         signals.append(("fetch_failed", 0.5))
@@ -51,16 +129,14 @@ def analyze_provenance(url: str) -> Dict[str, Any]:
         reasons.append("Destination looks like a direct download; be cautious with files from unknown sources.")
         reason_codes.append(ReasonCode.URL_DOWNLOADABLE)
 
-    content = fetch.get("content", b"")
-    low = content.lower()
-    if any(h.encode("utf-8") in low for h in (s.lower() for s in FORM_HINTS)):
+    if fetch.get("form_lure"):
         signals.append(("form_lure", 0.7))
         reasons.append("Page contains form/password-like patterns typical of credential capture pages.")
         reason_codes.append(ReasonCode.URL_FORM_LURE)
 
     # Keyword-based hints
     final_url = fetch.get("final_url", "")
-    if any(k in final_url.lower() for k in LOGIN_HINTS):
+    if "login" in scan_keywords(final_url):
         signals.append(("login_keywords", 0.6))
         reasons.append("URL contains login/verification keywords often used in phishing.")
         reason_codes.append(ReasonCode.URL_LOGIN_KEYWORDS)
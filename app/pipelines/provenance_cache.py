@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid", "_ga"}
+TRACKING_PREFIXES = ("utm_",)
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Only provenance metadata is cached; the raw body never is.
+CACHED_FIELDS = ("ok", "error", "final_url", "status", "chain", "content_type", "form_lure", "bytes_read", "stopped")
+_ENTRY_OVERHEAD = 256
+
+
+def canonicalize_url(url: str) -> str:
+    try:
+        parts = urlsplit(url.strip())
+        scheme = parts.scheme.lower()
+        host = (parts.hostname or "").lower()
+        port = parts.port
+    except ValueError:
+        return url.strip()
+
+    userinfo, _, _ = parts.netloc.rpartition("@")
+    netloc = f"{userinfo}@{host}" if userinfo else host
+    if port is not None and DEFAULT_PORTS.get(scheme) != port:
+        netloc = f"{netloc}:{port}"
+
+    query = [
+        (k, v)
+        for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)
+    ]
+    return urlunsplit((scheme, netloc, parts.path or "/", urlencode(sorted(query)), ""))
+
+
+def _entry_size(entry: Dict[str, Any]) -> int:
+    size = _ENTRY_OVERHEAD
+    for value in entry.values():
+        if isinstance(value, str):
+            size += len(value)
+        elif isinstance(value, list):
+            size += sum(len(v) for v in value if isinstance(v, str)) + 8 * len(value)
+        else:
+            size += 8
+    return size
+
+
+class ProvenanceCache:
+    """LRU cache of fetch results keyed by canonical URL, with separate TTLs for failures."""
+
+    def __init__(
+        self,
+        ttl_seconds: float = 15 * 60,
+        negative_ttl_seconds: float = 60,
+        max_bytes: int = 16 * 1024 * 1024,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[float, int, Dict[str, Any]]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        key = canonicalize_url(url)
+        now = time.monotonic()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            expires, size, entry = item
+            if expires < now:
+                del self._entries[key]
+                self._bytes -= size
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry)
+
+    def put(self, url: str, fetch: Dict[str, Any]) -> None:
+        key = canonicalize_url(url)
+        entry = {k: fetch[k] for k in CACHED_FIELDS if k in fetch}
+        ttl = self.ttl_seconds if entry.get("ok") else self.negative_ttl_seconds
+        if ttl <= 0:
+            return
+        size = _entry_size(entry) + len(key)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (time.monotonic() + ttl, size, entry)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+
+_CACHE = ProvenanceCache(
+    ttl_seconds=float(os.environ.get("TRUSTBOT_PROVENANCE_CACHE_TTL", "900")),
+    negative_ttl_seconds=float(os.environ.get("TRUSTBOT_PROVENANCE_CACHE_NEGATIVE_TTL", "60")),
+    max_bytes=int(os.environ.get("TRUSTBOT_PROVENANCE_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+)
+
+
+def get_provenance_cache() -> ProvenanceCache:
+    return _CACHE
@@ -2,35 +2,41 @@ from __future__ import annotations
 
 import re
 from typing import Dict, Any, List, Tuple
+from app.metrics import PIPELINE_SECONDS, timed
 from app.models import ReasonCode
+from app.pipelines.fingerprint import FingerprintIndex, fingerprint_key
+from app.pipelines.keywords import scan_keywords
 
 URL_RE = re.compile(r"https?://\S+", re.IGNORECASE)
 
-def analyze_text_scam(text: str) -> Dict[str, Any]:
-    t = (text or "").strip()
+# Counts repeated forwards (digits masked) for metrics. Signals are never reused from it: scoring
+# is cheaper than a SimHash, and a look-alike sent first must not decide a later message.
+TEXT_FINGERPRINTS = FingerprintIndex()
+
+def _score_text(t: str) -> Tuple[List[Tuple[str, float]], List[str], List[ReasonCode]]:
     tl = t.lower()
+    hits = scan_keywords(t)
 
     signals: List[Tuple[str, float]] = []
     reasons: List[str] = []
     reason_codes: List[ReasonCode] = []
 
-    urgent_words = ["urgent", "immediately", "act now", "last chance", "final warning", "blocked", "suspended", "freeze"]
-    if any(w in tl for w in urgent_words):
+    if "urgent" in hits:
         signals.append(("urgent_language", 0.65))
         reasons.append("Uses urgent/threatening language designed to rush you.")
         reason_codes.append(ReasonCode.SCAM_URGENT_LANGUAGE)
 
-    if "otp" in tl or "one time password" in tl:
+    if "otp" in hits:
         signals.append(("otp_request", 0.9))
         reasons.append("Asks for an OTP — a common scam pattern.")
         reason_codes.append(ReasonCode.SCAM_OTP_REQUEST)
 
-    if "kyc" in tl and ("block" in tl or "suspend" in tl or "freeze" in tl):
+    if "kyc" in hits and "account_action" in hits:
         signals.append(("kyc_threat", 0.8))
         reasons.append("Threatens account action tied to KYC — common social-engineering tactic.")
         reason_codes.append(ReasonCode.SCAM_KYC_THREAT)
 
-    if "upi" in tl and ("reversal" in tl or "chargeback" in tl or "refund" in tl or "collect" in tl):
+    if "upi" in hits and "upi_action" in hits:
         signals.append(("upi_reversal", 0.75))
         reasons.append("Mentions UPI reversal/refund/collect — often used to trick users into approving a collect request.")
         reason_codes.append(ReasonCode.SCAM_PAYMENT_REVERSAL)
@@ -40,10 +46,23 @@ def analyze_text_scam(text: str) -> Dict[str, Any]:
         reasons.append("Asks you to call a number — often used to move the scam off-platform.")
         reason_codes.append(ReasonCode.SCAM_PHONE_CALLBACK)
 
-    extracted_urls = URL_RE.findall(t)
-    debug = {"name": "scam_text", "len": len(t), "urls": extracted_urls}
-
     if not signals and t:
         signals.append(("no_strong_text_indicators", 0.45))
 
+    return signals, reasons, reason_codes
+
+@timed(PIPELINE_SECONDS.labels("text_scam"))
+def analyze_text_scam(text: str) -> Dict[str, Any]:
+    t = (text or "").strip()
+    signals, reasons, reason_codes = _score_text(t)
+    match = None
+    if t:
+        key = fingerprint_key(t, near=False)
+        match = TEXT_FINGERPRINTS.lookup(key)
+        if match is None:
+            TEXT_FINGERPRINTS.add(key, None)
+
+    extracted_urls = URL_RE.findall(t)
+    debug = {"name": "scam_text", "len": len(t), "urls": extracted_urls, "fingerprint": match.kind if match else "miss"}
+
     return {"signals": signals, "reasons": reasons, "reason_codes": reason_codes, "extracted_urls": extracted_urls, "debug": debug}
@@ -3,12 +3,14 @@ from __future__ import annotations
 import re
 from urllib.parse import urlparse
 from typing import Dict, Any, List, Tuple
+from app.metrics import PIPELINE_SECONDS, timed
 from app.models import ReasonCode
 
 SHORTENERS = {"bit.ly", "t.co", "tinyurl.com", "goo.gl", "is.gd", "cutt.ly"}
 SUSPICIOUS_TLDS = {"zip", "mov", "top", "xyz", "click", "cam", "quest"}
 IP_RE = re.compile(r"^(\d{1,3}\.){3}\d{1,3}$")
 
+@timed(PIPELINE_SECONDS.labels("url_checks"))
 def analyze_url(url: str) -> Dict[str, Any]:
     u = (url or "").strip()
     signals: List[Tuple[str, float]] = []
@@ -1,11 +1,14 @@
 from __future__ import annotations
 
+import base64
+import binascii
+from contextlib import contextmanager
 from datetime import datetime, timezone
-from typing import Any, Dict
+from typing import Any, Dict, Iterator, Optional
 from uuid import uuid4
 
 from app.domain.enums import EvidenceDirection
-from app.domain.models import EvidenceItemRecord
+from app.domain.models import ArtifactRecord, EvidenceItemRecord
 
 
 def utc_now() -> datetime:
@@ -34,3 +37,19 @@ def make_evidence(
         details=details or {},
         created_at=utc_now(),
     )
+
+
+@contextmanager
+def artifact_media(artifact: ArtifactRecord, b64_field: str) -> Iterator[Optional[Any]]:
+    """Yield the artifact's media lazily from the blob store, or decode legacy inline base64."""
+    blob = artifact.open_blob()
+    if blob is not None:
+        with blob as data:
+            yield data
+        return
+    encoded = artifact.payload.get(b64_field)
+    try:
+        data = base64.b64decode(encoded) if encoded else None
+    except binascii.Error:
+        data = None
+    yield data
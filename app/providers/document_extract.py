@@ -4,19 +4,17 @@ from typing import List
 
 from app.domain.enums import ArtifactType, EvidenceDirection
 from app.domain.models import ArtifactRecord, EvidenceItemRecord
-from app.pipelines.document_ocr import analyze_document
-from app.providers.base import make_evidence
+from app.pipelines.document_ocr import analyze_document_data
+from app.providers.base import artifact_media, make_evidence
 
 
 def collect_document_evidence(artifact: ArtifactRecord) -> List[EvidenceItemRecord]:
     if artifact.type != ArtifactType.DOCUMENT:
         return []
 
-    out = analyze_document(
-        artifact.payload.get("file_b64") or "",
-        mime=artifact.mime_type,
-        name=artifact.file_name,
-    )
+    with artifact_media(artifact, "file_b64") as data:
+        # The blob digest is the sha256 of the raw bytes, so the extraction cache need not rehash them.
+        out = analyze_document_data(data, mime=artifact.mime_type, name=artifact.file_name, digest=artifact.blob_sha256)
     evidence: List[EvidenceItemRecord] = []
 
     for (_, weight), summary, code in zip(out["signals"], out["reasons"], out["reason_codes"]):
@@ -5,9 +5,9 @@ from urllib.parse import urlparse
 
 from app.domain.enums import ArtifactType, EvidenceDirection
 from app.domain.models import ArtifactRecord, EvidenceItemRecord
+from app.pipelines.keywords import scan_keywords
 from app.providers.base import make_evidence
 
-HIGH_RISK_HINTS = ("verify", "secure", "wallet", "pay", "kyc", "support")
 LOW_RISK_DOMAINS = ("gov", "edu")
 
 
@@ -21,7 +21,7 @@ def collect_domain_reputation_evidence(artifact: ArtifactRecord) -> List[Evidenc
         return []
 
     evidence: List[EvidenceItemRecord] = []
-    if any(hint in host for hint in HIGH_RISK_HINTS) and host.count(".") >= 2:
+    if "domain_risk" in scan_keywords(host) and host.count(".") >= 2:
         evidence.append(
             make_evidence(
                 investigation_id=artifact.investigation_id,
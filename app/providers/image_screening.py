@@ -4,15 +4,16 @@ from typing import List
 
 from app.domain.enums import ArtifactType, EvidenceDirection
 from app.domain.models import ArtifactRecord, EvidenceItemRecord
-from app.pipelines.image_forensics import analyze_image
-from app.providers.base import make_evidence
+from app.pipelines.image_forensics import analyze_image_data
+from app.providers.base import artifact_media, make_evidence
 
 
 def collect_image_evidence(artifact: ArtifactRecord) -> List[EvidenceItemRecord]:
     if artifact.type != ArtifactType.IMAGE:
         return []
 
-    out = analyze_image(artifact.payload.get("image_b64") or "")
+    with artifact_media(artifact, "image_b64") as data:
+        out = analyze_image_data(data)
     evidence: List[EvidenceItemRecord] = []
 
     for (_, weight), summary, code in zip(out["signals"], out["reasons"], out["reason_codes"]):
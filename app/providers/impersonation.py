@@ -5,25 +5,18 @@ from urllib.parse import urlparse
 
 from app.domain.enums import ArtifactType, EvidenceDirection
 from app.domain.models import ArtifactRecord, EvidenceItemRecord
+from app.pipelines.keywords import BRANDS, scan_keywords
 from app.providers.base import make_evidence
 
-BRANDS = {
-    "hdfc": "hdfcbank.com",
-    "sbi": "sbi.co.in",
-    "icici": "icicibank.com",
-    "amazon": "amazon.in",
-    "whatsapp": "whatsapp.com",
-    "irs": "irs.gov",
-    "fedex": "fedex.com",
-}
+
+def _brands_in(text: str) -> List[str]:
+    found = scan_keywords(text).get("brand", frozenset())
+    return [brand for brand in BRANDS if brand in found]
 
 
 def _claimed_brand(text: str) -> Optional[str]:
-    lowered = text.lower()
-    for keyword in BRANDS:
-        if keyword in lowered:
-            return keyword
-    return None
+    brands = _brands_in(text)
+    return brands[0] if brands else None
 
 
 def collect_impersonation_evidence(artifact: ArtifactRecord) -> List[EvidenceItemRecord]:
@@ -49,8 +42,9 @@ def collect_impersonation_evidence(artifact: ArtifactRecord) -> List[EvidenceIte
     if artifact.type == ArtifactType.LINK:
         url = artifact.payload.get("url") or ""
         host = (urlparse(url).netloc or "").lower()
-        for brand, official_domain in BRANDS.items():
-            if brand in host and official_domain not in host:
+        for brand in _brands_in(host):
+            official_domain = BRANDS[brand]
+            if official_domain not in host:
                 evidence.append(
                     make_evidence(
                         investigation_id=artifact.investigation_id,
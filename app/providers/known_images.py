@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from typing import List
+
+from app.domain.enums import ArtifactType, EvidenceDirection
+from app.domain.models import ArtifactRecord, EvidenceItemRecord
+from app.pipelines.image_hash import get_known_image_index, image_dhash
+from app.providers.base import artifact_media, make_evidence
+
+
+def collect_known_image_evidence(artifact: ArtifactRecord) -> List[EvidenceItemRecord]:
+    if artifact.type != ArtifactType.IMAGE:
+        return []
+
+    with artifact_media(artifact, "image_b64") as data:
+        if not data:
+            return []
+        try:
+            dhash = image_dhash(data)
+        except Exception:
+            # Undecodable images are reported by image_screening.
+            return []
+
+    match = get_known_image_index().lookup(dhash)
+    if match is None:
+        return []
+    return [
+        make_evidence(
+            investigation_id=artifact.investigation_id,
+            artifact_id=artifact.artifact_id,
+            provider="known_images",
+            code="IMG_KNOWN_SCAM",
+            direction=EvidenceDirection.RISK,
+            weight=0.95,
+            summary=f"This image closely matches a known scam image ({match.label}).",
+            details={"label": match.label, "distance": match.distance, "dhash": f"{match.dhash:016x}"},
+        )
+    ]
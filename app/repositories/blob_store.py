@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import mmap
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Iterator, Tuple, Union
+from uuid import uuid4
+
+BlobHandle = Union[mmap.mmap, BinaryIO]
+
+
+def default_blob_dir(db_path: Union[str, Path]) -> Path:
+    db_path = Path(db_path)
+    return db_path.parent / f"{db_path.stem}_blobs"
+
+
+class BlobStore:
+    """Content-addressed local blob store: ``<root>/<aa>/<bb>/<sha256>``, written once and deduplicated."""
+
+    def __init__(self, root: Union[str, Path]) -> None:
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest[2:4] / digest
+
+    def put(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path_for(digest)
+        if path.exists():
+            return digest
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{digest}.{uuid4().hex}.tmp")
+        with open(tmp, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+        return digest
+
+    def put_stream(self, source: BinaryIO, chunk_size: int = 1024 * 1024) -> Tuple[str, int]:
+        """Copy a file object into the store chunk by chunk, hashing as it goes; returns (sha256, size)."""
+        hasher = hashlib.sha256()
+        size = 0
+        tmp = self.root / f".upload.{uuid4().hex}.tmp"
+        try:
+            with open(tmp, "wb") as fh:
+                while chunk := source.read(chunk_size):
+                    hasher.update(chunk)
+                    fh.write(chunk)
+                    size += len(chunk)
+            digest = hasher.hexdigest()
+            path = self.path_for(digest)
+            if not path.exists():
+                path.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp, path)
+        finally:
+            tmp.unlink(missing_ok=True)
+        return digest, size
+
+    def exists(self, digest: str) -> bool:
+        return self.path_for(digest).exists()
+
+    @contextmanager
+    def open(self, digest: str) -> Iterator[BlobHandle]:
+        """Yield a read-only, file-like mmap of the blob (PIL and pdfplumber read it without copying)."""
+        with open(self.path_for(digest), "rb") as fh:
+            if os.fstat(fh.fileno()).st_size == 0:
+                yield io.BytesIO(b"")
+                return
+            with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield mapped
@@ -1,23 +1,99 @@
 from __future__ import annotations
 
 import sqlite3
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Optional
+from typing import Iterator, List, Optional
 
-from app.domain.models import ArtifactRecord, EvidenceItemRecord, InvestigationRecord
+from app.domain.models import ArtifactRecord, DecisionSnapshot, EvidenceItemRecord, InvestigationRecord
+from app.metrics import STORE_SECONDS, timed
+
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -65536",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA busy_timeout = 5000",
+)
+
+# Each entry upgrades the schema by one user_version step.
+# SQLite appends rowid to every index, so these also serve ORDER BY rowid per investigation.
+MIGRATIONS = (
+    (
+        "CREATE INDEX IF NOT EXISTS idx_artifacts_investigation ON artifacts (investigation_id)",
+        "CREATE INDEX IF NOT EXISTS idx_evidence_items_investigation ON evidence_items (investigation_id)",
+    ),
+    (
+        """
+        CREATE TABLE IF NOT EXISTS decision_snapshots (
+            investigation_id TEXT PRIMARY KEY,
+            payload_json TEXT NOT NULL
+        )
+        """,
+    ),
+)
 
 
 class V2Store:
     def __init__(self, db_path: str) -> None:
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
         self._init_db()
 
     def _connect(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(str(self.db_path))
-        conn.row_factory = sqlite3.Row
+        # One long-lived connection per thread; `with conn:` scopes the transaction, not the connection.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path))
+            conn.row_factory = sqlite3.Row
+            for pragma in PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
         return conn
 
+    @contextmanager
+    def transaction(self) -> Iterator["V2Store"]:
+        """Group store calls on this thread into one transaction with a single commit.
+
+        Reads inside the block use the same connection, so they see rows written earlier in it.
+        Nested blocks join the outer transaction.
+        """
+        conn = self._connect()
+        depth = getattr(self._local, "depth", 0)
+        self._local.depth = depth + 1
+        try:
+            if depth:
+                yield self
+            else:
+                with conn:
+                    yield self
+        finally:
+            self._local.depth = depth
+
+    @contextmanager
+    def _session(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connect()
+        if getattr(self._local, "depth", 0):
+            yield conn
+        else:
+            with conn:
+                yield conn
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _migrate(self, conn: sqlite3.Connection) -> None:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for target, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {target}")
+
     def _init_db(self) -> None:
         with self._connect() as conn:
             conn.execute(
@@ -47,23 +123,27 @@ class V2Store:
                 )
                 """
             )
+            self._migrate(conn)
 
+    @timed(STORE_SECONDS.labels("create_investigation"))
     def create_investigation(self, investigation: InvestigationRecord) -> None:
-        with self._connect() as conn:
+        with self._session() as conn:
             conn.execute(
                 "INSERT INTO investigations (investigation_id, payload_json) VALUES (?, ?)",
                 (investigation.investigation_id, investigation.model_dump_json()),
             )
 
+    @timed(STORE_SECONDS.labels("update_investigation"))
     def update_investigation(self, investigation: InvestigationRecord) -> None:
-        with self._connect() as conn:
+        with self._session() as conn:
             conn.execute(
                 "UPDATE investigations SET payload_json = ? WHERE investigation_id = ?",
                 (investigation.model_dump_json(), investigation.investigation_id),
             )
 
+    @timed(STORE_SECONDS.labels("get_investigation"))
     def get_investigation(self, investigation_id: str) -> Optional[InvestigationRecord]:
-        with self._connect() as conn:
+        with self._session() as conn:
             row = conn.execute(
                 "SELECT payload_json FROM investigations WHERE investigation_id = ?",
                 (investigation_id,),
@@ -72,25 +152,28 @@ class V2Store:
             return None
         return InvestigationRecord.model_validate_json(row["payload_json"])
 
+    @timed(STORE_SECONDS.labels("add_artifact"))
     def add_artifact(self, artifact: ArtifactRecord) -> None:
-        with self._connect() as conn:
+        with self._session() as conn:
             conn.execute(
                 "INSERT INTO artifacts (artifact_id, investigation_id, payload_json) VALUES (?, ?, ?)",
                 (artifact.artifact_id, artifact.investigation_id, artifact.model_dump_json()),
             )
 
+    @timed(STORE_SECONDS.labels("list_artifacts"))
     def list_artifacts(self, investigation_id: str) -> List[ArtifactRecord]:
-        with self._connect() as conn:
+        with self._session() as conn:
             rows = conn.execute(
                 "SELECT payload_json FROM artifacts WHERE investigation_id = ? ORDER BY rowid ASC",
                 (investigation_id,),
             ).fetchall()
         return [ArtifactRecord.model_validate_json(row["payload_json"]) for row in rows]
 
+    @timed(STORE_SECONDS.labels("add_evidence_items"))
     def add_evidence_items(self, items: List[EvidenceItemRecord]) -> None:
         if not items:
             return
-        with self._connect() as conn:
+        with self._session() as conn:
             conn.executemany(
                 "INSERT INTO evidence_items (evidence_id, investigation_id, artifact_id, payload_json) VALUES (?, ?, ?, ?)",
                 [
@@ -99,10 +182,30 @@ class V2Store:
                 ],
             )
 
+    @timed(STORE_SECONDS.labels("list_evidence_items"))
     def list_evidence_items(self, investigation_id: str) -> List[EvidenceItemRecord]:
-        with self._connect() as conn:
+        with self._session() as conn:
             rows = conn.execute(
                 "SELECT payload_json FROM evidence_items WHERE investigation_id = ? ORDER BY rowid ASC",
                 (investigation_id,),
             ).fetchall()
         return [EvidenceItemRecord.model_validate_json(row["payload_json"]) for row in rows]
+
+    @timed(STORE_SECONDS.labels("get_decision_snapshot"))
+    def get_decision_snapshot(self, investigation_id: str) -> Optional[DecisionSnapshot]:
+        with self._session() as conn:
+            row = conn.execute(
+                "SELECT payload_json FROM decision_snapshots WHERE investigation_id = ?",
+                (investigation_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return DecisionSnapshot.model_validate_json(row["payload_json"])
+
+    @timed(STORE_SECONDS.labels("save_decision_snapshot"))
+    def save_decision_snapshot(self, investigation_id: str, snapshot: DecisionSnapshot) -> None:
+        with self._session() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO decision_snapshots (investigation_id, payload_json) VALUES (?, ?)",
+                (investigation_id, snapshot.model_dump_json()),
+            )
@@ -1,60 +1,138 @@
 from __future__ import annotations
 
-from typing import Dict, Any, List, Tuple
+import asyncio
+import base64
+import binascii
+import json
+from concurrent.futures import Future
+from typing import Dict, Any, List, Mapping, NamedTuple, Tuple, Optional, BinaryIO
+from app.executors import run_blocking, run_cpu
+from app.metrics import PIPELINE_SECONDS, timed
 from app.models import AnalyzeRequest
+from app.singleflight import get_singleflight
+from app.storage import receipt_for_bytes
 from app.pipelines.scam_text import analyze_text_scam
 from app.pipelines.url_checks import analyze_url
-from app.pipelines.provenance import analyze_provenance
+from app.pipelines.provenance import analyze_provenance, analyze_provenance_async
 from app.pipelines.image_forensics import analyze_image
 from app.pipelines.document_ocr import analyze_document
+from app.pipelines.media_engine import get_media_engine
 
-def route_and_analyze(req: AnalyzeRequest) -> Dict[str, Any]:
+def _decode_b64(encoded: Optional[str]) -> Optional[bytes]:
+    try:
+        return base64.b64decode(encoded or "")
+    except (binascii.Error, ValueError):
+        return None
+
+class Prepared(NamedTuple):
+    """Results computed ahead of routing for a whole batch: text pass outputs by text, URL checks by URL."""
+
+    texts: Mapping[str, Dict[str, Any]]
+    urls: Mapping[str, "Future[Tuple[Dict[str, Any], Dict[str, Any]]]"]
+
+def check_url(u: str, fetch: bool = True) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    return analyze_url(u), (analyze_provenance(u) if fetch else _provenance_skipped())
+
+def _url_checks(u: str, prepared: Optional[Prepared]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    future = prepared.urls.get(u) if prepared is not None else None
+    return future.result() if future is not None else check_url(u)
+
+# Timed here rather than in the pipelines themselves, which mostly run in media worker processes.
+@timed(PIPELINE_SECONDS.labels("image"))
+def _analyze_image(req: AnalyzeRequest, media: Optional[BinaryIO]) -> Dict[str, Any]:
+    raw = media if media is not None else _decode_b64(req.image_b64)
+    return analyze_image(req.image_b64 or "") if raw is None else get_media_engine().analyze_image(raw)
+
+@timed(PIPELINE_SECONDS.labels("document"))
+def _analyze_document(req: AnalyzeRequest, media: Optional[BinaryIO]) -> Dict[str, Any]:
+    raw = media if media is not None else _decode_b64(req.file_b64)
+    if raw is None:
+        return analyze_document(req.file_b64 or "", mime=req.file_mime, name=req.file_name)
+    return get_media_engine().analyze_document(raw, mime=req.file_mime, name=req.file_name)
+
+def _analyze_media(req: AnalyzeRequest, media: Optional[BinaryIO]) -> Dict[str, Any]:
+    # Decoding and forensics/extraction run on the media engine's process pool; bad base64 keeps the old error path.
+    if req.content_type.value == "image":
+        return _analyze_image(req, media)
+    return _analyze_document(req, media)
+
+_UNSUPPORTED = {"signals": [], "reasons": ["Unsupported content type in MVP."], "reason_codes": [], "debug": {"name": "unsupported"}}
+
+def _merge(outs: List[Dict[str, Any]]) -> Dict[str, Any]:
     signals: List[Tuple[str, float]] = []
     reasons: List[str] = []
     reason_codes = []
     debug: Dict[str, Any] = {"pipelines": []}
     quality_penalty = 0.0
-
-    ct = req.content_type.value
-
-    if ct == "text":
-        out = analyze_text_scam(req.text or "")
+    for out in outs:
         signals += out["signals"]; reasons += out["reasons"]; reason_codes += out["reason_codes"]
+        quality_penalty = max(quality_penalty, out.get("quality_penalty", 0.0))
         debug["pipelines"].append(out["debug"])
+    return {"signals": signals, "reasons": reasons, "reason_codes": reason_codes, "quality_penalty": quality_penalty, "debug": debug}
 
+def route_and_analyze(req: AnalyzeRequest, media: Optional[BinaryIO] = None, prepared: Optional[Prepared] = None) -> Dict[str, Any]:
+    # `media` carries raw uploaded bytes for image/document requests instead of base64 fields.
+    # `prepared` lets batch callers share one text pass and one check per unique URL.
+    ct = req.content_type.value
+    if ct == "text":
+        out = prepared.texts.get(req.text or "") if prepared is not None else None
+        out = out if out is not None else analyze_text_scam(req.text or "")
+        outs = [out]
         # Extract URL(s) and run URL+provenance checks
         for u in out.get("extracted_urls", []):
-            uo = analyze_url(u)
-            signals += uo["signals"]; reasons += uo["reasons"]; reason_codes += uo["reason_codes"]
-            debug["pipelines"].append(uo["debug"])
-
-            po = analyze_provenance(u)
-            signals += po["signals"]; reasons += po["reasons"]; reason_codes += po["reason_codes"]
-            debug["pipelines"].append(po["debug"])
-
+            outs += _url_checks(u, prepared)
     elif ct == "link":
-        uo = analyze_url(req.url or "")
-        signals += uo["signals"]; reasons += uo["reasons"]; reason_codes += uo["reason_codes"]
-        debug["pipelines"].append(uo["debug"])
+        outs = list(_url_checks(req.url or "", prepared))
+    elif ct in ("image", "document"):
+        outs = [_analyze_media(req, media)]
+    else:
+        outs = [_UNSUPPORTED]
+    merged = _merge(outs)
+    if any(out["debug"].get("skipped") == "degraded" for out in outs):
+        merged["debug"]["degraded"] = True  # a batch link check ran without fetching
+    return merged
 
-        po = analyze_provenance(req.url or "")
-        signals += po["signals"]; reasons += po["reasons"]; reason_codes += po["reason_codes"]
-        debug["pipelines"].append(po["debug"])
+def _provenance_skipped() -> Dict[str, Any]:
+    return {
+        "signals": [],
+        "reasons": ["Link destination was not checked because the service is busy; this verdict uses static link checks only."],
+        "reason_codes": [],
+        "debug": {"name": "provenance", "skipped": "degraded"},
+    }
 
-    elif ct == "image":
-        out = analyze_image(req.image_b64 or "")
-        signals += out["signals"]; reasons += out["reasons"]; reason_codes += out["reason_codes"]
-        quality_penalty = max(quality_penalty, out.get("quality_penalty", 0.0))
-        debug["pipelines"].append(out["debug"])
+async def check_url_async(u: str, fetch: bool = True) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    return analyze_url(u), (await analyze_provenance_async(u) if fetch else _provenance_skipped())
 
-    elif ct == "document":
-        out = analyze_document(req.file_b64 or "", mime=req.file_mime, name=req.file_name)
-        signals += out["signals"]; reasons += out["reasons"]; reason_codes += out["reason_codes"]
-        quality_penalty = max(quality_penalty, out.get("quality_penalty", 0.0))
-        debug["pipelines"].append(out["debug"])
+async def route_and_analyze_async(req: AnalyzeRequest, fetch: bool = True) -> Dict[str, Any]:
+    """route_and_analyze for the event loop, with the same outputs in the same order.
 
+    The text pass runs on the CPU executor, extracted links are fetched concurrently on the async
+    fetcher, and media requests wait for the media engine on the blocking executor. With
+    ``fetch=False`` (degraded mode) links get the static URL checks only.
+    """
+    ct = req.content_type.value
+    if ct == "text":
+        out = await run_cpu(analyze_text_scam, req.text or "")
+        checks = await asyncio.gather(*(check_url_async(u, fetch) for u in out.get("extracted_urls", [])))
+        outs = [out] + [o for pair in checks for o in pair]
+    elif ct == "link":
+        outs = list(await check_url_async(req.url or "", fetch))
+    elif ct in ("image", "document"):
+        outs = [await run_blocking(_analyze_media, req, None)]
     else:
-        reasons.append("Unsupported content type in MVP.")
-        debug["pipelines"].append({"name": "unsupported"})
+        outs = [_UNSUPPORTED]
+    merged = _merge(outs)
+    if not fetch:
+        merged["debug"]["degraded"] = True
+    return merged
 
-    return {"signals": signals, "reasons": reasons, "reason_codes": reason_codes, "quality_penalty": quality_penalty, "debug": debug}
+def request_receipt(req: AnalyzeRequest) -> str:
+    """Content hash of the fields that decide the analysis; locale and user do not."""
+    fields = [req.content_type.value, req.text, req.url, req.image_b64, req.file_b64, req.file_mime, req.file_name]
+    return receipt_for_bytes(json.dumps(fields).encode("utf-8"))
+
+async def coalesced_route_and_analyze_async(req: AnalyzeRequest, fetch: bool = True) -> Tuple[Dict[str, Any], bool]:
+    """route_and_analyze_async, shared with identical requests already in flight. ``(routed, shared)``."""
+    # Degraded results are only shared with other degraded requests.
+    key = request_receipt(req) if fetch else request_receipt(req) + ":static"
+    return await get_singleflight("analyze").do_async(key, lambda: route_and_analyze_async(req, fetch))
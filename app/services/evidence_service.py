@@ -1,28 +1,233 @@
 from __future__ import annotations
 
-from typing import List
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Callable, Dict, FrozenSet, List, NamedTuple, Optional, Sequence, Tuple
 
+from app.domain.decision import PROVIDER_OUTCOME_CODES
+from app.domain.enums import ArtifactType, EvidenceDirection
 from app.domain.models import ArtifactRecord, EvidenceItemRecord
+from app.metrics import PROVIDER_OUTCOMES, PROVIDER_SECONDS, CounterSeries, HistogramSeries
+from app.pipelines.media_engine import get_media_engine
+from app.providers.base import make_evidence
 from app.providers.document_extract import collect_document_evidence
 from app.providers.domain_reputation import collect_domain_reputation_evidence
 from app.providers.image_screening import collect_image_evidence
 from app.providers.impersonation import collect_impersonation_evidence
+from app.providers.known_images import collect_known_image_evidence
 from app.providers.text_patterns import collect_text_pattern_evidence
 from app.providers.url_fetch import collect_url_fetch_evidence
 from app.providers.url_static import collect_url_static_evidence
 
+PROVIDER_THREADS = int(os.environ.get("TRUSTBOT_PROVIDER_THREADS", "16"))
+OUTCOME_WEIGHT = 0.4
+OUTCOME_CODES = PROVIDER_OUTCOME_CODES
+
+Collector = Callable[[ArtifactRecord], List[EvidenceItemRecord]]
+
+
+class ProviderSpec(NamedTuple):
+    """A provider and the artifact types it applies to.
+
+    ``kind`` picks where it runs: ``inline`` on the calling thread (cheap, pure-Python checks),
+    ``io`` on the shared thread pool, ``cpu`` on the media engine's process pool.
+    """
+
+    name: str
+    collect: Collector
+    types: FrozenSet[ArtifactType]
+    kind: str = "inline"
+    timeout: Optional[float] = None
+
+
+def default_providers() -> Tuple[ProviderSpec, ...]:
+    return (
+        ProviderSpec("text_patterns", collect_text_pattern_evidence, frozenset({ArtifactType.TEXT, ArtifactType.CONTEXT})),
+        ProviderSpec("url_static", collect_url_static_evidence, frozenset({ArtifactType.LINK})),
+        ProviderSpec("url_fetch", collect_url_fetch_evidence, frozenset({ArtifactType.LINK}), kind="io", timeout=8.0),
+        ProviderSpec("document_extract", collect_document_evidence, frozenset({ArtifactType.DOCUMENT}), kind="cpu", timeout=30.0),
+        ProviderSpec("image_screening", collect_image_evidence, frozenset({ArtifactType.IMAGE}), kind="cpu", timeout=15.0),
+        # Runs in this process: the known-image index is shared and takes inserts at runtime.
+        ProviderSpec("known_images", collect_known_image_evidence, frozenset({ArtifactType.IMAGE}), kind="io", timeout=5.0),
+        ProviderSpec("impersonation", collect_impersonation_evidence, frozenset({ArtifactType.TEXT, ArtifactType.LINK})),
+        ProviderSpec("domain_reputation", collect_domain_reputation_evidence, frozenset({ArtifactType.LINK})),
+    )
+
+
+_POOL_LOCK = threading.Lock()
+_IO_POOL: Optional[ThreadPoolExecutor] = None
+
+
+def _io_pool() -> ThreadPoolExecutor:
+    global _IO_POOL
+    with _POOL_LOCK:
+        if _IO_POOL is None:
+            _IO_POOL = ThreadPoolExecutor(max_workers=max(1, PROVIDER_THREADS), thread_name_prefix="trustbot-provider")
+        return _IO_POOL
+
+
+def _submit(spec: ProviderSpec, artifact: ArtifactRecord) -> Future:
+    engine = get_media_engine()
+    if spec.kind != "cpu" or engine.workers <= 0:
+        return _io_pool().submit(spec.collect, artifact)
+    try:
+        # Blob-backed media is mmapped by the worker itself, so only the artifact record is pickled.
+        return engine.submit(spec.collect, artifact)
+    except Exception as exc:
+        failed: Future = Future()
+        failed.set_exception(exc)
+        return failed
+
+
+class _ProviderMetrics(NamedTuple):
+    seconds: HistogramSeries
+    outcomes: Dict[str, CounterSeries]
+
+
+def _provider_metrics(name: str) -> _ProviderMetrics:
+    outcomes = {outcome: PROVIDER_OUTCOMES.labels(name, outcome) for outcome in ("ok", *OUTCOME_CODES)}
+    return _ProviderMetrics(PROVIDER_SECONDS.labels(name), outcomes)
+
+
+class DeferredProvider(NamedTuple):
+    spec: ProviderSpec
+    future: Future
+    started: float
+
+
+class PendingEvidence(NamedTuple):
+    artifact: ArtifactRecord
+    specs: Tuple[ProviderSpec, ...]
+    futures: Dict[str, Tuple[Future, float]]
+    skipped: FrozenSet[str] = frozenset()
+
+
+class EvidenceCollection(NamedTuple):
+    evidence: List[EvidenceItemRecord]
+    deferred: List[DeferredProvider]
+
 
 class EvidenceService:
+    def __init__(self, providers: Optional[Sequence[ProviderSpec]] = None) -> None:
+        self.providers = tuple(providers if providers is not None else default_providers())
+        self._by_type: Dict[ArtifactType, Tuple[ProviderSpec, ...]] = {
+            artifact_type: tuple(spec for spec in self.providers if artifact_type in spec.types)
+            for artifact_type in ArtifactType
+        }
+        self._metrics = {spec.name: _provider_metrics(spec.name) for spec in self.providers}
+
     def collect_for_artifact(self, artifact: ArtifactRecord) -> List[EvidenceItemRecord]:
+        return self.gather(self.submit(artifact)).evidence
+
+    def submit(self, artifact: ArtifactRecord, skip: FrozenSet[str] = frozenset()) -> PendingEvidence:
+        """Start the pooled providers for an artifact; inline ones run later in ``gather``.
+
+        Providers named in ``skip`` (degraded mode) are not run and report a ``skipped`` outcome.
+        """
+        specs = self._by_type.get(artifact.type, ())
+        futures: Dict[str, Tuple[Future, float]] = {}
+        for spec in specs:
+            if spec.kind != "inline" and spec.name not in skip:
+                started = time.monotonic()
+                futures[spec.name] = (_submit(spec, artifact), started)
+        return PendingEvidence(artifact, specs, futures, skipped=frozenset(skip))
+
+    def gather(self, pending: PendingEvidence, deadline: Optional[float] = None) -> EvidenceCollection:
+        """Run inline providers and wait for pooled ones.
+
+        With a ``deadline`` (``time.monotonic()`` based), pooled providers still running at that
+        point are handed back as ``deferred`` instead of being waited on; ``finish`` collects them.
+        """
+        artifact = pending.artifact
+        # Results are merged in registry order so evidence ordering does not depend on timing.
         evidence: List[EvidenceItemRecord] = []
-        for collector in (
-            collect_text_pattern_evidence,
-            collect_url_static_evidence,
-            collect_url_fetch_evidence,
-            collect_document_evidence,
-            collect_image_evidence,
-            collect_impersonation_evidence,
-            collect_domain_reputation_evidence,
-        ):
-            evidence.extend(collector(artifact))
-        return evidence
+        deferred: List[DeferredProvider] = []
+        for spec in pending.specs:
+            if spec.name in pending.skipped:
+                self._metrics[spec.name].outcomes["skipped"].inc()
+                evidence.append(_outcome_evidence(spec, artifact, "skipped", time.monotonic()))
+                continue
+            if spec.name not in pending.futures:
+                evidence.extend(self._call_inline(spec, artifact))
+                continue
+            future, started = pending.futures[spec.name]
+            if deadline is not None and (spec.timeout is None or deadline < started + spec.timeout):
+                wait([future], timeout=max(0.0, deadline - time.monotonic()))
+                if not future.done():
+                    deferred.append(DeferredProvider(spec, future, started))
+                    continue
+            evidence.extend(self._await(spec, artifact, future, started))
+        return EvidenceCollection(evidence, deferred)
+
+    def finish(self, artifact: ArtifactRecord, deferred: Sequence[DeferredProvider]) -> List[EvidenceItemRecord]:
+        return [
+            item
+            for provider in deferred
+            for item in self._await(provider.spec, artifact, provider.future, provider.started)
+        ]
+
+    def _call_inline(self, spec: ProviderSpec, artifact: ArtifactRecord) -> List[EvidenceItemRecord]:
+        started = time.monotonic()
+        try:
+            items = spec.collect(artifact)
+        except Exception as exc:
+            self._record(spec, "error", started)
+            return [_outcome_evidence(spec, artifact, "error", started, error=repr(exc))]
+        self._record(spec, "ok", started)
+        return items
+
+    def _await(
+        self,
+        spec: ProviderSpec,
+        artifact: ArtifactRecord,
+        future: Future,
+        started: float,
+    ) -> List[EvidenceItemRecord]:
+        remaining = None if spec.timeout is None else max(0.0, started + spec.timeout - time.monotonic())
+        try:
+            items = future.result(timeout=remaining)
+        except FutureTimeout:
+            future.cancel()
+            self._record(spec, "timeout", started)
+            return [_outcome_evidence(spec, artifact, "timeout", started)]
+        except Exception as exc:
+            self._record(spec, "error", started)
+            return [_outcome_evidence(spec, artifact, "error", started, error=repr(exc))]
+        self._record(spec, "ok", started)
+        return items
+
+    def _record(self, spec: ProviderSpec, outcome: str, started: float) -> None:
+        metrics = self._metrics[spec.name]
+        metrics.seconds.observe(time.monotonic() - started)
+        metrics.outcomes[outcome].inc()
+
+
+def _outcome_evidence(
+    spec: ProviderSpec,
+    artifact: ArtifactRecord,
+    outcome: str,
+    started: float,
+    error: Optional[str] = None,
+) -> EvidenceItemRecord:
+    if outcome == "timeout":
+        summary = f"The {spec.name} check did not finish in time, so its result is missing."
+    elif outcome == "skipped":
+        summary = f"The {spec.name} check was skipped because the service is busy, so its result is missing."
+    else:
+        summary = f"The {spec.name} check failed, so its result is missing."
+    details = {"outcome": outcome, "elapsed_ms": round((time.monotonic() - started) * 1000.0, 1), "timeout_s": spec.timeout}
+    if error:
+        details["error"] = error
+    return make_evidence(
+        investigation_id=artifact.investigation_id,
+        artifact_id=artifact.artifact_id,
+        provider=spec.name,
+        code=OUTCOME_CODES[outcome],
+        direction=EvidenceDirection.QUALITY,
+        weight=OUTCOME_WEIGHT,
+        summary=summary,
+        details=details,
+    )
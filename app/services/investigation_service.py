@@ -1,56 +1,135 @@
 from __future__ import annotations
 
+import asyncio
+import base64
+import binascii
 import hashlib
+import logging
 import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timezone
-from typing import List, Optional
+from typing import BinaryIO, Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
 from uuid import uuid4
 
-from app.domain.decision import decide_investigation
+from app.domain.decision import accumulate, decide_from_aggregates, decide_investigation
 from app.domain.enums import ArtifactType, InvestigationStatus, V2Verdict
-from app.domain.models import ArtifactPayload, ArtifactRecord, InvestigationRecord
+from app.domain.models import (
+    ArtifactPayload,
+    ArtifactRecord,
+    DecisionAggregates,
+    DecisionResult,
+    DecisionSnapshot,
+    EvidenceItemRecord,
+    InvestigationRecord,
+)
+from app.metrics import DEFERRED_FAILURES, REASON_CODES, VERDICTS
 from app.pipelines.scam_text import URL_RE
+from app.repositories.blob_store import BlobStore, default_blob_dir
 from app.repositories.v2_store import V2Store
 from app.schemas.api_requests import V2AnalyzeRequest, V2ArtifactRequest
 from app.schemas.api_responses import InvestigationDetailResponse, V2AnalyzeResponse
-from app.services.evidence_service import EvidenceService
+from app.services.evidence_service import DeferredProvider, EvidenceService
+
+RESPONSE_BUDGET_MS = float(os.environ.get("TRUSTBOT_RESPONSE_BUDGET_MS", "2500"))
+BACKGROUND_WORKERS = int(os.environ.get("TRUSTBOT_BACKGROUND_WORKERS", "8"))
+MAX_POLL_WAIT_SECONDS = 30.0
+LOCK_STRIPES = 64
+
+_LOG = logging.getLogger(__name__)
 
 
 def utc_now() -> datetime:
     return datetime.now(timezone.utc)
 
 
+ArtifactBundle = List[Tuple[ArtifactRecord, List[EvidenceItemRecord]]]
+DeferredWork = List[Tuple[ArtifactRecord, List[DeferredProvider]]]
+
+
+def _count_codes(items: Iterable[EvidenceItemRecord]) -> None:
+    for item in items:
+        REASON_CODES.labels("v2", item.code).inc()
+
+
+def _wake(waiter: "asyncio.Future[None]") -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class DecisionConsistencyError(RuntimeError):
+    pass
+
+
 class InvestigationService:
-    def __init__(self, store: Optional[V2Store] = None, evidence_service: Optional[EvidenceService] = None) -> None:
+    def __init__(
+        self,
+        store: Optional[V2Store] = None,
+        evidence_service: Optional[EvidenceService] = None,
+        check_decisions: Optional[bool] = None,
+        blob_store: Optional[BlobStore] = None,
+        response_budget_ms: Optional[float] = None,
+    ) -> None:
         self.store = store or V2Store(os.environ.get("TRUSTBOT_DB_PATH", "trustbot_v2.db"))
         self.evidence_service = evidence_service or EvidenceService()
+        self.blob_store = blob_store or BlobStore(os.environ.get("TRUSTBOT_BLOB_DIR") or default_blob_dir(self.store.db_path))
+        if check_decisions is None:
+            check_decisions = os.environ.get("TRUSTBOT_DECISION_CHECK", "") == "1"
+        self.check_decisions = check_decisions
+        # Providers still running when the budget runs out finish in the background (<= 0 waits for all).
+        self.response_budget_ms = RESPONSE_BUDGET_MS if response_budget_ms is None else response_budget_ms
+        self._background = ThreadPoolExecutor(max_workers=max(1, BACKGROUND_WORKERS), thread_name_prefix="trustbot-deferred")
+        self._locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._pending: Dict[str, int] = {}
+        self._settled = threading.Condition()
+        self._async_waiters: Dict[str, List[Tuple[asyncio.AbstractEventLoop, "asyncio.Future[None]"]]] = {}
 
     @classmethod
     def from_db_path(cls, db_path: str) -> "InvestigationService":
         return cls(store=V2Store(db_path))
 
-    def analyze(self, req: V2AnalyzeRequest) -> V2AnalyzeResponse:
+    def analyze(self, req: V2AnalyzeRequest, skip: FrozenSet[str] = frozenset()) -> V2AnalyzeResponse:
+        """``skip`` names providers not to run (degraded mode); they are reported as skipped evidence."""
         investigation = self._load_or_create(req.investigation_id, req.user_id, req.locale, req.channel)
-        self._store_artifact_bundle(investigation.investigation_id, req.artifact, req.channel)
-        return self._finalize_response(investigation.investigation_id)
+        # Providers may hit the network, so evidence is collected before the write transaction opens.
+        bundle, deferred = self._collect_artifact_bundle(investigation.investigation_id, req.artifact, req.channel, skip=skip)
+        return self._commit_bundle(investigation, bundle, deferred, create=req.investigation_id is None)
 
-    def add_artifact(self, investigation_id: str, req: V2ArtifactRequest) -> V2AnalyzeResponse:
+    def add_artifact(
+        self,
+        investigation_id: str,
+        req: V2ArtifactRequest,
+        media: Optional[BinaryIO] = None,
+        skip: FrozenSet[str] = frozenset(),
+    ) -> V2AnalyzeResponse:
         investigation = self.store.get_investigation(investigation_id)
         if investigation is None:
             raise ValueError("Investigation not found.")
-        self._store_artifact_bundle(investigation_id, req.artifact, investigation.channel)
-        return self._finalize_response(investigation_id)
+        bundle, deferred = self._collect_artifact_bundle(investigation_id, req.artifact, investigation.channel, media, skip)
+        return self._commit_bundle(investigation, bundle, deferred)
 
-    def get_investigation(self, investigation_id: str) -> Optional[InvestigationDetailResponse]:
+    def get_investigation(self, investigation_id: str, wait: float = 0.0) -> Optional[InvestigationDetailResponse]:
+        """Return the investigation; with ``wait`` > 0, long-poll until background evidence settles."""
+        if wait > 0:
+            with self._settled:
+                self._settled.wait_for(lambda: investigation_id not in self._pending, timeout=min(wait, MAX_POLL_WAIT_SECONDS))
         investigation = self.store.get_investigation(investigation_id)
         if investigation is None:
             return None
         artifacts = self.store.list_artifacts(investigation_id)
         evidence_items = self.store.list_evidence_items(investigation_id)
-        decision = decide_investigation(artifacts, evidence_items)
+        snapshot = self.store.get_decision_snapshot(investigation_id)
+        if snapshot is None:
+            decision = decide_investigation(artifacts, evidence_items)
+        else:
+            decision = snapshot.decision
+            if self.check_decisions:
+                self._check_decision(investigation_id, decision, artifacts, evidence_items)
         return InvestigationDetailResponse(
             investigation_id=investigation.investigation_id,
-            status=decision.status,
+            status=self._status_for(investigation_id, decision),
             verdict=decision.verdict,
             confidence=decision.confidence,
             headline=decision.headline,
@@ -76,7 +155,7 @@ class InvestigationService:
             return investigation
 
         now = utc_now()
-        investigation = InvestigationRecord(
+        return InvestigationRecord(
             investigation_id=f"inv_{uuid4().hex[:12]}",
             user_id=user_id,
             status=InvestigationStatus.OPEN,
@@ -87,10 +166,14 @@ class InvestigationService:
             created_at=now,
             updated_at=now,
         )
-        self.store.create_investigation(investigation)
-        return investigation
 
-    def _build_artifact(self, investigation_id: str, payload: ArtifactPayload, channel: str) -> ArtifactRecord:
+    def _build_artifact(
+        self,
+        investigation_id: str,
+        payload: ArtifactPayload,
+        channel: str,
+        media: Optional[BinaryIO] = None,
+    ) -> ArtifactRecord:
         digest_source = (
             payload.text
             or payload.url
@@ -100,27 +183,192 @@ class InvestigationService:
             or payload.type.value
         )
         text_content = payload.text or payload.url
-        return ArtifactRecord(
+        record_payload = payload.model_dump()
+
+        # Media is decoded once and stored by content hash; the row keeps only the reference.
+        blob_sha256: Optional[str] = None
+        blob_size: Optional[int] = None
+        if media is not None:
+            blob_sha256, blob_size = self.blob_store.put_stream(media)
+        else:
+            for field in ("image_b64", "file_b64"):
+                raw = self._decode_media(record_payload.get(field))
+                if raw is not None:
+                    blob_sha256 = self.blob_store.put(raw)
+                    blob_size = len(raw)
+                    record_payload[field] = None
+                    break
+
+        if blob_sha256 is not None and not (payload.text or payload.url):
+            sha256 = blob_sha256
+        else:
+            sha256 = hashlib.sha256(digest_source.encode("utf-8")).hexdigest()
+
+        artifact = ArtifactRecord(
             artifact_id=f"art_{uuid4().hex[:12]}",
             investigation_id=investigation_id,
             type=payload.type,
             mime_type=payload.file_mime,
             file_name=payload.file_name,
-            sha256=hashlib.sha256(digest_source.encode("utf-8")).hexdigest(),
+            sha256=sha256,
             source_channel=channel,
             text_content=text_content,
-            payload=payload.model_dump(),
+            payload=record_payload,
+            blob_sha256=blob_sha256,
+            blob_size=blob_size,
             created_at=utc_now(),
         )
+        return artifact.bind_blob_opener(self.blob_store.open)
+
+    async def wait_settled(self, investigation_id: str, wait: float) -> None:
+        """``get_investigation``'s long-poll for async callers: waits without holding a thread."""
+        loop = asyncio.get_running_loop()
+        waiter: "asyncio.Future[None]" = loop.create_future()
+        with self._settled:
+            if investigation_id not in self._pending:
+                return
+            self._async_waiters.setdefault(investigation_id, []).append((loop, waiter))
+        try:
+            await asyncio.wait_for(waiter, timeout=min(wait, MAX_POLL_WAIT_SECONDS))
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._settled:
+                waiters = self._async_waiters.get(investigation_id, [])
+                if (loop, waiter) in waiters:
+                    waiters.remove((loop, waiter))
+                if not waiters:
+                    self._async_waiters.pop(investigation_id, None)
+
+    @staticmethod
+    def _decode_media(encoded: Optional[str]) -> Optional[bytes]:
+        if not encoded:
+            return None
+        try:
+            return base64.b64decode(encoded)
+        except binascii.Error:
+            return None
 
-    def _store_artifact_bundle(self, investigation_id: str, payload: ArtifactPayload, channel: str) -> None:
-        artifact = self._build_artifact(investigation_id, payload, channel)
-        self.store.add_artifact(artifact)
-        self.store.add_evidence_items(self.evidence_service.collect_for_artifact(artifact))
+    def _collect_artifact_bundle(
+        self,
+        investigation_id: str,
+        payload: ArtifactPayload,
+        channel: str,
+        media: Optional[BinaryIO] = None,
+        skip: FrozenSet[str] = frozenset(),
+    ) -> Tuple[ArtifactBundle, DeferredWork]:
+        deadline = time.monotonic() + self.response_budget_ms / 1000.0 if self.response_budget_ms > 0 else None
+        artifacts = [self._build_artifact(investigation_id, payload, channel, media)]
+        artifacts += self._derive_follow_up_artifacts(investigation_id, payload, channel)
+        # Every artifact's pooled providers start before any is waited on, so they share the budget.
+        pending = [self.evidence_service.submit(artifact, skip) for artifact in artifacts]
+        bundle: ArtifactBundle = []
+        deferred: DeferredWork = []
+        for artifact, started in zip(artifacts, pending):
+            collected = self.evidence_service.gather(started, deadline)
+            bundle.append((artifact, collected.evidence))
+            if collected.deferred:
+                deferred.append((artifact, collected.deferred))
+        return bundle, deferred
+
+    def _commit_bundle(
+        self,
+        investigation: InvestigationRecord,
+        bundle: ArtifactBundle,
+        deferred: DeferredWork,
+        create: bool = False,
+    ) -> V2AnalyzeResponse:
+        investigation_id = investigation.investigation_id
+        with self._investigation_lock(investigation_id):
+            self._track_pending(investigation_id, len(deferred))
+            try:
+                with self.store.transaction():
+                    if create:
+                        self.store.create_investigation(investigation)
+                    self._store_artifact_bundle(bundle)
+                    response = self._finalize_response(
+                        investigation,
+                        [artifact for artifact, _ in bundle],
+                        [item for _, evidence_items in bundle for item in evidence_items],
+                    )
+            except BaseException:
+                self._track_pending(investigation_id, -len(deferred))
+                raise
+        VERDICTS.labels("v2", response.verdict.value).inc()
+        _count_codes(item for _, evidence_items in bundle for item in evidence_items)
+        # Scheduled only after the commit, so background writes never race the initial insert.
+        for artifact, providers in deferred:
+            future = self._background.submit(self._complete_deferred, artifact, providers)
+            future.add_done_callback(lambda done, investigation_id=investigation_id: self._deferred_done(investigation_id, done))
+        return response
+
+    def _complete_deferred(self, artifact: ArtifactRecord, providers: List[DeferredProvider]) -> None:
+        investigation_id = artifact.investigation_id
+        items = self.evidence_service.finish(artifact, providers)
+        with self._investigation_lock(investigation_id):
+            with self.store.transaction():
+                investigation = self.store.get_investigation(investigation_id)
+                if investigation is None:
+                    return
+                self.store.add_evidence_items(items)
+                self._finalize_response(investigation, [], items, settling=True)
+        _count_codes(items)
+
+    def _deferred_done(self, investigation_id: str, future: "Future[None]") -> None:
+        # Runs however the deferred work ended (cancelled at shutdown included), so long-polls always wake.
+        try:
+            error = None if future.cancelled() else future.exception()
+            if error is not None:
+                DEFERRED_FAILURES.labels().inc()
+                _LOG.error("Deferred evidence for investigation %s was lost", investigation_id, exc_info=error)
+                self._settle_status(investigation_id)
+        except Exception:
+            _LOG.exception("Could not settle the status of investigation %s", investigation_id)
+        finally:
+            self._track_pending(investigation_id, -1)
+
+    def _settle_status(self, investigation_id: str) -> None:
+        """Drop a stale ANALYZING status for work that failed; the stored decision stands."""
+        with self._investigation_lock(investigation_id):
+            with self.store.transaction():
+                investigation = self.store.get_investigation(investigation_id)
+                snapshot = self.store.get_decision_snapshot(investigation_id)
+                if investigation is None or snapshot is None:
+                    return
+                status = self._status_for(investigation_id, snapshot.decision, settling=True)
+                if status != investigation.status:
+                    investigation.status = status
+                    investigation.updated_at = utc_now()
+                    self.store.update_investigation(investigation)
+
+    def _track_pending(self, investigation_id: str, delta: int) -> None:
+        if not delta:
+            return
+        with self._settled:
+            remaining = self._pending.get(investigation_id, 0) + delta
+            if remaining > 0:
+                self._pending[investigation_id] = remaining
+            else:
+                self._pending.pop(investigation_id, None)
+                self._settled.notify_all()
+                for loop, waiter in self._async_waiters.pop(investigation_id, []):
+                    loop.call_soon_threadsafe(_wake, waiter)
+
+    def _status_for(self, investigation_id: str, decision: DecisionResult, settling: bool = False) -> InvestigationStatus:
+        with self._settled:
+            pending = self._pending.get(investigation_id, 0) - (1 if settling else 0)
+        return InvestigationStatus.ANALYZING if pending > 0 else decision.status
+
+    @contextmanager
+    def _investigation_lock(self, investigation_id: str) -> Iterator[None]:
+        # Serializes snapshot read-modify-write per investigation (request and background writers).
+        with self._locks[hash(investigation_id) % LOCK_STRIPES]:
+            yield
 
-        for derived in self._derive_follow_up_artifacts(investigation_id, payload, channel):
-            self.store.add_artifact(derived)
-            self.store.add_evidence_items(self.evidence_service.collect_for_artifact(derived))
+    def _store_artifact_bundle(self, bundle: ArtifactBundle) -> None:
+        for artifact, evidence_items in bundle:
+            self.store.add_artifact(artifact)
+            self.store.add_evidence_items(evidence_items)
 
     def _derive_follow_up_artifacts(
         self,
@@ -143,16 +391,31 @@ class InvestigationService:
             derived.append(self._build_artifact(investigation_id, derived_payload, channel))
         return derived
 
-    def _finalize_response(self, investigation_id: str) -> V2AnalyzeResponse:
-        investigation = self.store.get_investigation(investigation_id)
-        if investigation is None:
-            raise ValueError("Investigation not found.")
-
-        artifacts = self.store.list_artifacts(investigation_id)
-        evidence_items = self.store.list_evidence_items(investigation_id)
-        decision = decide_investigation(artifacts, evidence_items)
+    def _finalize_response(
+        self,
+        investigation: InvestigationRecord,
+        artifacts: List[ArtifactRecord],
+        evidence_items: List[EvidenceItemRecord],
+        settling: bool = False,
+    ) -> V2AnalyzeResponse:
+        investigation_id = investigation.investigation_id
+        snapshot = self.store.get_decision_snapshot(investigation_id)
+        if snapshot is None:
+            # New (or pre-snapshot) investigation: build aggregates from every stored row once.
+            aggregates = accumulate(
+                DecisionAggregates(),
+                self.store.list_artifacts(investigation_id),
+                self.store.list_evidence_items(investigation_id),
+            )
+        else:
+            aggregates = accumulate(snapshot.aggregates, artifacts, evidence_items)
+        decision = decide_from_aggregates(aggregates)
+        if self.check_decisions:
+            self._check_decision(investigation_id, decision)
+        self.store.save_decision_snapshot(investigation_id, DecisionSnapshot(aggregates=aggregates, decision=decision))
 
-        investigation.status = decision.status
+        status = self._status_for(investigation_id, decision, settling)
+        investigation.status = status
         investigation.current_verdict = decision.verdict
         investigation.confidence = decision.confidence
         investigation.updated_at = utc_now()
@@ -160,13 +423,31 @@ class InvestigationService:
 
         return V2AnalyzeResponse(
             investigation_id=investigation_id,
-            status=decision.status,
+            status=status,
             verdict=decision.verdict,
             confidence=decision.confidence,
             headline=decision.headline,
             reasons=decision.reasons,
             recommended_action=decision.recommended_action,
             next_best_artifact=decision.next_best_artifact,
-            artifacts_seen=len(artifacts),
+            artifacts_seen=aggregates.artifacts_seen,
             trace=decision.trace,
         )
+
+    def _check_decision(
+        self,
+        investigation_id: str,
+        decision: DecisionResult,
+        artifacts: Optional[List[ArtifactRecord]] = None,
+        evidence_items: Optional[List[EvidenceItemRecord]] = None,
+    ) -> None:
+        if artifacts is None:
+            artifacts = self.store.list_artifacts(investigation_id)
+        if evidence_items is None:
+            evidence_items = self.store.list_evidence_items(investigation_id)
+        expected = decide_investigation(artifacts, evidence_items)
+        if expected != decision:
+            raise DecisionConsistencyError(
+                f"Incremental decision for {investigation_id} diverged from a full recompute: "
+                f"{decision.model_dump()} != {expected.model_dump()}"
+            )
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+SINGLEFLIGHT_TIMEOUT = float(os.environ.get("TRUSTBOT_SINGLEFLIGHT_TIMEOUT", "30"))
+
+T = TypeVar("T")
+
+
+class SingleFlightTimeout(TimeoutError):
+    pass
+
+
+class SingleFlight:
+    """Concurrent calls with the same key share one in-flight computation.
+
+    The first caller (the leader) runs ``fn``; callers arriving while it runs wait for its
+    result or exception instead of running ``fn`` again. Nothing is kept once the call
+    finishes, so this only collapses concurrent duplicates; caching is left to the caller.
+    """
+
+    def __init__(self, name: str, timeout: float = SINGLEFLIGHT_TIMEOUT) -> None:
+        self.name = name
+        self.timeout = timeout
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.timeouts = 0
+
+    def _join(self, key: str) -> Tuple[Future, bool]:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                return call, False
+            call = self._calls[key] = Future()
+            self.calls += 1
+            return call, True
+
+    def _finish(self, key: str, call: Future, result: Any = None, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            del self._calls[key]
+            if error is not None:
+                self.errors += 1
+        if error is not None:
+            call.set_exception(error)
+        else:
+            call.set_result(result)
+
+    def _timed_out(self) -> SingleFlightTimeout:
+        with self._lock:
+            self.timeouts += 1
+        return SingleFlightTimeout(f"Timed out waiting for an identical {self.name} already in progress.")
+
+    def do(self, key: str, fn: Callable[[], T], timeout: Optional[float] = None) -> Tuple[T, bool]:
+        """``(result, shared)``; ``shared`` is True for waiters, who must not mutate the result."""
+        call, leader = self._join(key)
+        if leader:
+            try:
+                result = fn()
+            except BaseException as exc:
+                self._finish(key, call, error=exc)
+                raise
+            self._finish(key, call, result)
+            return result, False
+        try:
+            return call.result(timeout=self.timeout if timeout is None else timeout), True
+        except FutureTimeout:
+            raise self._timed_out() from None
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[T]], timeout: Optional[float] = None) -> Tuple[T, bool]:
+        """``do`` for coroutines. Sync and async callers of one key share the same flight."""
+        call, leader = self._join(key)
+        if leader:
+            try:
+                result = await fn()
+            except asyncio.CancelledError:
+                # The leader's client went away; its waiters did not, and must not see a cancellation.
+                self._finish(key, call, error=RuntimeError(f"An identical {self.name} was cancelled; retry."))
+                raise
+            except BaseException as exc:
+                self._finish(key, call, error=exc)
+                raise
+            self._finish(key, call, result)
+            return result, False
+        try:
+            # shield: a waiter that times out must not cancel the shared future under the leader.
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(call)), self.timeout if timeout is None else timeout), True
+        except asyncio.TimeoutError:
+            raise self._timed_out() from None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "errors": self.errors,
+                "timeouts": self.timeouts,
+                "in_flight": len(self._calls),
+            }
+
+
+_GROUPS: Dict[str, SingleFlight] = {}
+_GROUPS_LOCK = threading.Lock()
+
+
+def get_singleflight(name: str, timeout: float = SINGLEFLIGHT_TIMEOUT) -> SingleFlight:
+    with _GROUPS_LOCK:
+        group = _GROUPS.get(name)
+        if group is None:
+            group = _GROUPS[name] = SingleFlight(name, timeout)
+        return group
+
+
+def singleflight_stats() -> Dict[str, Dict[str, Any]]:
+    with _GROUPS_LOCK:
+        groups = list(_GROUPS.values())
+    return {group.name: group.stats() for group in groups}
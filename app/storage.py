@@ -1,29 +1,319 @@
 from __future__ import annotations
 
 import hashlib
+import json
+import os
+import sqlite3
+import threading
 import time
-from typing import Optional, Dict, Any
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Set, Tuple, Union
 
-_STORE: Dict[str, Dict[str, Any]] = {}
 DEFAULT_TTL_SECONDS = 60 * 30
+# Empty keeps receipts in this process; a file path shares them between uvicorn workers via SQLite.
+EPHEMERAL_PATH = os.environ.get("TRUSTBOT_EPHEMERAL_PATH", "")
+EPHEMERAL_MAX_ENTRIES = int(os.environ.get("TRUSTBOT_EPHEMERAL_MAX_ENTRIES", "100000"))
+EPHEMERAL_MAX_BYTES = int(os.environ.get("TRUSTBOT_EPHEMERAL_MAX_BYTES", str(64 * 1024 * 1024)))
+EPHEMERAL_SWEEP_SECONDS = float(os.environ.get("TRUSTBOT_EPHEMERAL_SWEEP_SECONDS", "5"))
+_ENTRY_OVERHEAD = 128
+EVICT_BATCH = 64
+
+Clock = Callable[[], float]
+
+
+def _encode(payload: Dict[str, Any]) -> str:
+    return json.dumps(payload, separators=(",", ":"), default=str)
+
+
+class EphemeralStore:
+    """In-process TTL store capped by entry count and bytes, evicting least recently used first.
+
+    Expiry times are bucketed per second in a timing wheel, so put/get/purge are O(1) and
+    ``sweep`` only visits buckets that have come due, whether or not their keys are ever read.
+    """
+
+    backend = "memory"
+
+    def __init__(self, max_entries: int = EPHEMERAL_MAX_ENTRIES, max_bytes: int = EPHEMERAL_MAX_BYTES, clock: Clock = time.time) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, int, Dict[str, Any]]]" = OrderedDict()
+        self._wheel: Dict[int, Set[str]] = {}
+        self._next_tick = int(clock())
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    def _unlink(self, key: str) -> Optional[Tuple[float, int, Dict[str, Any]]]:
+        item = self._entries.pop(key, None)
+        if item is not None:
+            self._bytes -= item[1]
+            bucket = self._wheel.get(int(item[0]))
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._wheel[int(item[0])]
+        return item
+
+    def put(self, key: str, payload: Dict[str, Any], ttl: float = DEFAULT_TTL_SECONDS) -> None:
+        size = _ENTRY_OVERHEAD + len(key) + len(_encode(payload))
+        expires = self._clock() + ttl
+        with self._lock:
+            self._unlink(key)
+            if size > self.max_bytes or self.max_entries <= 0:
+                return
+            self._entries[key] = (expires, size, payload)
+            self._wheel.setdefault(int(expires), set()).add(key)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._unlink(next(iter(self._entries)))
+                self.evictions += 1
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            if item[0] <= self._clock():
+                self._unlink(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return item[2]
+
+    def purge(self, key: str) -> bool:
+        with self._lock:
+            return self._unlink(key) is not None
+
+    def sweep(self) -> int:
+        """Drop every entry whose expiry second has fully passed; returns how many were dropped."""
+        now_tick = int(self._clock())
+        removed = 0
+        with self._lock:
+            # After a long idle gap, visiting the occupied buckets beats stepping every second.
+            if now_tick - self._next_tick > len(self._wheel):
+                due = sorted(tick for tick in self._wheel if tick < now_tick)
+            else:
+                due = [tick for tick in range(self._next_tick, now_tick) if tick in self._wheel]
+            for tick in due:
+                for key in list(self._wheel.get(tick, ())):
+                    self._unlink(key)
+                    removed += 1
+            self._next_tick = max(self._next_tick, now_tick)
+            self.expirations += removed
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": self.backend,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+            }
+
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS ephemeral (
+        key TEXT PRIMARY KEY,
+        payload_json TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        expires REAL NOT NULL,
+        last_used REAL NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_ephemeral_expires ON ephemeral (expires)",
+    "CREATE INDEX IF NOT EXISTS idx_ephemeral_last_used ON ephemeral (last_used)",
+    "CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+)
+COUNTERS = ("hits", "misses", "expirations", "evictions", "bytes", "entries")
+
+
+class SqliteEphemeralStore:
+    """The same store in a SQLite file, so every worker process sees the same receipts.
+
+    The ``expires`` index plays the part of the timing wheel: a sweep deletes a range scan of
+    due rows. Counters live in the file, so ``stats()`` covers all workers.
+    """
+
+    backend = "sqlite"
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        max_entries: int = EPHEMERAL_MAX_ENTRIES,
+        max_bytes: int = EPHEMERAL_MAX_BYTES,
+        clock: Clock = time.time,
+    ) -> None:
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._write() as conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+            # Files written before the entries counter existed are counted once, here.
+            conn.execute("INSERT OR IGNORE INTO counters (name, value) SELECT 'entries', COUNT(*) FROM ephemeral")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @staticmethod
+    def _bump(conn: sqlite3.Connection, **deltas: int) -> None:
+        conn.executemany(
+            "INSERT INTO counters (name, value) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            [(name, delta) for name, delta in deltas.items() if delta],
+        )
+
+    @staticmethod
+    def _counter(conn: sqlite3.Connection, name: str) -> int:
+        row = conn.execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()
+        return int(row[0]) if row else 0
+
+    def put(self, key: str, payload: Dict[str, Any], ttl: float = DEFAULT_TTL_SECONDS) -> None:
+        encoded = _encode(payload)
+        size = _ENTRY_OVERHEAD + len(key) + len(encoded)
+        now = self._clock()
+        with self._write() as conn:
+            old = conn.execute("SELECT size FROM ephemeral WHERE key = ?", (key,)).fetchone()
+            if size > self.max_bytes or self.max_entries <= 0:
+                if old:
+                    conn.execute("DELETE FROM ephemeral WHERE key = ?", (key,))
+                    self._bump(conn, bytes=-old[0], entries=-1)
+                return
+            conn.execute(
+                "INSERT OR REPLACE INTO ephemeral (key, payload_json, size, expires, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, encoded, size, now + ttl, now),
+            )
+            self._bump(conn, bytes=size - (old[0] if old else 0), entries=0 if old else 1)
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        total = self._counter(conn, "bytes")
+        count = self._counter(conn, "entries")
+        while total > self.max_bytes or count > self.max_entries:
+            rows = conn.execute("SELECT key, size FROM ephemeral ORDER BY last_used LIMIT ?", (EVICT_BATCH,)).fetchall()
+            if not rows:
+                break
+            freed = evicted = 0
+            for key, size in rows:
+                if total - freed <= self.max_bytes and count - evicted <= self.max_entries:
+                    break
+                conn.execute("DELETE FROM ephemeral WHERE key = ?", (key,))
+                freed += size
+                evicted += 1
+            self._bump(conn, bytes=-freed, entries=-evicted, evictions=evicted)
+            total -= freed
+            count -= evicted
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = self._clock()
+        with self._write() as conn:
+            row = conn.execute("SELECT payload_json, size, expires FROM ephemeral WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._bump(conn, misses=1)
+                return None
+            if row[2] <= now:
+                conn.execute("DELETE FROM ephemeral WHERE key = ?", (key,))
+                self._bump(conn, misses=1, expirations=1, bytes=-row[1], entries=-1)
+                return None
+            conn.execute("UPDATE ephemeral SET last_used = ? WHERE key = ?", (now, key))
+            self._bump(conn, hits=1)
+        return json.loads(row[0])
+
+    def purge(self, key: str) -> bool:
+        with self._write() as conn:
+            row = conn.execute("SELECT size FROM ephemeral WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return False
+            conn.execute("DELETE FROM ephemeral WHERE key = ?", (key,))
+            self._bump(conn, bytes=-row[0], entries=-1)
+            return True
+
+    def sweep(self) -> int:
+        now = self._clock()
+        with self._write() as conn:
+            count, freed = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM ephemeral WHERE expires <= ?", (now,)).fetchone()
+            if count:
+                conn.execute("DELETE FROM ephemeral WHERE expires <= ?", (now,))
+                self._bump(conn, expirations=count, bytes=-freed, entries=-count)
+        return count
+
+    def stats(self) -> Dict[str, Any]:
+        conn = self._connect()
+        counters = {name: self._counter(conn, name) for name in COUNTERS}
+        return {"backend": self.backend, **counters, "max_entries": self.max_entries, "max_bytes": self.max_bytes}
+
+
+_STORE: Optional[Union[EphemeralStore, SqliteEphemeralStore]] = None
+_STORE_LOCK = threading.Lock()
+
+
+def _sweep_forever(store: Union[EphemeralStore, SqliteEphemeralStore], interval: float) -> None:
+    while True:
+        time.sleep(interval)
+        try:
+            store.sweep()
+        except sqlite3.Error:
+            # A busy shared file is retried on the next tick; another worker may already have swept it.
+            pass
+
+
+def get_ephemeral_store() -> Union[EphemeralStore, SqliteEphemeralStore]:
+    """The process-wide store; the first call starts its background sweeper."""
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = SqliteEphemeralStore(EPHEMERAL_PATH) if EPHEMERAL_PATH else EphemeralStore()
+            if EPHEMERAL_SWEEP_SECONDS > 0:
+                threading.Thread(
+                    target=_sweep_forever, args=(_STORE, EPHEMERAL_SWEEP_SECONDS), name="trustbot-ephemeral-sweep", daemon=True
+                ).start()
+        return _STORE
 
-def _now() -> float:
-    return time.time()
 
 def put_ephemeral(key: str, payload: Dict[str, Any], ttl: int = DEFAULT_TTL_SECONDS) -> None:
-    _STORE[key] = {"payload": payload, "expires": _now() + ttl}
+    get_ephemeral_store().put(key, payload, ttl)
 
 def get_ephemeral(key: str) -> Optional[Dict[str, Any]]:
-    item = _STORE.get(key)
-    if not item:
-        return None
-    if item["expires"] < _now():
-        _STORE.pop(key, None)
-        return None
-    return item["payload"]
+    return get_ephemeral_store().get(key)
 
 def purge(key: str) -> bool:
-    return _STORE.pop(key, None) is not None
+    return get_ephemeral_store().purge(key)
 
 def receipt_for_bytes(b: bytes) -> str:
     return hashlib.sha256(b).hexdigest()
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import os
+import tempfile
+from typing import BinaryIO, Dict, NamedTuple, Optional
+
+from starlette.types import Message, Receive
+
+from fastapi import HTTPException, Request
+from starlette.datastructures import UploadFile
+
+MAX_UPLOAD_BYTES = int(os.environ.get("TRUSTBOT_MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+SPOOL_MEMORY_BYTES = 1024 * 1024
+
+
+class MediaUpload(NamedTuple):
+    file: BinaryIO
+    size: int
+    fields: Dict[str, str]
+    file_name: Optional[str]
+    file_mime: Optional[str]
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Upload exceeds {max_bytes} bytes.")
+
+
+def _check_declared_length(request: Request, max_bytes: int) -> None:
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes:
+        raise _too_large(max_bytes)
+
+
+def _capped_receive(request: Request, max_bytes: int) -> Receive:
+    # Chunked bodies declare no length, so the cap is enforced on the bytes as they arrive.
+    received = 0
+
+    async def receive() -> Message:
+        nonlocal received
+        message = await request.receive()
+        if message["type"] == "http.request":
+            received += len(message.get("body", b""))
+            if received > max_bytes:
+                raise _too_large(max_bytes)
+        return message
+
+    return receive
+
+
+async def _spool_body(request: Request, max_bytes: int) -> tuple[BinaryIO, int]:
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > max_bytes:
+            spool.close()
+            raise _too_large(max_bytes)
+        spool.write(chunk)
+    spool.seek(0)
+    return spool, size
+
+
+async def receive_upload(request: Request, header_fields: Dict[str, str], max_bytes: Optional[int] = None) -> MediaUpload:
+    """Accept one media file as multipart/form-data or as a raw application/octet-stream body.
+
+    Multipart metadata comes from form fields; raw-body metadata comes from the headers named in
+    ``header_fields`` (field name -> header). Bodies are spooled to a temp file, never held as base64.
+    """
+    max_bytes = MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    _check_declared_length(request, max_bytes)
+    content_type = request.headers.get("content-type", "").lower()
+
+    if content_type.startswith("multipart/form-data"):
+        # The whole multipart body counts against the cap, as with Content-Length above.
+        form = await Request(request.scope, _capped_receive(request, max_bytes)).form(max_files=1)
+        upload = next((value for value in form.values() if isinstance(value, UploadFile)), None)
+        if upload is None:
+            raise HTTPException(status_code=422, detail="Multipart upload must include one file part.")
+        size = upload.size if upload.size is not None else 0
+        upload.file.seek(0)
+        fields = {key: value for key, value in form.items() if isinstance(value, str)}
+        return MediaUpload(
+            file=upload.file,
+            size=size,
+            fields=fields,
+            file_name=fields.get("file_name") or upload.filename,
+            file_mime=fields.get("file_mime") or upload.content_type,
+        )
+
+    if content_type.startswith("application/octet-stream"):
+        spool, size = await _spool_body(request, max_bytes)
+        fields = {name: request.headers[header] for name, header in header_fields.items() if header in request.headers}
+        return MediaUpload(
+            file=spool,
+            size=size,
+            fields=fields,
+            file_name=fields.get("file_name"),
+            file_mime=fields.get("file_mime"),
+        )
+
+    raise HTTPException(status_code=415, detail="Send media as multipart/form-data or application/octet-stream.")
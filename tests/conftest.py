@@ -0,0 +1,10 @@
+from __future__ import annotations
+
+import os
+import tempfile
+
+# Set before any app module is imported: the v2 service and the extraction cache read these at import,
+# and their defaults would otherwise leave SQLite files in the working tree.
+_DATA_DIR = tempfile.mkdtemp(prefix="trustbot-tests-")
+os.environ.setdefault("TRUSTBOT_DB_PATH", os.path.join(_DATA_DIR, "trustbot_v2.db"))
+os.environ.setdefault("TRUSTBOT_EXTRACTION_CACHE_PATH", os.path.join(_DATA_DIR, "trustbot_extraction_cache.db"))
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.api.investigations as investigations_api
+import app.batch as batch
+import app.main as main
+from app.admission import AdmissionController, CostClass, Overloaded, parse_limits
+from app.domain.enums import ArtifactType, EvidenceDirection
+from app.domain.models import ArtifactRecord
+from app.providers.base import make_evidence
+from app.services.evidence_service import EvidenceService, ProviderSpec
+
+
+def _controller(monkeypatch, degrade_at: float = 0.0, **limits) -> AdmissionController:
+    controller = AdmissionController({**parse_limits(""), **limits}, queue_timeout=0.05, degrade_at=degrade_at)
+    for module in (main, batch, investigations_api):
+        monkeypatch.setattr(module, "get_admission", lambda: controller)
+    return controller
+
+
+def test_full_queue_is_shed_with_429_and_retry_after(monkeypatch) -> None:
+    controller = _controller(monkeypatch, text=(1, 0))
+    asyncio.run(controller.classes["text"].acquire())  # hold the only text slot
+
+    resp = TestClient(main.app).post("/v1/analyze", json={"content_type": "text", "text": "Are we still on for dinner?"})
+
+    assert resp.status_code == 429
+    assert resp.headers["Retry-After"] == "1"
+    stats = TestClient(main.app).get("/stats").json()["admission"]["text"]
+    assert (stats["running"], stats["queued"], stats["shed"]) == (1, 0, 1)
+
+
+def test_released_slot_passes_to_the_oldest_waiter_on_another_loop() -> None:
+    cls = CostClass("image", concurrency=1, max_queue=1, queue_timeout=5)
+    asyncio.run(cls.acquire())
+    waiter = threading.Thread(target=lambda: asyncio.run(cls.acquire()))
+    waiter.start()
+    deadline = time.monotonic() + 5
+    while cls.stats()["queued"] != 1:
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+    with pytest.raises(Overloaded):
+        asyncio.run(cls.acquire())  # queue is full
+    cls.release(elapsed=0.5)
+    waiter.join(5)
+
+    stats = cls.stats()
+    assert (stats["running"], stats["queued"], stats["admitted"], stats["shed"]) == (1, 0, 2, 1)
+    cls.queue_timeout = 0.01
+    with pytest.raises(Overloaded) as exc_info:
+        asyncio.run(cls.acquire())  # waits, nobody releases
+    assert cls.stats()["timeouts"] == 1 and exc_info.value.retry_after >= 1
+
+
+def test_links_under_pressure_skip_the_fetch(monkeypatch) -> None:
+    controller = _controller(monkeypatch, degrade_at=1.0, link=(1, 0))
+    asyncio.run(controller.classes["link"].acquire())  # link class saturated
+
+    async def no_fetch(url: str) -> dict:
+        raise AssertionError("degraded requests must not fetch")
+
+    monkeypatch.setattr("app.router.analyze_provenance_async", no_fetch)
+    resp = TestClient(main.app).post("/v1/analyze", json={"content_type": "link", "url": "http://kyc-update.example.xyz/verify"})
+
+    assert resp.status_code == 200
+    assert resp.json()["debug"]["degraded"] is True
+    assert resp.json()["debug"]["pipelines"][1]["skipped"] == "degraded"
+    assert controller.stats()["link"]["degraded"] == 1
+    assert controller.stats()["text"]["admitted"] == 1
+
+    def static(artifact: ArtifactRecord) -> list:
+        return [make_evidence(artifact.investigation_id, artifact.artifact_id, "url_static", "URL_STATIC_HIT", EvidenceDirection.RISK, 0.5, "hit")]
+
+    fetches: list = []
+    service = EvidenceService(
+        providers=(
+            ProviderSpec("url_static", static, frozenset({ArtifactType.LINK})),
+            ProviderSpec("url_fetch", lambda artifact: fetches.append(artifact) or [], frozenset({ArtifactType.LINK}), kind="io"),
+        )
+    )
+    artifact = ArtifactRecord(
+        artifact_id="art_test",
+        investigation_id="inv_test",
+        type=ArtifactType.LINK,
+        sha256="0" * 64,
+        source_channel="whatsapp",
+        payload={"url": "http://kyc-update.example.xyz/verify"},
+        created_at=datetime.now(timezone.utc),
+    )
+    evidence = service.gather(service.submit(artifact, frozenset({"url_fetch"}))).evidence
+    assert fetches == []
+    assert [item.code for item in evidence] == ["URL_STATIC_HIT", "PROVIDER_SKIPPED"]
+
+
+def test_batch_items_are_admitted_per_item(monkeypatch) -> None:
+    controller = _controller(monkeypatch, degrade_at=1.0, link=(1, 0), image=(1, 0))
+    asyncio.run(controller.classes["link"].acquire())
+    asyncio.run(controller.classes["image"].acquire())
+
+    def no_fetch(url: str) -> dict:
+        raise AssertionError("degraded batch links must not fetch")
+
+    monkeypatch.setattr("app.router.analyze_provenance", no_fetch)
+    items = [
+        {"content_type": "link", "url": "http://kyc-update.example.xyz/verify"},
+        {"content_type": "image", "image_b64": "aGVsbG8="},
+        {"content_type": "text", "text": "See you at lunch tomorrow?"},
+    ]
+    lines = [json.loads(line) for line in TestClient(main.app).post("/v1/analyze:batch", json=items).text.splitlines()]
+
+    assert lines[0]["result"]["debug"]["degraded"] is True
+    assert lines[1]["error"]["status"] == 429 and lines[1]["error"]["retry_after"] >= 1
+    assert "result" in lines[2]
+    stats = controller.stats()
+    assert (stats["link"]["degraded"], stats["image"]["shed"], stats["text"]["admitted"]) == (1, 1, 3)
+
+
+def test_v2_batch_items_are_shed_by_their_artifact_cost(monkeypatch) -> None:
+    controller = _controller(monkeypatch, text=(1, 0))
+    asyncio.run(controller.classes["text"].acquire())
+
+    body = [{"artifact": {"type": "text", "text": "Are we still on for dinner?"}}]
+    lines = [json.loads(line) for line in TestClient(main.app).post("/v2/investigations/analyze:batch", json=body).text.splitlines()]
+
+    assert lines[0]["error"]["status"] == 429
+    assert controller.stats()["text"]["shed"] == 1
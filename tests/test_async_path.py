@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+
+from app.main import app
+from app.models import AnalyzeRequest
+from app.pipelines import provenance
+from app.pipelines.provenance_cache import ProvenanceCache
+from app.router import route_and_analyze, route_and_analyze_async
+from app.services.investigation_service import InvestigationService
+
+
+def _fetch(url: str) -> dict:
+    return {"ok": True, "final_url": url + "/login", "status": 200, "chain": [url, url + "/a", url + "/login"], "content_type": "text/html", "form_lure": True}
+
+
+@pytest.fixture()
+def fake_fetches(monkeypatch) -> None:
+    monkeypatch.setattr(provenance, "get_provenance_cache", lambda cache=ProvenanceCache(ttl_seconds=0, negative_ttl_seconds=0): cache)
+    monkeypatch.setattr(provenance, "_safe_get", _fetch)
+
+    async def slow_fetch(url: str) -> dict:
+        await asyncio.sleep(0.5 if "slow" in url else 0)
+        return _fetch(url)
+
+    monkeypatch.setattr(provenance, "_safe_get_async", slow_fetch)
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        {"content_type": "text", "text": "Share OTP now at http://kyc.example.xyz and https://bit.ly/abc to avoid block"},
+        {"content_type": "link", "url": "http://bit.ly/otp-reset"},
+        {"content_type": "document"},
+    ],
+    ids=["text", "link", "document"],
+)
+def test_async_routing_matches_sync_routing(body: dict, fake_fetches) -> None:
+    req = AnalyzeRequest(**body)
+    sync = route_and_analyze(req)
+    routed = asyncio.run(route_and_analyze_async(req))
+
+    assert routed["signals"] == sync["signals"]
+    assert routed["reason_codes"] == sync["reason_codes"]
+    assert [p["name"] for p in routed["debug"]["pipelines"]] == [p["name"] for p in sync["debug"]["pipelines"]]
+
+
+def test_slow_link_fetches_do_not_hold_up_text_checks(fake_fetches) -> None:
+    async def run() -> tuple:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            started = time.monotonic()
+
+            async def post(body: dict) -> float:
+                resp = await client.post("/v1/analyze", json=body)
+                assert resp.status_code == 200
+                return time.monotonic() - started
+
+            links = [post({"content_type": "link", "url": f"http://slow-{i}.example.top"}) for i in range(200)]
+            texts = [post({"content_type": "text", "text": f"Lunch at {i}?"}) for i in range(50)]
+            done = await asyncio.gather(*links, *texts)
+            return done[:200], done[200:]
+
+    links, texts = asyncio.run(run())
+
+    assert min(links) >= 0.5
+    assert max(texts) < 0.5
+
+
+def test_async_long_poll_wakes_when_evidence_settles(tmp_path: Path) -> None:
+    service = InvestigationService.from_db_path(str(tmp_path / "trustbot_v2_async.db"))
+    service._track_pending("inv_1", 1)
+    threading.Timer(0.1, service._track_pending, ("inv_1", -1)).start()
+
+    started = time.monotonic()
+    asyncio.run(service.wait_settled("inv_1", wait=10))
+
+    assert time.monotonic() - started < 2
+    assert service._async_waiters == {}
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.api.investigations as investigations_api
+from app.main import app
+from app.services.investigation_service import InvestigationService
+
+ITEMS = [
+    {"content_type": "text", "text": "URGENT: your KYC is pending, share OTP at http://kyc-update.example.xyz/verify"},
+    {"content_type": "link", "url": "http://kyc-update.example.xyz/verify"},
+    {"content_type": "text", "text": "See you at lunch tomorrow?"},
+    {"content_type": "text", "text": "URGENT: your KYC is pending, share OTP at http://kyc-update.example.xyz/verify"},
+]
+
+
+@pytest.fixture()
+def client() -> TestClient:
+    return TestClient(app)
+
+
+@pytest.fixture()
+def provenance_calls(monkeypatch) -> list:
+    calls: list = []
+
+    def provenance(url: str) -> dict:
+        calls.append(url)
+        return {"signals": [], "reasons": [], "reason_codes": [], "debug": {"name": "provenance", "fetch": None}}
+
+    monkeypatch.setattr("app.router.analyze_provenance", provenance)
+    return calls
+
+
+def _lines(resp) -> list:
+    return [json.loads(line) for line in resp.text.splitlines()]
+
+
+def test_batch_matches_single_calls_and_checks_each_url_once(client: TestClient, provenance_calls: list) -> None:
+    resp = client.post("/v1/analyze:batch", json=ITEMS)
+    lines = _lines(resp)
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    assert [line["index"] for line in lines] == [0, 1, 2, 3]
+    assert provenance_calls == ["http://kyc-update.example.xyz/verify"]
+    for item, line in zip(ITEMS, lines):
+        single = client.post("/v1/analyze", json=item).json()
+        assert (line["result"]["verdict"], line["result"]["reason_codes"]) == (single["verdict"], single["reason_codes"])
+
+
+def test_ndjson_body_reports_invalid_lines_in_place(client: TestClient, provenance_calls: list) -> None:
+    body = "\n".join([json.dumps(ITEMS[2]), "{not json", json.dumps({"content_type": "video"}), ""])
+    resp = client.post("/v1/analyze:batch", content=body, headers={"Content-Type": "application/x-ndjson"})
+    lines = _lines(resp)
+
+    assert resp.status_code == 200
+    assert "result" in lines[0]
+    assert [line["error"]["status"] for line in lines[1:]] == [422, 422]
+
+
+def test_v2_batch_creates_an_investigation_per_item(client: TestClient, tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr("app.services.evidence_service.collect_url_fetch_evidence", lambda artifact: [])
+    service = InvestigationService.from_db_path(str(tmp_path / "trustbot_v2_batch.db"))
+    monkeypatch.setattr(investigations_api, "service", service)
+    artifact = {"type": "text", "text": "Your electricity will be cut tonight, pay now at http://bill-pay.example.top"}
+    body = [{"artifact": artifact}, {"artifact": artifact}, {"investigation_id": "inv_missing", "artifact": artifact}]
+
+    lines = _lines(client.post("/v2/investigations/analyze:batch", json=body))
+
+    first, second = lines[0]["result"], lines[1]["result"]
+    assert first["investigation_id"] != second["investigation_id"]
+    assert first["verdict"] == second["verdict"]
+    assert lines[2]["error"]["status"] == 404
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import time
+from typing import List, Optional
+
+from app.pipelines import document_ocr
+from app.pipelines.document_ocr import _extract_pdf_text
+
+
+def _pdf(pages: List[Optional[str]]) -> bytes:
+    """Minimal PDF; a ``None`` page has no text layer, like a scanned page."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", b"", b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        stream = b"" if text is None else b"BT /F1 10 Tf 20 760 Td (" + text.encode("latin-1") + b") Tj ET"
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+            % len(objects)
+        )
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [" + b" ".join(kids) + b"] /Count %d >>" % len(pages)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def test_scanned_pages_fall_back_to_ocr_in_page_order(monkeypatch) -> None:
+    monkeypatch.setattr(document_ocr, "_ocr_version_or_none", lambda: "tesseract-test")
+    monkeypatch.setattr(document_ocr, "_ocr_image", lambda image: f"scanned {image.size[0]}px")
+    log: list = []
+
+    text = _extract_pdf_text(_pdf(["Account statement", None, "Share your OTP"]), page_log=log)
+
+    assert text.splitlines() == ["Account statement", "scanned 1700px", "Share your OTP"]
+    assert [entry["source"] for entry in log] == ["text", "ocr", "text"]
+    assert all("ms" in entry for entry in log)
+
+
+def test_extraction_stops_once_enough_text_is_collected(monkeypatch) -> None:
+    monkeypatch.setattr(document_ocr, "_ocr_version_or_none", lambda: None)
+    log: list = []
+
+    text = _extract_pdf_text(_pdf(["A" * 60] * 10 + [None]), max_chars=100, page_log=log)
+
+    assert [entry["page"] for entry in log] == [1, 2]
+    assert len(text) == 121
+
+
+def test_scanned_pages_in_flight_are_capped_and_stop_early(monkeypatch) -> None:
+    monkeypatch.setattr(document_ocr, "_ocr_version_or_none", lambda: "tesseract-test")
+    monkeypatch.setattr(document_ocr, "OCR_MAX_PENDING", 2)
+
+    def slow_ocr(image) -> str:
+        time.sleep(0.02)
+        return "B" * 80
+
+    monkeypatch.setattr(document_ocr, "_ocr_image", slow_ocr)
+    log: list = []
+
+    text = _extract_pdf_text(_pdf([None] * 20), max_chars=100, page_log=log)
+
+    # Two pages in flight, then the wait on page 1 and page 2 brings in enough text.
+    assert 2 <= len(log) <= 3
+    assert all(entry["source"] == "ocr" and entry["chars"] == 80 for entry in log)
+    assert len(text) >= 100
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from app.storage import EphemeralStore, SqliteEphemeralStore
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_unread_keys_are_swept_once_expired() -> None:
+    clock = FakeClock()
+    store = EphemeralStore(clock=clock)
+    for i in range(100):
+        store.put(f"receipt-{i}", {"verdict": "RISKY"}, ttl=10 if i % 2 else 60)
+
+    clock.now += 11
+    assert store.sweep() == 50
+    assert store.get("receipt-1") is None
+    assert store.get("receipt-2") == {"verdict": "RISKY"}
+
+    clock.now += 3600
+    assert store.sweep() == 50
+    stats = store.stats()
+    assert (stats["entries"], stats["bytes"], stats["expirations"]) == (0, 0, 100)
+
+
+def test_least_recently_used_entries_are_evicted_at_the_caps() -> None:
+    store = EphemeralStore(max_entries=3)
+    for key in "abc":
+        store.put(key, {"k": key})
+    store.get("a")
+    store.put("d", {"k": "d"})
+
+    assert store.get("b") is None
+    assert [store.get(key) is not None for key in "acd"] == [True, True, True]
+    assert store.stats()["evictions"] == 1
+
+    small = EphemeralStore(max_bytes=600)
+    for i in range(5):
+        small.put(str(i), {"blob": "x" * 100})
+    assert small.stats()["bytes"] <= 600
+    assert small.get("4") is not None and small.get("0") is None
+
+
+def test_sqlite_backend_is_shared_between_workers(tmp_path: Path) -> None:
+    clock = FakeClock()
+    path = tmp_path / "ephemeral.db"
+    first = SqliteEphemeralStore(path, max_entries=2, clock=clock)
+    second = SqliteEphemeralStore(path, max_entries=2, clock=clock)
+
+    first.put("a", {"verdict": "RISKY"}, ttl=5)
+    assert second.get("a") == {"verdict": "RISKY"}
+    second.put("b", {"verdict": "SAFE"}, ttl=60)
+    second.put("c", {"verdict": "UNSURE"}, ttl=60)
+    assert first.get("a") is None
+
+    clock.now += 61
+    assert first.sweep() == 2
+    stats = second.stats()
+    assert (stats["entries"], stats["bytes"], stats["evictions"], stats["expirations"]) == (0, 0, 1, 2)
+
+
+def test_sqlite_entry_count_survives_overwrites_and_reopening(tmp_path: Path) -> None:
+    path = tmp_path / "ephemeral.db"
+    store = SqliteEphemeralStore(path, max_entries=10)
+    for key in "abca":
+        store.put(key, {"k": key})
+    store.purge("b")
+    assert store.stats()["entries"] == 2
+
+    with store._write() as conn:  # a file written before the counter existed
+        conn.execute("DELETE FROM counters WHERE name = 'entries'")
+    assert SqliteEphemeralStore(path, max_entries=10).stats()["entries"] == 2
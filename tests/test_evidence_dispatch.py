@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import base64
+import io
+import time
+from datetime import datetime, timezone
+
+from PIL import Image
+
+from app.domain.decision import decide_investigation
+from app.domain.enums import ArtifactType, EvidenceDirection
+from app.domain.models import ArtifactRecord
+from app.providers.base import make_evidence
+from app.services.evidence_service import EvidenceService, ProviderSpec
+
+
+def _artifact(artifact_type: ArtifactType, **payload) -> ArtifactRecord:
+    return ArtifactRecord(
+        artifact_id="art_test",
+        investigation_id="inv_test",
+        type=artifact_type,
+        sha256="0" * 64,
+        source_channel="whatsapp",
+        payload=payload,
+        created_at=datetime.now(timezone.utc),
+    )
+
+
+def _constant(name: str):
+    def collect(artifact: ArtifactRecord):
+        return [
+            make_evidence(
+                investigation_id=artifact.investigation_id,
+                artifact_id=artifact.artifact_id,
+                provider=name,
+                code=f"{name.upper()}_HIT",
+                direction=EvidenceDirection.RISK,
+                weight=0.5,
+                summary=f"{name} hit",
+            )
+        ]
+
+    return collect
+
+
+def test_only_providers_registered_for_the_type_run() -> None:
+    calls = []
+
+    def spy(artifact):
+        calls.append(artifact.type)
+        return []
+
+    service = EvidenceService(
+        providers=(
+            ProviderSpec("link_only", spy, frozenset({ArtifactType.LINK})),
+            ProviderSpec("text_only", _constant("text_only"), frozenset({ArtifactType.CONTEXT})),
+        )
+    )
+    evidence = service.collect_for_artifact(_artifact(ArtifactType.CONTEXT, text="hello"))
+
+    assert calls == []
+    assert [item.code for item in evidence] == ["TEXT_ONLY_HIT"]
+
+
+def test_slow_provider_times_out_into_quality_evidence() -> None:
+    def slow(artifact):
+        time.sleep(1.0)
+        return _constant("slow")(artifact)
+
+    service = EvidenceService(
+        providers=(
+            ProviderSpec("fast", _constant("fast"), frozenset({ArtifactType.LINK})),
+            ProviderSpec("slow", slow, frozenset({ArtifactType.LINK}), kind="io", timeout=0.05),
+            ProviderSpec("broken", lambda artifact: 1 / 0, frozenset({ArtifactType.LINK}), kind="io", timeout=1.0),
+        )
+    )
+    started = time.monotonic()
+    evidence = service.collect_for_artifact(_artifact(ArtifactType.LINK, url="https://example.test"))
+
+    assert time.monotonic() - started < 0.5
+    assert [(item.provider, item.code, item.direction) for item in evidence] == [
+        ("fast", "FAST_HIT", EvidenceDirection.RISK),
+        ("slow", "PROVIDER_TIMEOUT", EvidenceDirection.QUALITY),
+        ("broken", "PROVIDER_ERROR", EvidenceDirection.QUALITY),
+    ]
+    assert evidence[1].details["outcome"] == "timeout"
+
+
+def test_providers_without_a_result_do_not_add_coverage() -> None:
+    def slow(artifact):
+        time.sleep(0.3)
+        return _constant("slow")(artifact)
+
+    artifact = _artifact(ArtifactType.LINK, url="https://example.test")
+    alone = EvidenceService(providers=(ProviderSpec("fast", _constant("fast"), frozenset({ArtifactType.LINK})),))
+    with_timeout = EvidenceService(
+        providers=alone.providers + (ProviderSpec("slow", slow, frozenset({ArtifactType.LINK}), kind="io", timeout=0.05),)
+    )
+
+    baseline = decide_investigation([artifact], alone.collect_for_artifact(artifact)).trace
+    evidence = with_timeout.collect_for_artifact(artifact)
+    trace = decide_investigation([artifact], evidence).trace
+
+    assert [item.code for item in evidence] == ["FAST_HIT", "PROVIDER_TIMEOUT"]
+    assert trace.coverage_score == baseline.coverage_score == 0.25
+
+
+def test_image_provider_runs_in_process_pool() -> None:
+    buf = io.BytesIO()
+    Image.effect_noise((70, 66), 64).convert("RGB").save(buf, format="JPEG", quality=30)
+    artifact = _artifact(ArtifactType.IMAGE, image_b64=base64.b64encode(buf.getvalue()).decode())
+
+    evidence = EvidenceService().collect_for_artifact(artifact)
+
+    assert evidence
+    assert {item.provider for item in evidence} == {"image_screening"}
+    assert not any(item.code.startswith("PROVIDER_") for item in evidence)
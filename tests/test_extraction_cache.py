@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import io
+import sqlite3
+import time
+from pathlib import Path
+
+from PIL import Image
+
+from app.pipelines import document_ocr, extraction_cache
+from app.pipelines.document_ocr import analyze_document_data
+from app.pipelines.extraction_cache import ExtractionCache
+
+
+def _pdf() -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (200, 100), "white").save(buf, format="PDF")
+    return buf.getvalue()
+
+
+def test_identical_pdf_is_extracted_once(tmp_path: Path, monkeypatch) -> None:
+    cache = ExtractionCache(tmp_path / "cache.db")
+    monkeypatch.setattr(extraction_cache, "_CACHE", cache)
+    calls = []
+
+    def extract(data, **kwargs):
+        calls.append(1)
+        return "Your KYC is pending, share the OTP to avoid account block."
+
+    monkeypatch.setattr(document_ocr, "_extract_pdf_text", extract)
+    raw = _pdf()
+
+    first = analyze_document_data(raw, mime="application/pdf", name="notice.pdf")
+    second = analyze_document_data(io.BytesIO(raw), mime="application/pdf", name="notice.pdf")
+
+    assert len(calls) == 1
+    assert (first["debug"]["cache"], second["debug"]["cache"]) == ("miss", "hit")
+    assert second["reason_codes"] == first["reason_codes"]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["bytes_saved"]) == (1, 1, len(raw))
+
+
+def test_engine_version_is_part_of_the_key(tmp_path: Path) -> None:
+    cache = ExtractionCache(tmp_path / "cache.db")
+    cache.put("ab" * 32, "pdf_text", "pdfplumber-1", "old text", source_bytes=10)
+
+    assert cache.get("ab" * 32, "pdf_text", "pdfplumber-1") == "old text"
+    assert cache.get("ab" * 32, "pdf_text", "pdfplumber-2") is None
+    assert cache.get("ab" * 32, "ocr_image", "pdfplumber-1") is None
+
+
+def test_least_recently_used_entries_are_evicted_past_the_byte_cap(tmp_path: Path) -> None:
+    cache = ExtractionCache(tmp_path / "cache.db", max_bytes=1600)
+    for i in range(3):
+        cache.put(f"{i:064x}", "pdf_text", "v1", "x" * 300, source_bytes=100)
+    cache.get(f"{0:064x}", "pdf_text", "v1")
+    cache.put(f"{3:064x}", "pdf_text", "v1", "x" * 300, source_bytes=100)
+
+    assert cache.get(f"{0:064x}", "pdf_text", "v1") is not None
+    assert cache.get(f"{1:064x}", "pdf_text", "v1") is None
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["entries"] == 3
+    assert stats["bytes"] <= 1600
+
+
+def test_lookups_do_not_wait_for_another_workers_write_lock(tmp_path: Path) -> None:
+    cache = ExtractionCache(tmp_path / "cache.db")
+    cache.put("ab" * 32, "pdf_text", "v1", "cached text", source_bytes=10)
+    other = sqlite3.connect(str(tmp_path / "cache.db"), isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")  # another worker mid-write
+
+    started = time.monotonic()
+    assert cache.get("cd" * 32, "pdf_text", "v1") is None
+    assert time.monotonic() - started < 1.0
+    other.execute("COMMIT")
+
+    assert cache.stats()["misses"] == 1
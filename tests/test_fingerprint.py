@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+from app.domain.enums import ArtifactType
+from app.domain.models import ArtifactRecord
+from app.pipelines import scam_text
+from app.pipelines.fingerprint import FingerprintIndex, fingerprint_key
+from app.providers.text_patterns import collect_text_pattern_evidence
+
+FORWARD = (
+    "Dear customer your SBI account will be blocked today because KYC is pending. "
+    "Update KYC immediately at the link below and share the OTP with our officer Ramesh on 9876543210."
+)
+
+
+def _text_artifact(text: str) -> ArtifactRecord:
+    return ArtifactRecord(
+        artifact_id="art_fp",
+        investigation_id="inv_fp",
+        type=ArtifactType.TEXT,
+        sha256="0" * 64,
+        source_channel="whatsapp",
+        payload={"text": text},
+        created_at=datetime.now(timezone.utc),
+    )
+
+
+def test_exact_and_near_duplicates_reuse_payload() -> None:
+    index = FingerprintIndex(capacity=16, max_distance=7)
+    index.add(fingerprint_key(FORWARD), "scored")
+
+    exact = index.lookup(fingerprint_key(FORWARD.replace("9876543210", "9123456780")))
+    near = index.lookup(fingerprint_key(FORWARD.replace("Ramesh", "Suresh")))
+    other = index.lookup(fingerprint_key("Your electricity bill of Rs 450 is generated. Pay by the due date in the app."))
+
+    assert exact is not None and exact.kind == "exact"
+    assert near is not None and near.kind == "near" and near.distance <= 7
+    assert other is None
+    assert index.stats()["exact_hits"] == 1
+    assert index.stats()["near_hits"] == 1
+    assert index.stats()["misses"] == 1
+
+
+def test_ring_buffer_evicts_oldest_entries() -> None:
+    index = FingerprintIndex(capacity=2, max_distance=0)
+    keys = [fingerprint_key(f"message number {word}") for word in ("one", "two", "three")]
+    for i, key in enumerate(keys):
+        index.add(key, i)
+
+    assert index.lookup(keys[0]) is None
+    assert index.lookup(keys[2]).payload == 2
+    assert index.stats()["entries"] == 2
+
+    near = FingerprintIndex(capacity=3, max_distance=7)
+    names = ("Anil", "Bala", "Chetan", "Deepa", "Esha", "Farhan", "Gita")
+    for i, name in enumerate(names):
+        near.add(fingerprint_key(FORWARD.replace("Ramesh", name)), i)
+    assert near.lookup(fingerprint_key(FORWARD.replace("Ramesh", "Suresh"))).payload in (4, 5, 6)
+    assert near.lookup(fingerprint_key(FORWARD.replace("Ramesh", "Bala"))).kind == "near"
+    assert near.stats()["entries"] == 3
+
+
+def test_v2_near_duplicate_with_a_different_link_reports_its_own_url(monkeypatch) -> None:
+    monkeypatch.setattr(scam_text, "TEXT_FINGERPRINTS", FingerprintIndex(capacity=16, max_distance=7))
+    first = FORWARD + " https://evil-one.example/kyc"
+    second = FORWARD + " https://evil-two.example/kyc"
+
+    collect_text_pattern_evidence(_text_artifact(first))
+    evidence = collect_text_pattern_evidence(_text_artifact(second))
+
+    has_url = [item for item in evidence if item.code == "TEXT_HAS_URL"]
+    assert [item.details["urls"] for item in has_url] == [["https://evil-two.example/kyc"]]
+
+
+def test_a_look_alike_sent_first_does_not_decide_the_next_message(monkeypatch) -> None:
+    monkeypatch.setattr(scam_text, "TEXT_FINGERPRINTS", FingerprintIndex(capacity=16, max_distance=7))
+    benign = "Dear customer your SBI account statement for the month of March is ready. Download it from the official app."
+
+    assert scam_text.analyze_text_scam(benign)["reason_codes"] == []
+    again = scam_text.analyze_text_scam(benign)
+    edited = scam_text.analyze_text_scam(benign + " Please share the OTP")
+
+    assert again["debug"]["fingerprint"] == "exact"
+    assert edited["reason_codes"] == ["SCAM_OTP_REQUEST"]
+    assert scam_text.TEXT_FINGERPRINTS.stats()["near_hits"] == 0
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.pipelines.image_forensics import _gradient_stats, analyze_image_data
+
+
+def _reference(gray: np.ndarray, block: int = 8) -> tuple[float, float]:
+    gray = gray.astype(np.float64)
+    h, w = gray.shape
+    gx = np.abs(gray[:, 1:] - gray[:, :-1])
+    gy = np.abs(gray[1:, :] - gray[:-1, :])
+    edge_density = 0.5 * (gx.mean() + gy.mean()) / 255.0
+    if h < block * 2 or w < block * 2:
+        return 0.0, edge_density
+    v_edges = np.abs(gray[:, block::block] - gray[:, block - 1:w - 1:block]).mean()
+    h_edges = np.abs(gray[block::block, :] - gray[block - 1:h - 1:block, :]).mean()
+    return ((v_edges + h_edges) / 2.0) / (gx.mean() + gy.mean() + 1e-6), edge_density
+
+
+@pytest.mark.parametrize("size", [(70, 66), (64, 64), (129, 40), (12, 30)])
+@pytest.mark.parametrize("stripe_rows", [3, 8, 512])
+def test_striped_kernel_matches_reference(size: tuple[int, int], stripe_rows: int) -> None:
+    gray = np.random.default_rng(sum(size)).integers(0, 256, size=(size[1], size[0]), dtype=np.uint8)
+    img = Image.fromarray(gray, mode="L")
+
+    blockiness, edge_density = _gradient_stats(img, stripe_rows=stripe_rows)
+    expected_blockiness, expected_edge_density = _reference(gray)
+
+    assert blockiness == pytest.approx(expected_blockiness, rel=1e-9)
+    assert edge_density == pytest.approx(expected_edge_density, rel=1e-9)
+
+
+def test_block_aligned_jpeg_is_analyzed() -> None:
+    # Widths and heights that are multiples of 8 used to crash the blockiness slice.
+    buf = io.BytesIO()
+    Image.effect_noise((128, 64), 64).convert("RGB").save(buf, format="JPEG", quality=20)
+
+    out = analyze_image_data(buf.getvalue())
+
+    assert "error" not in out["debug"]
+    assert out["debug"]["size"] == (128, 64)
+
+
+def _large_photo_jpeg() -> bytes:
+    y, x = np.mgrid[0:1536, 0:2048].astype(np.float32)
+    luma = 128 + 60 * np.sin(x / 97.0) * np.cos(y / 131.0) + np.random.default_rng(0).normal(0, 10, size=x.shape)
+    buf = io.BytesIO()
+    Image.fromarray(np.clip(luma, 0, 255).astype(np.uint8), mode="L").save(buf, format="JPEG", quality=60)
+    return buf.getvalue()
+
+
+def test_large_images_are_screened_from_sampled_bands() -> None:
+    data = _large_photo_jpeg()
+
+    full = analyze_image_data(data, fast_decode_pixels=0)
+    sampled = analyze_image_data(data, fast_decode_pixels=500_000)
+
+    assert full["debug"]["sample_every"] == 1
+    assert sampled["debug"]["sample_every"] == 7
+    assert sampled["reason_codes"] == full["reason_codes"]
+    assert sampled["debug"]["blockiness"] == pytest.approx(full["debug"]["blockiness"], rel=0.05)
+    assert sampled["debug"]["edge_density"] == pytest.approx(full["debug"]["edge_density"], rel=0.05)
+
+
+def test_sample_too_close_to_a_threshold_reads_every_row(monkeypatch) -> None:
+    monkeypatch.setattr("app.pipelines.image_forensics.SAMPLE_CONFIDENCE_Z", 1e9)
+    data = _large_photo_jpeg()
+
+    out = analyze_image_data(data, fast_decode_pixels=500_000)
+
+    assert out["debug"]["sample_every"] == 1
+    assert out["debug"]["edge_density"] == analyze_image_data(data, fast_decode_pixels=0)["debug"]["edge_density"]
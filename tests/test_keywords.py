@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import random
+
+from app.pipelines.keywords import KEYWORD_FAMILIES, KEYWORDS, KeywordAutomaton
+
+
+def _naive(text: str) -> dict:
+    lowered = text.lower()
+    hits = {}
+    for family, words in KEYWORD_FAMILIES.items():
+        found = {word for word in words if word in lowered}
+        if found:
+            hits[family] = frozenset(found)
+    return hits
+
+
+def test_overlapping_and_nested_keywords_are_all_reported() -> None:
+    automaton = KeywordAutomaton({"a": ["block", "blocked"], "b": ["lock", "ked"], "c": ["otp", "password"]})
+
+    assert automaton.scan("Account BLOCKED, send otpassword") == {
+        "a": frozenset({"block", "blocked"}),
+        "b": frozenset({"lock", "ked"}),
+        "c": frozenset({"otp", "password"}),
+    }
+
+
+def test_matches_naive_substring_scan() -> None:
+    vocab = [word for words in KEYWORD_FAMILIES.values() for word in words] + ["the", " ", "x", "-", "bank of"]
+    rng = random.Random(7)
+    for _ in range(300):
+        text = "".join(rng.choice(vocab) for _ in range(rng.randint(0, 12)))
+        assert KEYWORDS.scan(text) == _naive(text)
+
+
+def test_scan_bytes_finds_form_hints() -> None:
+    assert KEYWORDS.scan_bytes(b'<html><INPUT TYPE="password">')["form"] == frozenset({'type="password"'})
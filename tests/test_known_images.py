@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import base64
+import io
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from app.domain.enums import ArtifactType, EvidenceDirection
+from app.domain.models import ArtifactRecord
+from app.pipelines import image_hash
+from app.pipelines.image_hash import KnownImageIndex, image_dhash
+from app.providers.known_images import collect_known_image_evidence
+
+
+def _kyc_screenshot(size: tuple[int, int] = (720, 1280), fmt: str = "PNG", quality: int = 90) -> bytes:
+    canvas = Image.new("RGB", (720, 1280), "white")
+    draw = ImageDraw.Draw(canvas)
+    draw.rectangle((0, 0, 720, 160), fill=(20, 60, 160))
+    for top in range(220, 1200, 60):
+        draw.rectangle((40, top, 40 + (top * 7) % 600, top + 24), fill=(30, 30, 30))
+    draw.rectangle((120, 1100, 600, 1180), fill=(200, 30, 30))
+    buf = io.BytesIO()
+    canvas.resize(size).save(buf, format=fmt, quality=quality)
+    return buf.getvalue()
+
+
+def _receipt() -> bytes:
+    canvas = Image.new("RGB", (900, 600), (240, 240, 220))
+    draw = ImageDraw.Draw(canvas)
+    draw.ellipse((500, 50, 850, 400), fill=(20, 140, 60))
+    draw.rectangle((50, 450, 450, 520), fill=(10, 10, 10))
+    buf = io.BytesIO()
+    canvas.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def test_resaved_copy_matches_and_unrelated_image_does_not() -> None:
+    index = KnownImageIndex(max_distance=7)
+    index.add(image_dhash(_kyc_screenshot()), "kyc_suspended")
+
+    resaved = index.lookup(image_dhash(_kyc_screenshot(size=(540, 960), fmt="JPEG", quality=35)))
+
+    assert resaved is not None and resaved.label == "kyc_suspended" and resaved.distance <= 7
+    assert index.lookup(image_dhash(_receipt())) is None
+
+
+def test_multi_index_lookup_matches_brute_force_after_snapshot(tmp_path: Path) -> None:
+    rng = np.random.default_rng(3)
+    hashes = rng.integers(0, 2**63, size=5000, dtype=np.uint64) | (rng.integers(0, 2, size=5000, dtype=np.uint64) << np.uint64(63))
+    index = KnownImageIndex(max_distance=7)
+    index.add_many((int(h), f"label{i % 7}") for i, h in enumerate(hashes))
+    index.save(tmp_path / "known.npz")
+    loaded = KnownImageIndex.load(tmp_path / "known.npz", max_distance=7)
+    loaded.add(0x0123456789ABCDEF, "inserted_after_load")
+
+    for i in range(200):
+        query = int(hashes[i]) ^ sum(1 << int(bit) for bit in rng.choice(64, size=int(rng.integers(0, 10)), replace=False))
+        nearest = int(np.unpackbits((hashes ^ np.uint64(query)).view(np.uint8)).reshape(-1, 64).sum(axis=1).min())
+        match = loaded.lookup(query)
+        if nearest <= 7:
+            assert match is not None and match.distance == nearest
+        else:
+            assert match is None
+    assert loaded.lookup(0x0123456789ABCDEF ^ 0b101).label == "inserted_after_load"
+    assert len(loaded) == 5001
+
+
+def test_provider_emits_high_weight_risk_evidence(monkeypatch) -> None:
+    index = KnownImageIndex()
+    index.add(image_dhash(_kyc_screenshot()), "kyc_suspended")
+    monkeypatch.setattr(image_hash, "_INDEX", index)
+    artifact = ArtifactRecord(
+        artifact_id="art_test",
+        investigation_id="inv_test",
+        type=ArtifactType.IMAGE,
+        sha256="0" * 64,
+        source_channel="whatsapp",
+        payload={"image_b64": base64.b64encode(_kyc_screenshot(fmt="JPEG", quality=60)).decode()},
+        created_at=datetime.now(timezone.utc),
+    )
+
+    evidence = collect_known_image_evidence(artifact)
+
+    assert [(item.code, item.direction) for item in evidence] == [("IMG_KNOWN_SCAM", EvidenceDirection.RISK)]
+    assert evidence[0].weight >= 0.9
+    assert evidence[0].details["label"] == "kyc_suspended"
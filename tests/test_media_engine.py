@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import io
+import time
+from concurrent.futures import wait
+
+import pytest
+from PIL import Image
+
+from app.pipelines.image_forensics import analyze_image_data
+from app.pipelines.media_engine import MediaEngine, MediaEngineBusy
+
+
+def _jpeg_bytes() -> bytes:
+    buf = io.BytesIO()
+    Image.effect_noise((70, 66), 64).convert("RGB").save(buf, format="JPEG", quality=30)
+    return buf.getvalue()
+
+
+@pytest.fixture(scope="module")
+def engine():
+    engine = MediaEngine(workers=1, max_queue=1, queue_timeout=0.05)
+    yield engine
+    engine.shutdown()
+
+
+def test_shared_memory_job_matches_in_process_result(engine: MediaEngine) -> None:
+    data = _jpeg_bytes()
+    expected = analyze_image_data(data)
+
+    from_bytes = engine.analyze_image(data)
+    from_file = engine.analyze_image(io.BytesIO(data))
+
+    for out in (from_bytes, from_file):
+        assert out["reason_codes"] == expected["reason_codes"]
+        assert out["debug"]["engine"]["run_ms"] >= 0.0
+    stats = engine.stats()
+    assert stats["jobs"] >= 2 and stats["in_flight"] == 0 and stats["failures"] == 0
+
+
+def test_full_queue_is_rejected(engine: MediaEngine) -> None:
+    running = engine.submit(time.sleep, 0.5)
+    with pytest.raises(MediaEngineBusy):
+        engine.submit(time.sleep, 0)
+    wait([running])
+
+    assert engine.stats()["rejected"] == 1
+    assert running.timing.run_ms >= 400
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.domain.enums import ArtifactType
+from app.domain.models import ArtifactRecord
+from app.main import app
+from app.metrics import PROVIDER_OUTCOMES, PROVIDER_SECONDS, Histogram, timed
+from app.services.evidence_service import EvidenceService, ProviderSpec
+
+
+def test_histogram_renders_cumulative_buckets_and_times_failures() -> None:
+    latency = Histogram("test_latency_seconds", "Test latency.", ("step",), buckets=(0.01, 0.1), register=False)
+    series = latency.labels("parse")
+
+    @timed(series)
+    def fail() -> None:
+        raise ValueError("boom")
+
+    @timed(latency.labels("fetch"))
+    async def fetch() -> str:
+        return "ok"
+
+    series.observe(0.005)
+    series.observe(0.05)
+    with pytest.raises(ValueError):
+        fail()
+    assert asyncio.run(fetch()) == "ok"
+
+    out: list = []
+    latency.render(out)
+    assert out[:2] == ["# HELP test_latency_seconds Test latency.", "# TYPE test_latency_seconds histogram"]
+    assert 'test_latency_seconds_bucket{step="fetch",le="+Inf"} 1' in out
+    parse = [line for line in out if 'step="parse"' in line]
+    assert parse[0] == 'test_latency_seconds_bucket{step="parse",le="0.01"} 2'
+    assert parse[1] == 'test_latency_seconds_bucket{step="parse",le="0.1"} 3'
+    assert parse[2] == 'test_latency_seconds_bucket{step="parse",le="+Inf"} 3'
+    assert parse[4] == 'test_latency_seconds_count{step="parse"} 3'
+
+
+def test_provider_outcomes_and_latency_are_counted() -> None:
+    def slow(artifact: ArtifactRecord) -> list:
+        time.sleep(0.3)
+        return []
+
+    def broken(artifact: ArtifactRecord) -> list:
+        raise RuntimeError("down")
+
+    service = EvidenceService(
+        providers=(
+            ProviderSpec("metrics_ok", lambda artifact: [], frozenset({ArtifactType.LINK})),
+            ProviderSpec("metrics_slow", slow, frozenset({ArtifactType.LINK}), kind="io", timeout=0.05),
+            ProviderSpec("metrics_broken", broken, frozenset({ArtifactType.LINK}), kind="io"),
+        )
+    )
+    artifact = ArtifactRecord(
+        artifact_id="art_metrics",
+        investigation_id="inv_metrics",
+        type=ArtifactType.LINK,
+        sha256="0" * 64,
+        source_channel="whatsapp",
+        payload={"url": "https://example.com"},
+        created_at=datetime.now(timezone.utc),
+    )
+    service.collect_for_artifact(artifact)
+
+    assert PROVIDER_OUTCOMES.labels("metrics_ok", "ok").value == 1
+    assert PROVIDER_OUTCOMES.labels("metrics_slow", "timeout").value == 1
+    assert PROVIDER_OUTCOMES.labels("metrics_broken", "error").value == 1
+    counts, total = PROVIDER_SECONDS.labels("metrics_slow").snapshot()
+    assert sum(counts) == 1 and 0.04 < total < 0.3
+
+
+def test_metrics_endpoint_exposes_pipeline_latency_and_verdicts() -> None:
+    client = TestClient(app)
+    assert client.post("/v1/analyze", json={"content_type": "text", "text": "Share the OTP now or your account is blocked"}).status_code == 200
+
+    resp = client.get("/metrics")
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE trustbot_pipeline_seconds histogram" in resp.text
+    assert 'trustbot_pipeline_seconds_bucket{pipeline="text_scam",le="+Inf"}' in resp.text
+    assert 'trustbot_verdicts_total{api="v1",verdict="RISKY"}' in resp.text
+    assert 'trustbot_reason_codes_total{api="v1",code="SCAM_OTP_REQUEST"}' in resp.text
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import sys
+import threading
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from PIL import Image
+
+from app.pipelines import ocr_engine
+from app.pipelines.ocr_engine import OcrUnavailable, get_ocr_engine, ocr_health
+
+
+@pytest.fixture(autouse=True)
+def fresh_engine(monkeypatch):
+    monkeypatch.setattr(ocr_engine, "_ENGINE", None)
+    monkeypatch.setattr(ocr_engine, "_ENGINE_ERROR", None)
+
+
+def _fake_tesserocr(created: list, calls: list) -> types.ModuleType:
+    lock = threading.Lock()
+
+    class PyTessBaseAPI:
+        def __init__(self, lang: str) -> None:
+            created.append(lang)
+            self._size = None
+
+        def SetImage(self, image) -> None:
+            with lock:
+                calls.append(image.size)
+            self._size = image.size
+
+        def GetUTF8Text(self) -> str:
+            return f"text {self._size[0]}x{self._size[1]}"
+
+        def Clear(self) -> None:
+            self._size = None
+
+        def End(self) -> None:
+            pass
+
+    module = types.ModuleType("tesserocr")
+    module.PyTessBaseAPI = PyTessBaseAPI
+    module.tesseract_version = lambda: "tesseract 5.3.0\n leptonica-1.82.0"
+    return module
+
+
+def test_tesserocr_handles_are_created_once_and_reused(monkeypatch) -> None:
+    created: list = []
+    calls: list = []
+    monkeypatch.setitem(sys.modules, "tesserocr", _fake_tesserocr(created, calls))
+
+    engine = get_ocr_engine()
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        texts = list(pool.map(engine.image_to_string, [Image.new("L", (40 + i, 20)) for i in range(20)]))
+
+    assert get_ocr_engine() is engine
+    assert (engine.name, engine.version) == ("tesserocr", "5.3.0")
+    assert texts[3] == "text 43x20"
+    assert created == ["eng"] * ocr_engine.OCR_THREADS
+    assert len(calls) == 20
+    assert ocr_health()["ok"] is True
+
+
+def test_cli_fallback_honours_tesseract_cmd(monkeypatch) -> None:
+    monkeypatch.setitem(sys.modules, "tesserocr", None)
+    fake = types.ModuleType("pytesseract")
+    fake.pytesseract = types.SimpleNamespace(tesseract_cmd="tesseract")
+    fake.get_tesseract_version = lambda: "5.3.0"
+    fake.image_to_string = lambda image, lang: f"cli {lang}"
+    monkeypatch.setitem(sys.modules, "pytesseract", fake)
+    monkeypatch.setenv("TESSERACT_CMD", "/opt/tesseract/bin/tesseract")
+
+    engine = get_ocr_engine()
+
+    assert engine.name == "tesseract-cli"
+    assert engine.image_to_string(Image.new("L", (8, 8))) == "cli eng"
+    assert fake.pytesseract.tesseract_cmd == "/opt/tesseract/bin/tesseract"
+
+
+def test_missing_ocr_is_reported_once_and_remembered(monkeypatch) -> None:
+    monkeypatch.setitem(sys.modules, "tesserocr", None)
+    monkeypatch.setitem(sys.modules, "pytesseract", None)
+
+    with pytest.raises(OcrUnavailable):
+        get_ocr_engine()
+    monkeypatch.setitem(sys.modules, "tesserocr", _fake_tesserocr([], []))
+
+    with pytest.raises(OcrUnavailable):
+        get_ocr_engine()
+    assert ocr_health()["ok"] is False
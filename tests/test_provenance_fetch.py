@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+
+import pytest
+
+from app.pipelines.fetcher import AsyncFetcher, PooledFetcher
+from app.pipelines.provenance import _has_form_hint, analyze_provenance
+from app.pipelines.provenance_cache import ProvenanceCache, canonicalize_url
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        if self.path == "/hop":
+            self.send_response(302)
+            self.send_header("Location", "/login")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path == "/login":
+            body = b"<html>" + b"x" * 50_000 + b"<FORM action=/steal>" + b"y" * 1_000_000
+        else:
+            body = b"z" * 1_000_000
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+@pytest.fixture
+def base_url() -> Iterator[str]:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetch_follows_redirects_and_stops_at_form_hint(base_url: str) -> None:
+    fetch = PooledFetcher(pool_size=2).fetch(f"{base_url}/hop", stop_when=_has_form_hint)
+
+    assert fetch["ok"]
+    assert fetch["chain"] == [f"{base_url}/hop", f"{base_url}/login"]
+    assert fetch["final_url"] == f"{base_url}/login"
+    assert fetch["stopped"] == "matched"
+    assert fetch["bytes_read"] < 200_000
+
+
+def test_fetch_caps_body_bytes(base_url: str) -> None:
+    fetch = PooledFetcher(pool_size=2).fetch(f"{base_url}/big", max_bytes=200_000)
+
+    assert fetch["ok"]
+    assert fetch["stopped"] == "max_bytes"
+    assert fetch["bytes_read"] == 200_000
+
+
+def test_waiting_for_a_connection_counts_against_the_deadline(base_url: str) -> None:
+    fetcher = PooledFetcher(pool_size=1)
+    fetcher._slots.acquire()  # another fetch holds the only connection
+
+    started = time.monotonic()
+    fetch = fetcher.fetch(f"{base_url}/big", timeout=0.1)
+
+    assert time.monotonic() - started < 1.0
+    assert not fetch["ok"] and "waiting for a connection" in fetch["error"]
+    fetcher._slots.release()
+    assert fetcher.fetch(f"{base_url}/big", max_bytes=1_000)["ok"]
+    assert fetcher.stats() == {"pool_size": 1, "in_flight": 0, "pool_timeouts": 1}
+
+
+def test_async_fetch_matches_pooled_fetch(base_url: str) -> None:
+    async def fetch_both() -> list:
+        fetcher = AsyncFetcher(pool_size=2)
+        try:
+            return [
+                await fetcher.fetch(f"{base_url}/hop", stop_when=_has_form_hint),
+                await fetcher.fetch(f"{base_url}/big", max_bytes=200_000),
+            ]
+        finally:
+            await fetcher.client.aclose()
+
+    hop, big = asyncio.run(fetch_both())
+
+    assert hop["chain"] == [f"{base_url}/hop", f"{base_url}/login"]
+    assert (hop["stopped"], hop["status"], hop["content_type"]) == ("matched", 200, "text/html")
+    assert (big["stopped"], big["bytes_read"]) == ("max_bytes", 200_000)
+
+
+def test_canonical_url_drops_tracking_and_fragment() -> None:
+    assert (
+        canonicalize_url("HTTPS://Bit.LY:443/Verify?utm_source=wa&b=2&fbclid=x&a=1#top")
+        == "https://bit.ly/Verify?a=1&b=2"
+    )
+
+
+def test_provenance_cache_serves_repeat_urls(monkeypatch) -> None:
+    calls = []
+
+    def fake_get(url: str) -> dict:
+        calls.append(url)
+        return {"ok": True, "final_url": url, "status": 200, "chain": [url], "content_type": "text/html", "content": b"<form>", "form_lure": True}
+
+    cache = ProvenanceCache()
+    monkeypatch.setattr("app.pipelines.provenance.get_provenance_cache", lambda: cache)
+    monkeypatch.setattr("app.pipelines.provenance._safe_get", fake_get)
+
+    first = analyze_provenance("https://example.com/login?utm_campaign=x")
+    second = analyze_provenance("https://EXAMPLE.com/login#again")
+
+    assert len(calls) == 1
+    assert first["reason_codes"] == second["reason_codes"]
+    assert second["debug"]["fetch"]["cache"] == "hit"
+    assert "content" not in cache.get("https://example.com/login")
+    assert cache.stats()["hits"] == 2
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.pipelines import provenance
+from app.pipelines.provenance_cache import ProvenanceCache
+from app.singleflight import SingleFlight, SingleFlightTimeout
+
+
+def _wait_for(predicate, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_concurrent_identical_calls_share_one_run() -> None:
+    group = SingleFlight("test")
+    release = threading.Event()
+    runs = []
+
+    def work() -> dict:
+        runs.append(1)
+        release.wait(5)
+        return {"verdict": "RISKY"}
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(group.do, "same", work) for _ in range(8)]
+        _wait_for(lambda: group.stats()["coalesced"] == 7)
+        release.set()
+        results = [f.result() for f in futures]
+
+    assert len(runs) == 1
+    assert all(result == {"verdict": "RISKY"} for result, _ in results)
+    assert sorted(shared for _, shared in results) == [False] + [True] * 7
+    assert group.stats() == {"calls": 1, "coalesced": 7, "errors": 0, "timeouts": 0, "in_flight": 0}
+
+
+def test_errors_reach_waiters_and_waiters_can_time_out() -> None:
+    group = SingleFlight("test", timeout=0.05)
+    release = threading.Event()
+
+    def fail() -> None:
+        release.wait(5)
+        raise ValueError("upstream broke")
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        leader = pool.submit(group.do, "k", fail)
+        _wait_for(lambda: group.stats()["in_flight"] == 1)
+        impatient = pool.submit(group.do, "k", fail)
+        patient = pool.submit(group.do, "k", fail, timeout=5)
+        with pytest.raises(SingleFlightTimeout):
+            impatient.result()
+        release.set()
+        for future in (leader, patient):
+            with pytest.raises(ValueError, match="upstream broke"):
+                future.result()
+
+    assert group.do("k", lambda: "fresh") == ("fresh", False)
+    stats = group.stats()
+    assert (stats["errors"], stats["timeouts"], stats["coalesced"]) == (1, 1, 2)
+
+
+def test_concurrent_provenance_for_one_url_fetches_once(monkeypatch) -> None:
+    monkeypatch.setattr(provenance, "get_provenance_cache", lambda cache=ProvenanceCache(): cache)
+    fetched = []
+
+    def slow_get(url: str) -> dict:
+        fetched.append(url)
+        time.sleep(0.2)
+        return {"ok": True, "final_url": url, "status": 200, "chain": [url], "content_type": "text/html", "form_lure": False}
+
+    monkeypatch.setattr(provenance, "_safe_get", slow_get)
+    urls = [f"https://pay-fine.example.top/challan?utm_source=wa{i}" for i in range(6)]
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        results = list(pool.map(provenance.analyze_provenance, urls))
+
+    assert len(fetched) == 1
+    assert sorted(r["debug"]["fetch"]["cache"] for r in results) == ["coalesced"] * 5 + ["miss"]
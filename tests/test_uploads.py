@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import io
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException, Request
+from fastapi.testclient import TestClient
+from PIL import Image
+
+import app.api.investigations as investigations_api
+from app.main import app
+from app.schemas.api_requests import V2AnalyzeRequest
+from app.uploads import receive_upload
+from app.services.investigation_service import InvestigationService
+
+
+def _png_bytes() -> bytes:
+    buf = io.BytesIO()
+    Image.effect_noise((70, 66), 64).convert("RGB").save(buf, format="PNG")
+    return buf.getvalue()
+
+
+@pytest.fixture()
+def client() -> TestClient:
+    return TestClient(app)
+
+
+def test_v1_raw_upload_matches_base64_path(client: TestClient) -> None:
+    data = _png_bytes()
+    raw = client.post(
+        "/v1/analyze/upload",
+        content=data,
+        headers={"Content-Type": "application/octet-stream", "X-Content-Type": "image"},
+    )
+    encoded = client.post("/v1/analyze", json={"content_type": "image", "image_b64": base64.b64encode(data).decode()})
+
+    assert raw.status_code == 200
+    assert raw.json()["reason_codes"] == encoded.json()["reason_codes"]
+    assert raw.json()["verdict"] == encoded.json()["verdict"]
+
+
+def test_v1_multipart_upload(client: TestClient) -> None:
+    resp = client.post(
+        "/v1/analyze/upload",
+        data={"content_type": "image"},
+        files={"file": ("shot.png", _png_bytes(), "image/png")},
+    )
+    assert resp.status_code == 200
+
+
+def test_upload_rejects_oversized_and_unknown_bodies(client: TestClient, monkeypatch) -> None:
+    monkeypatch.setattr("app.uploads.MAX_UPLOAD_BYTES", 16)
+    too_big = client.post("/v1/analyze/upload", content=b"x" * 64, headers={"Content-Type": "application/octet-stream"})
+    wrong = client.post("/v1/analyze/upload", content=b"{}", headers={"Content-Type": "application/json"})
+
+    assert too_big.status_code == 413
+    assert wrong.status_code == 415
+
+
+def test_chunked_multipart_upload_is_capped_while_streaming() -> None:
+    head = b'--b\r\nContent-Disposition: form-data; name="file"; filename="big.pdf"\r\nContent-Type: application/pdf\r\n\r\n'
+    chunks = [head] + [b"x" * 1024] * 64 + [b"\r\n--b--\r\n"]
+    pulled = []
+
+    async def receive() -> dict:
+        pulled.append(chunks[len(pulled)])
+        return {"type": "http.request", "body": pulled[-1], "more_body": len(pulled) < len(chunks)}
+
+    # Chunked: no Content-Length header to reject up front.
+    scope = {"type": "http", "method": "POST", "path": "/", "headers": [(b"content-type", b"multipart/form-data; boundary=b")]}
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(receive_upload(Request(scope, receive), {}, max_bytes=4096))
+
+    assert exc_info.value.status_code == 413
+    assert len(pulled) <= 6
+
+
+def test_v2_artifact_upload_stores_blob_from_stream(client: TestClient, tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr("app.services.evidence_service.collect_url_fetch_evidence", lambda artifact: [])
+    service = InvestigationService.from_db_path(str(tmp_path / "trustbot_v2_upload.db"))
+    monkeypatch.setattr(investigations_api, "service", service)
+    created = service.analyze(V2AnalyzeRequest(artifact={"type": "text", "text": "Your parcel is held, pay the fee"}))
+
+    data = _png_bytes()
+    resp = client.post(
+        f"/v2/investigations/{created.investigation_id}/artifacts/upload",
+        content=data,
+        headers={"Content-Type": "application/octet-stream", "X-Artifact-Type": "image", "X-File-Name": "shot.png"},
+    )
+    missing = client.post(
+        "/v2/investigations/inv_missing/artifacts/upload",
+        content=data,
+        headers={"Content-Type": "application/octet-stream", "X-Artifact-Type": "image"},
+    )
+
+    assert resp.status_code == 200
+    assert missing.status_code == 404
+    image = [a for a in service.store.list_artifacts(created.investigation_id) if a.type.value == "image"][0]
+    assert image.blob_size == len(data)
+    assert service.blob_store.exists(image.blob_sha256)
@@ -1,11 +1,16 @@
 from __future__ import annotations
 
 import json
+import time
 from pathlib import Path
 
 import pytest
 
-from app.schemas.api_requests import V2AnalyzeRequest
+from app.domain.enums import ArtifactType, EvidenceDirection
+from app.metrics import DEFERRED_FAILURES
+from app.providers.base import make_evidence
+from app.schemas.api_requests import V2AnalyzeRequest, V2ArtifactRequest
+from app.services.evidence_service import EvidenceService, default_providers
 from app.services.investigation_service import InvestigationService
 
 
@@ -48,3 +53,89 @@ def test_v2_golden_cases(case: dict, tmp_path: Path, monkeypatch) -> None:
         actual_codes = {item.code for item in detail.evidence_items}
         for code in case["expected_evidence_codes"]:
             assert code in actual_codes
+
+
+def test_incremental_decision_matches_full_recompute(tmp_path: Path, monkeypatch) -> None:
+    disable_network_provenance(monkeypatch)
+    service = InvestigationService.from_db_path(str(tmp_path / "trustbot_v2_test.db"))
+    service.check_decisions = True
+
+    result = service.analyze(V2AnalyzeRequest(artifact={"type": "text", "text": "Your HDFC bill is ready."}))
+    for artifact in [
+        {"type": "context", "text": "Forwarded in a family group, asks to call helpline 98765 43210"},
+        {"type": "link", "url": "https://hdfc-verify.secure-pay.example.top/login"},
+        {"type": "image", "image_b64": ""},
+        {"type": "link", "url": "https://hdfcbank.com"},
+    ]:
+        result = service.add_artifact(result.investigation_id, V2ArtifactRequest(artifact=artifact))
+
+    detail = service.get_investigation(result.investigation_id)
+    assert detail is not None
+    assert result.artifacts_seen == len(detail.artifacts) == 5
+    assert detail.verdict == result.verdict
+
+
+def test_slow_provider_finishes_in_background_and_resolves(tmp_path: Path) -> None:
+    def slow_fetch(artifact):
+        time.sleep(0.3)
+        return [
+            make_evidence(
+                investigation_id=artifact.investigation_id,
+                artifact_id=artifact.artifact_id,
+                provider="url_fetch",
+                code="PROV_LOGIN_FORM",
+                direction=EvidenceDirection.RISK,
+                weight=0.95,
+                summary="The page asks for a login.",
+            )
+        ]
+
+    providers = [
+        spec._replace(collect=slow_fetch) if spec.name == "url_fetch" else spec for spec in default_providers()
+    ]
+    service = InvestigationService.from_db_path(str(tmp_path / "trustbot_v2_test.db"))
+    service.evidence_service = EvidenceService(providers=providers)
+    service.response_budget_ms = 50
+    service.check_decisions = True
+
+    result = service.analyze(V2AnalyzeRequest(artifact={"type": "link", "url": "https://hdfc-verify.example.top/login"}))
+    assert result.status.value == "ANALYZING"
+    assert service.get_investigation(result.investigation_id).status.value == "ANALYZING"
+
+    detail = service.get_investigation(result.investigation_id, wait=5)
+    assert detail.status.value != "ANALYZING"
+    assert "PROV_LOGIN_FORM" in {item.code for item in detail.evidence_items}
+    assert detail.evidence_items[-1].artifact_id == detail.artifacts[0].artifact_id
+    assert ArtifactType.LINK in {artifact.type for artifact in detail.artifacts}
+
+
+def test_failed_deferred_evidence_settles_the_status_and_is_reported(tmp_path: Path, monkeypatch, caplog) -> None:
+    disable_network_provenance(monkeypatch)
+
+    def slow_fetch(artifact):
+        time.sleep(0.3)
+        return []
+
+    providers = [
+        spec._replace(collect=slow_fetch) if spec.name == "url_fetch" else spec for spec in default_providers()
+    ]
+    service = InvestigationService.from_db_path(str(tmp_path / "trustbot_v2_test.db"))
+    service.evidence_service = EvidenceService(providers=providers)
+    service.response_budget_ms = 50
+
+    def broken_finish(artifact, deferred):
+        raise RuntimeError("store went away")
+
+    monkeypatch.setattr(service.evidence_service, "finish", broken_finish)
+    failures = DEFERRED_FAILURES.labels().value
+
+    result = service.analyze(V2AnalyzeRequest(artifact={"type": "link", "url": "https://hdfc-verify.example.top/login"}))
+    assert result.status.value == "ANALYZING"
+
+    started = time.monotonic()
+    detail = service.get_investigation(result.investigation_id, wait=5)
+    assert time.monotonic() - started < 2
+    assert detail.status.value != "ANALYZING"
+    assert service.store.get_investigation(result.investigation_id).status.value != "ANALYZING"
+    assert DEFERRED_FAILURES.labels().value == failures + 1
+    assert "store went away" in caplog.text
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import io
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from app.repositories.v2_store import MIGRATIONS, V2Store
+from app.schemas.api_requests import V2AnalyzeRequest
+from app.services.investigation_service import InvestigationService
+
+
+def test_store_migrates_to_latest_schema(tmp_path: Path) -> None:
+    store = V2Store(str(tmp_path / "store.db"))
+    conn = store._connect()
+
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == len(MIGRATIONS)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    plan = conn.execute(
+        "EXPLAIN QUERY PLAN SELECT payload_json FROM evidence_items WHERE investigation_id = ? ORDER BY rowid ASC",
+        ("inv_x",),
+    ).fetchall()
+    assert any("idx_evidence_items_investigation" in row[3] for row in plan)
+
+
+def test_analyze_commits_once(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr("app.services.evidence_service.collect_url_fetch_evidence", lambda artifact: [])
+    service = InvestigationService.from_db_path(str(tmp_path / "store.db"))
+    statements: list[str] = []
+    service.store._connect().set_trace_callback(statements.append)
+
+    text = "URGENT share OTP https://bit.ly/a https://bit.ly/b http://pay-verify.example.top/x"
+    result = service.analyze(V2AnalyzeRequest(artifact={"type": "text", "text": text}))
+
+    assert result.artifacts_seen == 4
+    assert [s for s in statements if s.upper().startswith("COMMIT")] == ["COMMIT"]
+
+
+def test_failed_unit_of_work_rolls_back(tmp_path: Path, monkeypatch) -> None:
+    service = InvestigationService.from_db_path(str(tmp_path / "store.db"))
+
+    def boom(investigation, artifacts, evidence_items):
+        raise RuntimeError("decision failed")
+
+    monkeypatch.setattr(service, "_finalize_response", boom)
+    with pytest.raises(RuntimeError):
+        service.analyze(V2AnalyzeRequest(artifact={"type": "text", "text": "hello there"}))
+
+    conn = service.store._connect()
+    assert conn.execute("SELECT COUNT(*) FROM investigations").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM artifacts").fetchone()[0] == 0
+
+
+def test_media_is_stored_once_as_a_content_addressed_blob(tmp_path: Path) -> None:
+    image = Image.effect_noise((70, 66), 64).convert("RGB")
+    buf = io.BytesIO()
+    image.save(buf, format="PNG")
+    raw = buf.getvalue()
+    artifact = {"type": "image", "image_b64": base64.b64encode(raw).decode("ascii")}
+
+    service = InvestigationService.from_db_path(str(tmp_path / "store.db"))
+    first = service.analyze(V2AnalyzeRequest(artifact=artifact))
+    service.analyze(V2AnalyzeRequest(artifact=artifact))
+
+    detail = service.get_investigation(first.investigation_id)
+    assert detail is not None
+    stored = detail.artifacts[0]
+    digest = hashlib.sha256(raw).hexdigest()
+    assert stored.blob_sha256 == stored.sha256 == digest
+    assert stored.payload["image_b64"] is None
+    assert any(item.provider == "image_screening" for item in detail.evidence_items)
+    assert service.blob_store.path_for(digest).read_bytes() == raw
+    assert len([p for p in service.blob_store.root.rglob("*") if p.is_file()]) == 1
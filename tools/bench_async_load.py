@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("TRUSTBOT_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="trustbot-bench-"), "bench.db"))
+
+import httpx  # noqa: E402
+
+from app.main import app  # noqa: E402
+
+TEXTS = [
+    "URGENT: your KYC is pending, share the OTP sent to you to avoid account block ({i})",
+    "Are we still on for dinner at 8? ({i})",
+    "Your electricity connection will be cut tonight, call 98xxxxxx10 immediately ({i})",
+]
+
+
+class _SlowHandler(BaseHTTPRequestHandler):
+    delay = 1.0
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        time.sleep(self.delay)
+        body = b"<html><form action=/login><input type=password></form></html>"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _slow_site(delay: float) -> Tuple[ThreadingHTTPServer, str]:
+    _SlowHandler.delay = delay
+    ThreadingHTTPServer.request_queue_size = 4096
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _SlowHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def _workload(n: int, site: str, seed: int) -> List[Tuple[str, str, dict]]:
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        r = rng.random()
+        if r < 0.6:
+            out.append(("text", "/v1/analyze", {"content_type": "text", "text": rng.choice(TEXTS).format(i=i)}))
+        elif r < 0.85:
+            out.append(("link", "/v1/analyze", {"content_type": "link", "url": f"{site}/verify?n={i}"}))
+        else:
+            out.append(("v2_text", "/v2/investigations/analyze", {"artifact": {"type": "text", "text": rng.choice(TEXTS).format(i=i)}}))
+    return out
+
+
+async def _run(workload: List[Tuple[str, str, dict]]) -> Tuple[Dict[str, List[float]], float, int]:
+    transport = httpx.ASGITransport(app=app)
+    latencies: Dict[str, List[float]] = {}
+    failures = 0
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+
+        async def one(kind: str, path: str, body: dict) -> None:
+            nonlocal failures
+            started = time.perf_counter()
+            resp = await client.post(path, json=body)
+            if resp.status_code != 200:
+                failures += 1
+            latencies.setdefault(kind, []).append((time.perf_counter() - started) * 1000.0)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(*item) for item in workload))
+        return latencies, time.perf_counter() - started, failures
+
+
+def _pct(values: List[float], q: float) -> float:
+    return statistics.quantiles(values, n=100)[q - 1] if len(values) > 1 else values[0]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Fire N concurrent mixed requests (text, slow links, v2 text) at the app in-process.")
+    ap.add_argument("--concurrency", type=int, default=1000)
+    ap.add_argument("--link-delay", type=float, default=1.0, help="Seconds the local link target takes to answer")
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    server, site = _slow_site(args.link_delay)
+    try:
+        asyncio.run(_run(_workload(20, site, args.seed + 1)))  # warm imports, pools and the store
+        latencies, elapsed, failures = asyncio.run(_run(_workload(args.concurrency, site, args.seed)))
+    finally:
+        server.shutdown()
+
+    total = sum(len(v) for v in latencies.values())
+    print(f"{total} requests in {elapsed:.2f}s = {total / elapsed:.0f} req/s, {failures} non-200")
+    for kind in sorted(latencies):
+        values = latencies[kind]
+        print(f"{kind:8s} n={len(values):4d}  p50 {_pct(values, 50):8.1f} ms  p99 {_pct(values, 99):8.1f} ms  max {max(values):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
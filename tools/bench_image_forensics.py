@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import argparse
+import io
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.pipelines.image_forensics import analyze_image_data  # noqa: E402
+
+
+def _legacy_analyze(data: bytes) -> tuple[float, float]:
+    # The pre-fused pipeline: RGB decode, float32 luma copy, separate gradient passes.
+    img = Image.open(io.BytesIO(data)).convert("RGB")
+    gray = np.asarray(img.convert("L"), dtype=np.float32)
+    h, w = gray.shape
+    block = 8
+    v_edges = np.abs(gray[:, block::block] - gray[:, block - 1:w - 1:block]).mean()
+    v_non = np.abs(gray[:, 1:] - gray[:, :-1]).mean()
+    h_edges = np.abs(gray[block::block, :] - gray[block - 1:h - 1:block, :]).mean()
+    h_non = np.abs(gray[1:, :] - gray[:-1, :]).mean()
+    blk = float(((v_edges + h_edges) / 2.0) / (v_non + h_non + 1e-6))
+    gx = np.abs(gray[:, 1:] - gray[:, :-1])
+    gy = np.abs(gray[1:, :] - gray[:-1, :])
+    return blk, float(0.5 * (gx.mean() + gy.mean()) / 255.0)
+
+
+def _fused_analyze(data: bytes) -> tuple[float, float]:
+    debug = analyze_image_data(data)["debug"]
+    return debug["blockiness"], debug["edge_density"]
+
+
+def _photo_like_jpeg(width: int, height: int, quality: int) -> bytes:
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    base = 128 + 60 * np.sin(x / 97.0) * np.cos(y / 131.0)
+    rgb = np.clip(base[..., None] + rng.normal(0, 12, size=(height, width, 3)), 0, 255).astype(np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(rgb, mode="RGB").save(buf, format="JPEG", quality=quality)
+    return buf.getvalue()
+
+
+def _measure(fn, data: bytes, runs: int) -> tuple[float, float, tuple[float, float]]:
+    samples = []
+    result = fn(data)
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn(data)
+        samples.append(time.perf_counter() - started)
+    tracemalloc.start()
+    fn(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(samples), peak / 1024 / 1024, result
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Image forensics throughput and peak NumPy allocations: legacy vs fused kernel.")
+    ap.add_argument("--sizes", default="1600x1200,4000x3000,8000x6000", help="Comma-separated WIDTHxHEIGHT list")
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--quality", type=int, default=85)
+    args = ap.parse_args()
+
+    print("peak = tracemalloc peak during one analysis (NumPy and Python allocations; PIL's decode buffer is not traced)")
+    for size in args.sizes.split(","):
+        width, height = (int(v) for v in size.lower().split("x"))
+        data = _photo_like_jpeg(width, height, args.quality)
+        megapixels = width * height / 1e6
+        print(f"{size} ({megapixels:.1f} MP, {len(data) / 1024 / 1024:.1f} MB JPEG)")
+        for label, fn in (("legacy", _legacy_analyze), ("fused", _fused_analyze)):
+            seconds, peak_mb, (blk, ed) = _measure(fn, data, args.runs)
+            print(
+                f"  {label:>6}: {seconds * 1000:8.1f} ms  {megapixels / seconds:6.1f} MP/s  peak={peak_mb:7.1f} MB"
+                f"  blockiness={blk:.4f} edge_density={ed:.4f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import argparse
+import base64
+import io
+import json
+import resource
+import subprocess
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def _make_pdf(target_bytes: int) -> bytes:
+    from PIL import Image
+
+    pages = []
+    size = 0
+    side = 1024
+    while size < target_bytes:
+        pages.append(Image.effect_noise((side, side), 96).convert("RGB"))
+        size += side * side  # noise barely compresses; roughly one byte per pixel survives the JPEG pass
+    buf = io.BytesIO()
+    pages[0].save(buf, format="PDF", save_all=True, append_images=pages[1:], quality=95)
+    return buf.getvalue()
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _run_mode(mode: str, pdf_path: str) -> None:
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    client = TestClient(app)
+    baseline = _peak_rss_mb()
+    data = Path(pdf_path).read_bytes()
+    if mode == "json":
+        body = json.dumps({"content_type": "document", "file_b64": base64.b64encode(data).decode(), "file_mime": "application/pdf"})
+        del data
+        resp = client.post("/v1/analyze", content=body, headers={"Content-Type": "application/json"})
+    else:
+        with open(pdf_path, "rb") as fh:
+            del data
+            resp = client.post(
+                "/v1/analyze/upload",
+                content=fh,
+                headers={"Content-Type": "application/octet-stream", "X-Content-Type": "document", "X-File-Mime": "application/pdf"},
+            )
+    print(json.dumps({"mode": mode, "status": resp.status_code, "baseline_mb": baseline, "peak_mb": _peak_rss_mb()}))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Peak RSS per /v1/analyze request: base64 JSON body vs raw upload.")
+    ap.add_argument("--size-mb", type=float, default=10.0)
+    ap.add_argument("--mode", choices=["json", "raw"], help=argparse.SUPPRESS)
+    ap.add_argument("--pdf", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.mode:
+        _run_mode(args.mode, args.pdf)
+        return
+
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = Path(tmp) / "bench.pdf"
+        pdf_path.write_bytes(_make_pdf(int(args.size_mb * 1024 * 1024)))
+        print(f"pdf: {pdf_path.stat().st_size / 1024 / 1024:.1f} MB")
+        # Each mode runs in a fresh interpreter so ru_maxrss is not shared between them.
+        for mode in ("json", "raw"):
+            out = subprocess.run(
+                [sys.executable, __file__, "--mode", mode, "--pdf", str(pdf_path)],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout.strip().splitlines()[-1]
+            result = json.loads(out)
+            growth = result["peak_mb"] - result["baseline_mb"]
+            print(f"{mode:>5}: status={result['status']}  peak={result['peak_mb']:.1f} MB  request growth={growth:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.domain.enums import EvidenceDirection  # noqa: E402
+from app.domain.models import EvidenceItemRecord  # noqa: E402
+from app.repositories.v2_store import V2Store  # noqa: E402
+
+
+def _populate(store: V2Store, rows: int, investigations: int, batch: int = 50_000) -> None:
+    now = datetime.now(timezone.utc)
+    template = EvidenceItemRecord(
+        evidence_id="ev_template",
+        investigation_id="inv_template",
+        artifact_id="art_template",
+        provider="text_patterns",
+        code="SCAM_OTP_REQUEST",
+        direction=EvidenceDirection.RISK,
+        weight=0.9,
+        summary="Asks for an OTP — a common scam pattern.",
+        created_at=now,
+    ).model_dump_json()
+    conn = store._connect()
+    for start in range(0, rows, batch):
+        params = []
+        for i in range(start, min(rows, start + batch)):
+            inv = f"inv_{i % investigations:012d}"
+            params.append((f"ev_{i:012d}", inv, f"art_{i:012d}", template.replace("ev_template", f"ev_{i:012d}").replace("inv_template", inv)))
+        with conn:
+            conn.executemany(
+                "INSERT INTO evidence_items (evidence_id, investigation_id, artifact_id, payload_json) VALUES (?, ?, ?, ?)",
+                params,
+            )
+
+
+def _time_queries(store: V2Store, investigations: int, queries: int) -> list[float]:
+    rng = random.Random(0)
+    samples = []
+    for _ in range(queries):
+        inv = f"inv_{rng.randrange(investigations):012d}"
+        started = time.perf_counter()
+        store.list_evidence_items(inv)
+        samples.append((time.perf_counter() - started) * 1000.0)
+    return samples
+
+
+def _report(label: str, samples: list[float]) -> None:
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(f"{label:>12}: p50={statistics.median(ordered):.3f} ms  p99={p99:.3f} ms  mean={statistics.fmean(ordered):.3f} ms")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Per-request V2Store latency with and without investigation indexes.")
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--investigations", type=int, default=100_000)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--db", default=None, help="Keep the benchmark database at this path")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = args.db or str(Path(tmp) / "bench_v2.db")
+        store = V2Store(db_path)
+        started = time.perf_counter()
+        _populate(store, args.rows, args.investigations)
+        print(f"populated {args.rows} evidence rows in {time.perf_counter() - started:.1f}s")
+
+        _report("indexed", _time_queries(store, args.investigations, args.queries))
+
+        conn = store._connect()
+        with conn:
+            conn.execute("DROP INDEX idx_evidence_items_investigation")
+        _report("full scan", _time_queries(store, args.investigations, max(5, args.queries // 20)))
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.pipelines.image_hash import KNOWN_IMAGES_PATH, KnownImageIndex, image_dhash  # noqa: E402
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp"}
+
+
+def _image_entries(paths: List[str], label: str) -> Iterator[Tuple[int, str]]:
+    for raw in paths:
+        path = Path(raw)
+        files = sorted(p for p in path.rglob("*") if p.suffix.lower() in IMAGE_SUFFIXES) if path.is_dir() else [path]
+        for file in files:
+            try:
+                with open(file, "rb") as fh:
+                    yield image_dhash(fh), label
+            except OSError as exc:
+                print(f"skipped {file}: {exc}", file=sys.stderr)
+
+
+def _csv_entries(path: str) -> Iterator[Tuple[int, str]]:
+    # Rows of `dhash_hex,label`, e.g. exported from another deployment.
+    with open(path, newline="", encoding="utf-8") as fh:
+        for row in csv.reader(fh):
+            if len(row) >= 2 and not row[0].startswith("#"):
+                yield int(row[0], 16), row[1]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Bulk-import labelled scam images (or dhash CSV rows) into the known-image snapshot.")
+    ap.add_argument("paths", nargs="*", help="Image files or directories to hash")
+    ap.add_argument("--label", help="Label for the images, e.g. kyc_suspended_screenshot")
+    ap.add_argument("--csv", help="CSV of dhash_hex,label rows")
+    ap.add_argument("--snapshot", default=KNOWN_IMAGES_PATH)
+    args = ap.parse_args()
+    if args.paths and not args.label:
+        ap.error("--label is required when importing images")
+
+    started = time.perf_counter()
+    index = KnownImageIndex.load(args.snapshot) if os.path.exists(args.snapshot) else KnownImageIndex()
+    loaded = len(index)
+    added = index.add_many(_image_entries(args.paths, args.label)) if args.paths else 0
+    if args.csv:
+        added += index.add_many(_csv_entries(args.csv))
+    index.save(args.snapshot)
+    print(f"{args.snapshot}: {loaded} existing + {added} new = {len(index)} hashes ({time.perf_counter() - started:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
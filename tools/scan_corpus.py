@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+# Each scan process runs media jobs inline; daemonic pool workers cannot start the media engine's own pool.
+os.environ.setdefault("TRUSTBOT_MEDIA_WORKERS", "0")
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.fusion import fuse  # noqa: E402
+from app.models import AnalyzeRequest  # noqa: E402
+from app.pipelines import provenance  # noqa: E402
+from app.pipelines.provenance_cache import CACHED_FIELDS, canonicalize_url  # noqa: E402
+from app.router import route_and_analyze  # noqa: E402
+
+READ_BUFFER = 1024 * 1024
+CHUNK_LINES = 512
+CHUNK_BYTES = 4 * 1024 * 1024
+
+# (NDJSON output, verdict counts, reason code counts, errors) for one chunk.
+ChunkResult = Tuple[bytes, Dict[str, int], Dict[str, int], int]
+
+
+class FetchSnapshot:
+    """Successful provenance fetches kept in SQLite by canonical URL, shared by all scan processes.
+
+    Re-running a sweep against the same snapshot re-uses its fetches, so rule changes can be
+    compared without the sites' current state (or reachability) moving the results.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._conn = sqlite3.connect(path, timeout=30.0, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS fetches (url TEXT PRIMARY KEY, fetch_json TEXT NOT NULL, fetched_at REAL NOT NULL)")
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute("SELECT fetch_json FROM fetches WHERE url = ?", (canonicalize_url(url),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, url: str, fetch: Dict[str, Any]) -> None:
+        entry = {k: fetch[k] for k in CACHED_FIELDS if k in fetch}
+        self._conn.execute(
+            "INSERT OR REPLACE INTO fetches (url, fetch_json, fetched_at) VALUES (?, ?, ?)",
+            (canonicalize_url(url), json.dumps(entry), time.time()),
+        )
+
+
+_live_get = provenance._safe_get
+
+
+def _offline_get(url: str) -> Dict[str, Any]:
+    return {"ok": False, "error": "fetch disabled", "final_url": url, "chain": []}
+
+
+def _snapshot_get(snapshot: FetchSnapshot, fetch_live: bool):
+    def get(url: str) -> Dict[str, Any]:
+        fetch = snapshot.get(url)
+        if fetch is not None:
+            return fetch
+        if not fetch_live:
+            return _offline_get(url)
+        fetch = _live_get(url)
+        if fetch.get("ok"):
+            snapshot.put(url, fetch)
+        return fetch
+
+    return get
+
+
+_OPTIONS: Dict[str, Any] = {}
+
+
+def _init_worker(fetch_live: bool, snapshot_path: Optional[str], text_field: Optional[str], id_field: Optional[str]) -> None:
+    # Provenance goes through the per-process in-memory cache either way; this only swaps what a miss does.
+    if snapshot_path:
+        provenance._safe_get = _snapshot_get(FetchSnapshot(snapshot_path), fetch_live)
+    elif not fetch_live:
+        provenance._safe_get = _offline_get
+    _OPTIONS.update(text_field=text_field, id_field=id_field)
+
+
+def _request(obj: Any) -> AnalyzeRequest:
+    text_field = _OPTIONS.get("text_field")
+    if text_field:
+        return AnalyzeRequest(content_type="text", text=str(obj.get(text_field) or ""))
+    return AnalyzeRequest.model_validate(obj)
+
+
+def scan_line(line_no: int, raw: bytes) -> Dict[str, Any]:
+    out: Dict[str, Any] = {"line": line_no}
+    try:
+        obj = json.loads(raw)
+        id_field = _OPTIONS.get("id_field")
+        if id_field and isinstance(obj, dict) and id_field in obj:
+            out["id"] = obj[id_field]
+        req = _request(obj)
+        routed = route_and_analyze(req)
+        fused = fuse(routed["signals"], quality_penalty=routed.get("quality_penalty", 0.0))
+    except Exception as exc:
+        out["error"] = f"{type(exc).__name__}: {exc}"
+        return out
+    out.update(
+        verdict=fused["verdict"].value,
+        confidence=round(float(fused["confidence"]), 4),
+        risk=round(float(fused["risk"]), 4),
+        reason_codes=[getattr(code, "value", code) for code in dict.fromkeys(routed["reason_codes"])],
+    )
+    return out
+
+
+def scan_chunk(first_line: int, lines: List[bytes]) -> ChunkResult:
+    verdicts: Counter = Counter()
+    codes: Counter = Counter()
+    errors = 0
+    out: List[str] = []
+    for offset, raw in enumerate(lines):
+        if not raw.strip():
+            continue
+        result = scan_line(first_line + offset, raw)
+        if "error" in result:
+            errors += 1
+        else:
+            verdicts[result["verdict"]] += 1
+            codes.update(result["reason_codes"])
+        out.append(json.dumps(result, ensure_ascii=False))
+    return "".join(line + "\n" for line in out).encode("utf-8"), dict(verdicts), dict(codes), errors
+
+
+def read_chunks(path: str, limit: Optional[int] = None) -> Iterator[Tuple[int, List[bytes], int]]:
+    """(first line number, lines, bytes) per chunk, streamed with a fixed read buffer."""
+    chunk: List[bytes] = []
+    chunk_bytes = 0
+    first = 1
+    fh = sys.stdin.buffer if path == "-" else open(path, "rb", buffering=READ_BUFFER)
+    try:
+        for line_no, raw in enumerate(fh, start=1):
+            if limit is not None and line_no > limit:
+                break
+            if not chunk:
+                first = line_no
+            chunk_bytes += len(raw)
+            chunk.append(raw)
+            if len(chunk) >= CHUNK_LINES or chunk_bytes >= CHUNK_BYTES:
+                yield first, chunk, chunk_bytes
+                chunk, chunk_bytes = [], 0
+        if chunk:
+            yield first, chunk, chunk_bytes
+    finally:
+        if fh is not sys.stdin.buffer:
+            fh.close()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Scan a JSONL corpus through the v1 pipelines in-process and write NDJSON verdicts.")
+    ap.add_argument("corpus", help="JSONL file of AnalyzeRequest bodies, or '-' for stdin")
+    ap.add_argument("--out", default="-", help="NDJSON verdicts, one per input line, in input order (default stdout)")
+    ap.add_argument("--summary", help="Also write the JSON summary to this file (it always goes to stderr)")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--text-field", help="Treat each line as a text message taken from this field, e.g. body")
+    ap.add_argument("--id-field", help="Copy this field into each output line, e.g. request_id")
+    ap.add_argument("--no-fetch", action="store_true", help="Never fetch links; provenance reports the fetch as failed unless the snapshot has it")
+    ap.add_argument("--provenance-cache", help="SQLite snapshot of link fetches shared by workers and reused across runs")
+    ap.add_argument("--limit", type=int, help="Stop after this many input lines")
+    args = ap.parse_args()
+
+    init = (not args.no_fetch, args.provenance_cache, args.text_field, args.id_field)
+    if args.provenance_cache:
+        FetchSnapshot(args.provenance_cache)  # create the schema once, before workers race for it
+
+    started = time.perf_counter()
+    lines = bytes_read = errors = 0
+    verdicts: Counter = Counter()
+    codes: Counter = Counter()
+    out = sys.stdout.buffer if args.out == "-" else open(args.out, "wb", buffering=READ_BUFFER)
+    workers = max(1, args.workers)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init) as pool:
+            # A bounded window of chunks in flight keeps memory flat however long the corpus is,
+            # and draining it from the left keeps the output in input order.
+            window: Deque[Tuple[int, Future]] = deque()
+
+            def collect(count: int, future: Future) -> None:
+                nonlocal lines, errors
+                data, chunk_verdicts, chunk_codes, chunk_errors = future.result()
+                out.write(data)
+                lines += count
+                errors += chunk_errors
+                verdicts.update(chunk_verdicts)
+                codes.update(chunk_codes)
+
+            for first, chunk, size in read_chunks(args.corpus, args.limit):
+                bytes_read += size
+                if len(window) >= workers * 4:
+                    collect(*window.popleft())
+                window.append((sum(1 for raw in chunk if raw.strip()), pool.submit(scan_chunk, first, chunk)))
+            while window:
+                collect(*window.popleft())
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+
+    elapsed = time.perf_counter() - started
+    summary = {
+        "lines": lines,
+        "errors": errors,
+        "verdicts": dict(verdicts.most_common()),
+        "reason_codes": dict(codes.most_common()),
+        "seconds": round(elapsed, 3),
+        "lines_per_second": round(lines / elapsed, 1) if elapsed else None,
+        "mb_per_second": round(bytes_read / elapsed / 1e6, 2) if elapsed else None,
+        "workers": workers,
+        "fetch": "off" if args.no_fetch else "on",
+    }
+    text = json.dumps(summary, indent=2)
+    print(text, file=sys.stderr)
+    if args.summary:
+        Path(args.summary).write_text(text + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()